@@ -0,0 +1,22 @@
+"""Réglages partagés des benchmarks : base dédiée et comptes de test"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_DATABASE = os.path.join(ROOT, 'database', 'bench.db')
+BENCH_PASSWORD = 'benchmark'
+BENCH_ADMIN_EMAIL = 'bench-admin@buildrr.fr'
+BENCH_MEMBER_EMAIL = 'bench-member@buildrr.fr'
+
+def load_app(database):
+    """Importe l'application sur `database` (main.py crée le schéma et applique les migrations)"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(database)}'
+    import main
+    return main.app
+
+def remove_database(database):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(database + suffix):
+            os.remove(database + suffix)
@@ -0,0 +1,422 @@
+"""Charge chaque route des blueprints (user, quote, contact, admin, dashboard, content) et mesure latences, débit et mémoire
+
+Usage :
+  python -m benchmarks.seed --reset --users 100000 --orders 1000000 --quotes 1000000 --messages 1000000
+  python -m benchmarks.load --iterations 200 --output benchmarks/results/$(git rev-parse --short HEAD).json
+  python -m benchmarks.load --baseline benchmarks/results/<version précédente>.json
+
+Les requêtes passent par le client de test Flask, envois SMTP coupés (MAIL_SUPPRESS_SEND) et
+contrôle d'admission désactivé. Le benchmark tourne sur une copie de la base générée : deux
+exécutions partent des mêmes données. Résultat : p50/p95/p99, débit et pic de RSS par route,
+en JSON ; --baseline compare au fichier d'une version précédente et échoue sur une régression.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from benchmarks.common import ROOT, DEFAULT_DATABASE, BENCH_PASSWORD, BENCH_ADMIN_EMAIL, BENCH_MEMBER_EMAIL, load_app
+
+BLUEPRINTS = ('user', 'quote', 'contact', 'admin', 'dashboard', 'content')
+
+class Scenario:
+    """Une requête mesurée : endpoint, méthode, chemin (format avec les ids du contexte) et corps
+
+    `setup(context, n)` prépare n cibles (hors mesure) pour les routes qui modifient ou
+    suppriment une ligne ; chaque itération reçoit la sienne dans `target` (et `owner`).
+    """
+
+    def __init__(self, endpoint, method, path, body=None, role='admin', setup=None, iterations=None,
+                 name=None, stream=False, content_type=None):
+        self.endpoint = endpoint
+        self.name = name or endpoint
+        self.method = method
+        self.path = path
+        self.body = body
+        self.role = role
+        self.setup = setup
+        self.iterations = iterations  # plafond pour les routes lourdes (exports complets)
+        self.stream = stream  # réponse infinie (SSE) : mesurée jusqu'au premier octet
+        self.content_type = content_type
+
+# ===== CIBLES CRÉÉES AVANT LA MESURE =====
+
+def _insert(model, rows):
+    from src.models.user import db
+    table = model.__table__
+    result = db.session.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows)
+    ids = [row_id for (row_id,) in result.all()]
+    db.session.commit()
+    return ids
+
+def _new_users(context, n):
+    from src.models.user import User
+    ids = _insert(User, [{'first_name': 'Load', 'last_name': f'Target {i}', 'email': f'load-{context.run}-{context.sequence()}@buildrr.fr',
+                          'password': context.password_hash, 'role': 'member'} for i in range(n)])
+    return [(user_id, user_id) for user_id in ids]
+
+def _new_orders(context, n):
+    from src.models.user import Order
+    ids = _insert(Order, [{'order_id': f'L{context.run[-6:]}{context.sequence():06d}', 'title': 'Commande de charge', 'type': 'website',
+                           'status': 'pending', 'price': 1000, 'progress': 0, 'user_id': context.member_id} for _ in range(n)])
+    return [(order_id, context.member_id) for order_id in ids]
+
+def _new_quotes(status):
+    def setup(context, n):
+        from src.models.user import Quote
+        ids = _insert(Quote, [{'project_type': 'website', 'features': '[]', 'email': BENCH_MEMBER_EMAIL, 'company': 'Bench',
+                               'description': 'Devis de charge', 'estimated_price': 2000, 'status': status,
+                               'user_id': context.member_id, 'has_account': True} for _ in range(n)])
+        return [(quote_id, context.member_id) for quote_id in ids]
+    return setup
+
+def _new_contacts(context, n):
+    from src.models.user import Contact
+    ids = _insert(Contact, [{'name': 'Load', 'email': 'load@example.fr', 'subject': 'Charge', 'message': 'Test de charge',
+                             'status': 'new'} for _ in range(n)])
+    return [(contact_id, None) for contact_id in ids]
+
+def _new_content(context, n):
+    from src.models.user import SiteContent
+    ids = _insert(SiteContent, [{'page_name': 'load', 'section_name': f'section-{i}', 'content_type': 'text',
+                                 'content': 'Contenu de charge', 'is_active': True} for i in range(n)])
+    return [(content_id, None) for content_id in ids]
+
+def _import_body(context, i):
+    lines = (json.dumps({'name': 'Import', 'email': f'import-{i}-{j}@example.fr', 'subject': 'Import',
+                         'message': 'Ligne importée'}) for j in range(100))
+    return '\n'.join(lines)
+
+QUOTE_REQUEST = {
+    'projectType': 'website', 'features': ['Blog', 'SEO'], 'budget': '2000-5000€', 'timeline': '2-3 mois',
+    'company': 'Charge SARL', 'description': 'Site vitrine', 'estimatedPrice': 3500
+}
+
+SCENARIOS = [
+    # user_bp
+    Scenario('user.register', 'POST', '/api/register', role=None, body=lambda c, i: {
+        'firstName': 'Load', 'lastName': 'Register', 'email': f'register-{c.run}-{i}@buildrr.fr', 'password': BENCH_PASSWORD}),
+    Scenario('user.login', 'POST', '/api/login', role=None, body={'email': BENCH_MEMBER_EMAIL, 'password': BENCH_PASSWORD}),
+    Scenario('user.get_profile', 'GET', '/api/profile', role='member'),
+    # quote_bp
+    Scenario('quote.submit_quote', 'POST', '/api/quote', role=None,
+             body=lambda c, i: dict(QUOTE_REQUEST, email=f'quote-{c.run}-{i}@example.fr')),
+    Scenario('quote.get_quotes', 'GET', '/api/quotes', role=None),
+    Scenario('quote.get_user_quotes', 'GET', '/api/quotes/user', role='member'),
+    Scenario('quote.user_respond_to_quote', 'POST', '/api/quotes/{target}/respond', role='owner', setup=_new_quotes('sent'),
+             body={'response': 'accepted', 'message': 'OK'}),
+    # contact_bp
+    Scenario('contact.submit_contact', 'POST', '/api/contact', role=None, body=lambda c, i: {
+        'name': 'Load', 'email': f'contact-{c.run}-{i}@example.fr', 'subject': 'Charge', 'message': 'Test de charge'}),
+    Scenario('contact.get_contacts', 'GET', '/api/contacts', role=None),
+    # admin_bp
+    Scenario('admin.get_all_users', 'GET', '/api/admin/users'),
+    Scenario('admin.get_user', 'GET', '/api/admin/users/{member_id}'),
+    Scenario('admin.update_user', 'PUT', '/api/admin/users/{target}', setup=_new_users, body={'company': 'Mise à jour'}),
+    Scenario('admin.delete_user', 'DELETE', '/api/admin/users/{target}', setup=_new_users),
+    Scenario('admin.create_user', 'POST', '/api/admin/users', body=lambda c, i: {
+        'firstName': 'Load', 'lastName': 'Admin', 'email': f'admin-created-{c.run}-{i}@buildrr.fr', 'password': BENCH_PASSWORD}),
+    Scenario('admin.get_all_orders', 'GET', '/api/admin/orders'),
+    Scenario('admin.create_order', 'POST', '/api/admin/orders', body=lambda c, i: {
+        'title': 'Commande', 'type': 'website', 'price': 1500, 'userId': c.member_id}),
+    Scenario('admin.update_order', 'PUT', '/api/admin/orders/{target}', setup=_new_orders, body={'status': 'in-progress', 'progress': 50}),
+    Scenario('admin.delete_order', 'DELETE', '/api/admin/orders/{target}', setup=_new_orders),
+    Scenario('admin.get_all_quotes', 'GET', '/api/admin/quotes'),
+    Scenario('admin.get_all_quotes', 'GET', '/api/admin/quotes?feature=Blog', name='admin.get_all_quotes[feature]'),
+    Scenario('admin.get_quote_features', 'GET', '/api/admin/quotes/features'),
+    Scenario('admin.update_quote', 'PUT', '/api/admin/quotes/{target}', setup=_new_quotes('pending'), body={'status': 'reviewed'}),
+    Scenario('admin.delete_quote', 'DELETE', '/api/admin/quotes/{target}', setup=_new_quotes('pending')),
+    Scenario('admin.bulk_action', 'POST', '/api/admin/orders/bulk', name='admin.bulk_action[orders]', body=lambda c, i: {
+        'action': 'update', 'status': ('pending', 'in-progress')[i % 2], 'filter': {'userId': c.member_id}}),
+    Scenario('admin.search_all', 'GET', '/api/admin/search?q=site+vitrine'),
+    Scenario('admin.get_all_contacts', 'GET', '/api/admin/contacts'),
+    Scenario('admin.update_contact', 'PUT', '/api/admin/contacts/{target}', setup=_new_contacts, body={'status': 'read'}),
+    Scenario('admin.delete_contact', 'DELETE', '/api/admin/contacts/{target}', setup=_new_contacts),
+    Scenario('admin.get_all_messages', 'GET', '/api/admin/messages'),
+    Scenario('admin.mark_message_read', 'PUT', '/api/admin/messages/{admin_message_id}/read'),
+    Scenario('admin.send_admin_message', 'POST', '/api/admin/messages', body=lambda c, i: {
+        'subject': 'Charge', 'message': 'Message de charge', 'recipientId': c.member_id}),
+    Scenario('admin.get_all_threads', 'GET', '/api/admin/threads'),
+    Scenario('admin.get_admin_thread_messages', 'GET', '/api/admin/threads/{member_thread_id}/messages'),
+    Scenario('admin.mark_admin_thread_read', 'POST', '/api/admin/threads/{member_thread_id}/read'),
+    Scenario('admin.get_site_content', 'GET', '/api/admin/content'),
+    Scenario('admin.create_content', 'POST', '/api/admin/content', body=lambda c, i: {
+        'pageName': 'load', 'sectionName': f'created-{i}', 'contentType': 'text', 'content': 'Contenu'}),
+    Scenario('admin.update_content', 'PUT', '/api/admin/content/{target}', setup=_new_content, body={'content': 'Contenu modifié'}),
+    Scenario('admin.delete_content', 'DELETE', '/api/admin/content/{target}', setup=_new_content),
+    Scenario('admin.get_admin_stats', 'GET', '/api/admin/stats'),
+    Scenario('admin.export_data', 'GET', '/api/admin/export/orders', name='admin.export_data[orders]', iterations=3),
+    Scenario('admin.import_data', 'POST', '/api/admin/import/contacts?format=ndjson', name='admin.import_data[contacts]',
+             body=_import_body, content_type='application/x-ndjson'),
+    Scenario('admin.admin_respond_to_quote', 'POST', '/api/admin/quotes/{target}/respond', setup=_new_quotes('pending'),
+             body={'response': 'Proposition', 'price': 4200, 'timeline': '2 mois'}),
+    # dashboard_bp
+    Scenario('dashboard.get_profile', 'GET', '/api/dashboard/profile', role='member'),
+    Scenario('dashboard.update_profile', 'PUT', '/api/dashboard/profile', role='member', body=lambda c, i: {'phone': f'06{i:08d}'}),
+    Scenario('dashboard.get_user_orders', 'GET', '/api/dashboard/orders', role='member'),
+    Scenario('dashboard.get_user_messages', 'GET', '/api/dashboard/messages', role='member'),
+    Scenario('dashboard.send_message_to_admin', 'POST', '/api/dashboard/messages', role='member',
+             body={'subject': 'Question', 'message': 'Message de charge'}),
+    Scenario('dashboard.stream_events', 'GET', '/api/dashboard/events', role='member', stream=True, iterations=20),
+    Scenario('dashboard.get_user_threads', 'GET', '/api/dashboard/threads', role='member'),
+    Scenario('dashboard.get_thread_messages', 'GET', '/api/dashboard/threads/{member_thread_id}/messages', role='member'),
+    Scenario('dashboard.mark_thread_read', 'POST', '/api/dashboard/threads/{member_thread_id}/read', role='member'),
+    Scenario('dashboard.mark_all_messages_read', 'POST', '/api/dashboard/messages/read-all', role='member'),
+    Scenario('dashboard.delete_account', 'DELETE', '/api/dashboard/account', role='owner', setup=_new_users,
+             body={'password': BENCH_PASSWORD}),
+    Scenario('dashboard.get_user_stats', 'GET', '/api/dashboard/stats', role='member'),
+    Scenario('dashboard.get_user_quotes', 'GET', '/api/dashboard/quotes', role='member'),
+    Scenario('dashboard.dashboard_respond_to_quote', 'POST', '/api/dashboard/quotes/{target}/respond', role='owner',
+             setup=_new_quotes('sent'), body={'response': 'rejected'}),
+    # content_bp
+    Scenario('content.get_page_content', 'GET', '/api/content/home', role=None),
+]
+
+# ===== EXÉCUTION =====
+
+class Context:
+    """Comptes, ids de référence et jetons de la base de benchmark"""
+
+    def __init__(self, app):
+        from src.models.user import db, User, PrivateMessage
+        from src.routes.hashing import hash_password
+        from src.routes.threads import ThreadParticipant
+        self.app = app
+        self.run = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        self._sequence = 0
+        self._lock = threading.Lock()
+        admin = User.query.filter_by(email=BENCH_ADMIN_EMAIL).first()
+        member = User.query.filter_by(email=BENCH_MEMBER_EMAIL).first()
+        if admin is None or member is None:
+            raise SystemExit('Comptes de benchmark absents : lancer d\'abord python -m benchmarks.seed')
+        self.admin_id = admin.id
+        self.member_id = member.id
+        self.password_hash = hash_password(BENCH_PASSWORD)
+        self.tokens = {}
+        # Fil admin <-> membre de test et un message reçu par l'admin
+        thread = db.session.query(ThreadParticipant.thread_id).filter(ThreadParticipant.user_id == member.id).first()
+        message = db.session.query(PrivateMessage.id).filter(PrivateMessage.recipient_id == admin.id).first()
+        self.values = {
+            'member_id': member.id,
+            'member_thread_id': thread[0] if thread else 0,
+            'admin_message_id': message[0] if message else 0
+        }
+
+    def sequence(self):
+        with self._lock:
+            self._sequence += 1
+            return self._sequence
+
+    def token(self, user_id):
+        token = self.tokens.get(user_id)
+        if token is None:
+            import jwt
+            token = self.tokens[user_id] = jwt.encode({
+                'user_id': user_id,
+                'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
+            }, self.app.config['SECRET_KEY'], algorithm='HS256')
+        return token
+
+def _request(context, scenario, i, target):
+    target_id, owner_id = target if target else (None, None)
+    user_id = {'admin': context.admin_id, 'member': context.member_id, 'owner': owner_id}.get(scenario.role)
+    kwargs = {'method': scenario.method, 'path': scenario.path.format(target=target_id, **context.values), 'headers': {}}
+    if user_id is not None:
+        token = context.token(user_id)
+        if scenario.stream:
+            kwargs['query_string'] = {'token': token}
+        else:
+            kwargs['headers']['Authorization'] = f'Bearer {token}'
+    body = scenario.body(context, i) if callable(scenario.body) else scenario.body
+    if scenario.content_type:
+        kwargs['data'] = body
+        kwargs['content_type'] = scenario.content_type
+    elif body is not None:
+        kwargs['json'] = body
+    return kwargs
+
+def _call(client, kwargs, stream):
+    """Durée jusqu'à la fin de la réponse (premier octet pour un flux SSE) et statut"""
+    start = time.perf_counter()
+    response = client.open(buffered=False, **kwargs)
+    try:
+        if stream:
+            next(iter(response.response))
+        else:
+            for _ in response.response:
+                pass
+        return time.perf_counter() - start, response.status_code
+    finally:
+        response.close()
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if platform.system() == 'Darwin' else peak  # octets sous macOS, Ko sous Linux
+
+def _percentile(quantiles, p):
+    return round(quantiles[p - 1] * 1000, 3) if quantiles else None
+
+def run_scenario(context, scenario, iterations, warmup, threads):
+    count = min(iterations, scenario.iterations or iterations)
+    total = count + (warmup if not scenario.iterations else 0)
+    targets = None
+    if scenario.setup:
+        with context.app.app_context():
+            targets = scenario.setup(context, total)
+
+    clients = threading.local()
+    def one(i):
+        if not hasattr(clients, 'client'):
+            clients.client = context.app.test_client()
+        kwargs = _request(context, scenario, i, targets[i] if targets else None)
+        return _call(clients.client, kwargs, scenario.stream)
+
+    for i in range(total - count):
+        one(i)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        samples = list(executor.map(one, range(total - count, total)))
+    elapsed = time.perf_counter() - start
+
+    durations = sorted(duration for duration, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    quantiles = statistics.quantiles(durations, n=100, method='inclusive') if len(durations) > 1 else durations * 99
+    return {
+        'endpoint': scenario.endpoint,
+        'method': scenario.method,
+        'path': scenario.path,
+        'iterations': count,
+        'statuses': statuses,
+        'errors': sum(n for status, n in statuses.items() if int(status) >= 400),
+        'p50Ms': _percentile(quantiles, 50),
+        'p95Ms': _percentile(quantiles, 95),
+        'p99Ms': _percentile(quantiles, 99),
+        'meanMs': round(statistics.fmean(durations) * 1000, 3),
+        'maxMs': round(durations[-1] * 1000, 3),
+        'throughput': round(count / elapsed, 2),
+        'peakRssKb': _peak_rss_kb()
+    }
+
+def _volumes(app):
+    from src.models.user import db, User, Order, Quote, Contact, PrivateMessage
+    with app.app_context():
+        return {name: db.session.query(model).count() for name, model in
+                [('users', User), ('orders', Order), ('quotes', Quote), ('contacts', Contact), ('messages', PrivateMessage)]}
+
+def _git_version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def uncovered(app):
+    """Endpoints des blueprints mesurés sans scénario (route ajoutée depuis)"""
+    covered = {scenario.endpoint for scenario in SCENARIOS}
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()
+                   if rule.endpoint.split('.')[0] in BLUEPRINTS and rule.endpoint not in covered})
+
+def _copy_database(source):
+    """Copie la base générée (WAL intégré) dans un fichier temporaire"""
+    if not os.path.exists(source):
+        raise SystemExit(f'Base {source} absente : lancer d\'abord python -m benchmarks.seed')
+    connection = sqlite3.connect(source)
+    connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    connection.close()
+    directory = tempfile.mkdtemp(prefix='buildrr-bench-')
+    copy = os.path.join(directory, 'bench.db')
+    shutil.copyfile(source, copy)
+    return copy
+
+def compare(baseline, results, tolerance):
+    """Affiche l'évolution du p95 par scénario ; retourne les régressions au-delà de `tolerance` (%)"""
+    regressions = []
+    print(f"\n{'scénario':<45}{'p95 avant':>12}{'p95 après':>12}{'écart':>9}")
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or not previous.get('p95Ms') or current['p95Ms'] is None:
+            continue
+        change = (current['p95Ms'] - previous['p95Ms']) / previous['p95Ms'] * 100
+        flag = ' !' if change > tolerance else ''
+        print(f"{name:<45}{previous['p95Ms']:>12.2f}{current['p95Ms']:>12.2f}{change:>+8.1f}%{flag}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=DEFAULT_DATABASE, help='base générée par benchmarks.seed (non modifiée)')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=1, help='clients simultanés')
+    parser.add_argument('--only', action='append', help='scénario(s) à lancer (nom ou préfixe de blueprint)')
+    parser.add_argument('--output', help='fichier JSON des résultats')
+    parser.add_argument('--baseline', help='résultats JSON d\'une version précédente à comparer')
+    parser.add_argument('--tolerance', type=float, default=20, help='hausse du p95 tolérée (%%) avec --baseline')
+    args = parser.parse_args()
+
+    database = _copy_database(args.database)
+    try:
+        app = load_app(database)
+        app.config['MAIL_SUPPRESS_SEND'] = True
+        app.extensions['mail'].suppress = True
+        app.config['ADMISSION_ENABLED'] = False
+        with app.app_context():
+            context = Context(app)
+
+        scenarios = [scenario for scenario in SCENARIOS if not args.only or any(
+            scenario.name == only or scenario.name.startswith(f'{only}.') for only in args.only)]
+        results = {
+            'version': _git_version(),
+            'startedAt': datetime.datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'threads': args.threads,
+            'volumes': _volumes(app),
+            'uncovered': uncovered(app),
+            'scenarios': {}
+        }
+        print(f"{'scénario':<45}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'erreurs':>9}")
+        for scenario in scenarios:
+            result = run_scenario(context, scenario, args.iterations, args.warmup, args.threads)
+            results['scenarios'][scenario.name] = result
+            print(f"{scenario.name:<45}{result['p50Ms']:>9.2f}{result['p95Ms']:>9.2f}{result['p99Ms']:>9.2f}"
+                  f"{result['throughput']:>9.1f}{result['errors']:>9}")
+        results['peakRssKb'] = _peak_rss_kb()
+        print(f"Pic de RSS : {results['peakRssKb']} Ko")
+        if results['uncovered']:
+            print(f"Routes sans scénario : {', '.join(results['uncovered'])}")
+    finally:
+        shutil.rmtree(os.path.dirname(database), ignore_errors=True)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            raise SystemExit(f"Régression du p95 au-delà de {args.tolerance}% : {', '.join(regressions)}")
+
+if __name__ == '__main__':
+    main()
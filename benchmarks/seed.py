@@ -0,0 +1,191 @@
+"""Génère une base de benchmark aux volumes voulus, de façon reproductible (graine fixe)
+
+Usage : python -m benchmarks.seed --reset --users 100000 --orders 1000000 --quotes 1000000 --messages 1000000
+
+Utilisateurs, commandes, devis et contacts passent par l'import en masse (executemany par
+lots, lignes quote_feature comprises) ; les messages sont insérés par lots puis les fils de
+discussion reconstruits en SQL. Tous les comptes ont le mot de passe « benchmark ».
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import DEFAULT_DATABASE, BENCH_PASSWORD, BENCH_ADMIN_EMAIL, BENCH_MEMBER_EMAIL, load_app, remove_database
+
+FIRST_NAMES = ['Camille', 'Louis', 'Léa', 'Hugo', 'Chloé', 'Lucas', 'Manon', 'Jules', 'Inès', 'Nathan']
+LAST_NAMES = ['Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau']
+COMPANIES = ['Atelier Nord', 'Boulangerie Dupont', 'Cabinet Lefèvre', 'Garage du Centre', 'Studio Lumière', '']
+PROJECT_TYPES = ['website', 'ecommerce', 'webapp', 'mobile', 'redesign']
+FEATURES = ['Formulaire de contact', 'Blog', 'Paiement en ligne', 'Espace client', 'Multilingue', 'SEO', 'Réservation', 'Newsletter']
+BUDGETS = ['< 2000€', '2000-5000€', '5000-10000€', '> 10000€']
+TIMELINES = ['1 mois', '2-3 mois', '6 mois', 'Flexible']
+ORDER_STATUSES = ['pending', 'in-progress', 'completed', 'cancelled']
+QUOTE_STATUSES = ['pending', 'sent', 'accepted', 'rejected']
+CONTACT_STATUSES = ['new', 'read', 'replied']
+WORDS = ['site', 'vitrine', 'boutique', 'refonte', 'mobile', 'paiement', 'maintenance', 'hébergement', 'logo', 'délai', 'tarif', 'devis']
+CONTENT_PAGES = {'home': ['hero', 'services', 'testimonials', 'cta'], 'about': ['story', 'team'], 'pricing': ['plans', 'faq']}
+
+EPOCH = datetime(2024, 1, 1)
+SPAN = 2 * 365 * 86400  # secondes couvertes par les dates générées
+
+def _date(rng):
+    return EPOCH + timedelta(seconds=rng.randrange(SPAN))
+
+def _text(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words))
+
+def _users(rng, count, start, password_hash):
+    for i in range(count):
+        yield i + 1, {
+            'firstName': rng.choice(FIRST_NAMES),
+            'lastName': rng.choice(LAST_NAMES),
+            'email': f'bench-user-{start + i}@buildrr.fr',
+            'company': rng.choice(COMPANIES),
+            'phone': f'06{rng.randrange(10 ** 8):08d}',
+            'passwordHash': password_hash,
+            'createdAt': _date(rng).isoformat()
+        }
+
+def _orders(rng, count, start, user_ids):
+    for i in range(count):
+        status = rng.choice(ORDER_STATUSES)
+        created_at = _date(rng)
+        yield i + 1, {
+            'orderId': f'BN{start + i:08d}',
+            'title': f'Projet {_text(rng, 2)}',
+            'type': rng.choice(PROJECT_TYPES),
+            'status': status,
+            'price': rng.randrange(500, 20000),
+            'description': _text(rng, 12),
+            'progress': 100 if status == 'completed' else rng.randrange(100),
+            'userId': rng.choice(user_ids),
+            'createdAt': created_at.isoformat(),
+            'completedAt': (created_at + timedelta(days=rng.randrange(1, 90))).isoformat() if status == 'completed' else None
+        }
+
+def _quotes(rng, count, user_ids):
+    for i in range(count):
+        user_id = rng.choice(user_ids) if rng.random() < 0.7 else None
+        yield i + 1, {
+            'projectType': rng.choice(PROJECT_TYPES),
+            'features': rng.sample(FEATURES, rng.randrange(4)),
+            'budget': rng.choice(BUDGETS),
+            'timeline': rng.choice(TIMELINES),
+            'company': rng.choice(COMPANIES),
+            'email': f'prospect-{rng.randrange(10 ** 6)}@example.fr',
+            'description': _text(rng, 20),
+            'estimatedPrice': rng.randrange(1000, 15000),
+            'status': rng.choice(QUOTE_STATUSES),
+            'userId': user_id,
+            'hasAccount': user_id is not None,
+            'createdAt': _date(rng).isoformat()
+        }
+
+def _contacts(rng, count):
+    for i in range(count):
+        yield i + 1, {
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'email': f'contact-{rng.randrange(10 ** 6)}@example.fr',
+            'company': rng.choice(COMPANIES),
+            'subject': _text(rng, 3),
+            'message': _text(rng, 30),
+            'status': rng.choice(CONTACT_STATUSES),
+            'createdAt': _date(rng).isoformat()
+        }
+
+def _import(data_type, records, batch_size):
+    from src.routes.importer import Importer
+    start = time.perf_counter()
+    summary = Importer(data_type, batch_size=batch_size).run(records)
+    elapsed = time.perf_counter() - start
+    print(f"{data_type:<10}{summary['imported']:>10,} lignes {elapsed:>8.1f}s {summary['imported'] / max(elapsed, 1e-9):>10,.0f} lignes/s")
+    if summary['failed']:
+        print(f"  {summary['failed']} lignes refusées, ex. : {summary['errors'][:3]}")
+
+def _messages(rng, count, admin_id, user_ids, batch_size):
+    from src.models.user import db, PrivateMessage
+    from src.routes.migrations import backfill_message_threads
+    start = time.perf_counter()
+    table = PrivateMessage.__table__
+    for offset in range(0, count, batch_size):
+        rows = []
+        for _ in range(min(batch_size, count - offset)):
+            member = rng.choice(user_ids)
+            to_admin = rng.random() < 0.5
+            rows.append({
+                'subject': _text(rng, 3),
+                'message': _text(rng, 25),
+                'sender_id': member if to_admin else admin_id,
+                'recipient_id': admin_id if to_admin else member,
+                'is_read': rng.random() < 0.6,
+                'created_at': _date(rng)
+            })
+        db.session.execute(table.insert(), rows)
+        db.session.commit()
+    # Insertion sans l'ORM : fils, participants et compteurs de non-lus recalculés en SQL
+    with db.engine.begin() as connection:
+        backfill_message_threads(connection)
+    elapsed = time.perf_counter() - start
+    print(f"{'messages':<10}{count:>10,} lignes {elapsed:>8.1f}s {count / max(elapsed, 1e-9):>10,.0f} lignes/s")
+
+def _content():
+    from src.models.user import db, SiteContent
+    for page, sections in CONTENT_PAGES.items():
+        for section in sections:
+            db.session.add(SiteContent(page_name=page, section_name=section, content_type='text',
+                                       content=f'Contenu {page}/{section}', is_active=True))
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--reset', action='store_true', help='supprime la base avant de la remplir')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--quotes', type=int, default=10000)
+    parser.add_argument('--contacts', type=int, default=10000)
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.reset:
+        remove_database(args.database)
+    app = load_app(args.database)
+
+    from src.models.user import db, User, Order
+    from src.routes.hashing import hash_password
+    from src.routes.stats import counters_enabled, rebuild_counters
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    with app.app_context():
+        # Un seul hachage : tous les comptes générés partagent le mot de passe de benchmark
+        password_hash = hash_password(BENCH_PASSWORD)
+        start = db.session.query(User).count()
+        accounts = []
+        for email, role in ((BENCH_ADMIN_EMAIL, 'admin'), (BENCH_MEMBER_EMAIL, 'member')):
+            if not User.query.filter_by(email=email).first():
+                accounts.append((len(accounts) + 1, {'firstName': 'Bench', 'lastName': role.title(), 'email': email,
+                                                     'role': role, 'passwordHash': password_hash}))
+        if accounts:
+            _import('users', accounts, args.batch_size)
+        _import('users', _users(rng, args.users, start, password_hash), args.batch_size)
+
+        admin_id = User.query.filter_by(email=BENCH_ADMIN_EMAIL).first().id
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.role == 'member')]
+        order_start = db.session.query(Order).count()
+        _import('orders', _orders(rng, args.orders, order_start, user_ids), args.batch_size)
+        _import('quotes', _quotes(rng, args.quotes, user_ids), args.batch_size)
+        _import('contacts', _contacts(rng, args.contacts), args.batch_size)
+        _messages(rng, args.messages, admin_id, user_ids, args.batch_size)
+        _content()
+        if counters_enabled():
+            rebuild_counters()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+    print(f"Base {args.database} prête en {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Débit de sérialisation des listes : to_dict() + jsonify contre projection + encodeur rapide
+
+Usage : python -m benchmarks.serialization --rows 50000
+
+Les lignes de test sont insérées dans une transaction annulée à la fin :
+la base n'est pas modifiée.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+from main import app
+from src.models.user import db, User, Order
+from src.routes.serializers import project, serialize_rows, json_response, ORDER_FIELDS, USER_FIELDS
+
+def _seed(rows):
+    user = User(first_name='Bench', last_name='Mark', email=f'bench-{time.time()}@buildrr.fr', password='x')
+    db.session.add(user)
+    db.session.flush()
+    db.session.execute(db.insert(Order.__table__), [{
+        'order_id': f'B{i:08d}',
+        'title': f'Commande {i}',
+        'type': 'website',
+        'status': ('pending', 'in-progress', 'completed')[i % 3],
+        'price': 1000 + i,
+        'description': 'Site vitrine avec formulaire de contact',
+        'progress': i % 100,
+        'user_id': user.id
+    } for i in range(rows)])
+    db.session.execute(db.insert(User.__table__), [{
+        'first_name': 'Bench',
+        'last_name': f'User {i}',
+        'email': f'bench-{i}-{time.time()}@buildrr.fr',
+        'password': 'x',
+        'company': 'Buildrr',
+        'phone': '0600000000',
+        'role': 'member'
+    } for i in range(rows)])
+    db.session.flush()
+
+def _orm_path(model, limit):
+    items = model.query.limit(limit).all()
+    return jsonify({'items': [item.to_dict() for item in items]}).get_data()
+
+def _projection_path(fields, limit):
+    rows = project(fields).limit(limit).all()
+    return json_response({'items': serialize_rows(fields, rows)}).get_data()
+
+def _measure(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with app.test_request_context():
+        try:
+            _seed(args.rows)
+            print(f"{'liste':<10}{'to_dict (lignes/s)':>22}{'projection (lignes/s)':>25}{'gain':>8}")
+            for name, model, fields in [('orders', Order, ORDER_FIELDS), ('users', User, USER_FIELDS)]:
+                orm = _measure(lambda: _orm_path(model, args.rows), args.repeat)
+                fast = _measure(lambda: _projection_path(fields, args.rows), args.repeat)
+                print(f"{name:<10}{args.rows / orm:>22,.0f}{args.rows / fast:>25,.0f}{orm / fast:>7.1f}x")
+        finally:
+            db.session.rollback()
+
+if __name__ == '__main__':
+    main()
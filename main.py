@@ -3,15 +3,24 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, Response, request
 from flask_cors import CORS
 from flask_mail import Mail
-from src.models.user import db
-from src.routes.user import user_bp
+from src.models.user import db, User
+from src.routes.user import user_bp, token_required
 from src.routes.quote import quote_bp
 from src.routes.contact import contact_bp
-from src.routes.admin import admin_bp
+from src.routes.admin import admin_bp, admin_required
 from src.routes.dashboard import dashboard_bp
+from src.routes.content import content_bp
+from src.routes.outbox import run_worker, EmailOutbox
+from src.routes.stats import ensure_counters, rebuild_counters
+from src.routes.database import DEFAULT_SQLITE_PRAGMAS, sqlite_engine_options, configure_sqlite
+from src.routes.migrations import run_migrations
+from src.routes.query_plans import check_query_plans
+from src.routes.static_assets import StaticManifest, serve_asset
+from src.routes.metrics import init_metrics, render_metrics, scrape_token_matches
+from src.routes.profiler import init_profiler
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -24,6 +33,70 @@ app.config['MAIL_USERNAME'] = 'contact@buildrr.fr'
 app.config['MAIL_PASSWORD'] = 'your_app_password'  # À remplacer par un vrai mot de passe d'application
 app.config['MAIL_DEFAULT_SENDER'] = 'contact@buildrr.fr'
 
+# Outbox email (envoi asynchrone par le worker)
+app.config['MAIL_OUTBOX_POLL_INTERVAL'] = 5  # secondes entre deux passes quand l'outbox est vide
+app.config['MAIL_OUTBOX_BATCH_SIZE'] = 50
+app.config['MAIL_OUTBOX_MAX_ATTEMPTS'] = 6
+app.config['MAIL_OUTBOX_RETRY_BASE'] = 30  # secondes, doublé à chaque échec
+app.config['MAIL_OUTBOX_RETRY_MAX'] = 3600
+
+# Connexions SMTP réutilisées (par worker)
+app.config['MAIL_TRANSPORT_POOL_SIZE'] = 1
+app.config['MAIL_TRANSPORT_MAX_IDLE'] = 60  # secondes avant de rouvrir une connexion inactive
+app.config['MAIL_TRANSPORT_MAX_MESSAGES'] = 100  # messages par session SMTP
+
+# Hachage des mots de passe dans un pool de process dédié
+app.config['PASSWORD_HASH_WORKERS'] = 2  # process par worker gunicorn (N workers => 2N process de hachage)
+app.config['PASSWORD_HASH_QUEUE_SIZE'] = 32  # au-delà, les requêtes reçoivent un 503
+app.config['PASSWORD_HASH_METHOD'] = None  # ex. 'pbkdf2:sha256:600000' ; None = défaut de werkzeug
+app.config['PASSWORD_HASH_TIMEOUT'] = 10  # secondes
+
+# Statistiques admin lues dans des compteurs tenus à jour à l'écriture
+app.config['STATS_COUNTERS_ENABLED'] = False
+
+# Notifications push (SSE) : chaque flux ouvert occupe un thread du worker (gunicorn --threads)
+app.config['SSE_MAX_STREAMS'] = 8  # flux ouverts par worker, au-delà : 503 ; garder sous --threads
+app.config['SSE_TOKEN_TTL'] = 60  # secondes de validité du jeton de flux (POST /api/dashboard/events/token)
+app.config['SSE_HEARTBEAT_INTERVAL'] = 15  # secondes entre deux commentaires keepalive
+app.config['SSE_POLL_INTERVAL'] = 5  # secondes entre deux lectures des versions (écritures des autres workers)
+app.config['SSE_MAX_DURATION'] = 300  # secondes avant fermeture, le navigateur se reconnecte
+app.config['SSE_RETRY'] = 3000  # millisecondes avant reconnexion
+app.config['SSE_QUEUE_SIZE'] = 100  # événements en attente par flux
+
+# Contrôle d'admission des POST publics (/quote, /contact, /register)
+# Limites : (rafale autorisée, secondes pour regagner un jeton), par IP et par email
+app.config['ADMISSION_ENABLED'] = True
+app.config['ADMISSION_LIMITS'] = {
+    'quote': {'ip': (10, 60), 'email': (3, 600)},
+    'contact': {'ip': (10, 60), 'email': (3, 600)},
+    'register': {'ip': (10, 60), 'email': (3, 600)}
+}
+app.config['ADMISSION_MAX_CONCURRENT'] = 16  # requêtes publiques en cours, tous workers confondus (au-delà : 503)
+app.config['ADMISSION_RETRY_AFTER'] = 1  # secondes suggérées après un 503
+app.config['ADMISSION_PROXY_HOPS'] = 0  # proxys de confiance devant l'app (X-Forwarded-For)
+app.config['ADMISSION_STATE_FILE'] = os.path.join(os.path.dirname(__file__), 'database', 'admission.bin')  # partagé par les workers
+app.config['ADMISSION_SLOTS'] = 65536  # seaux mémorisés (24 octets chacun)
+# Générations des utilisateurs (cache d'authentification), partagées par les workers
+app.config['AUTH_GENERATIONS_FILE'] = os.path.join(os.path.dirname(__file__), 'database', 'auth-generations.bin')
+app.config['AUTH_GENERATIONS_SLOTS'] = 65536  # compteurs de 8 octets
+
+# Métriques (/metrics) : chaque process écrit ses compteurs dans METRICS_DIR, /metrics les additionne
+app.config['METRICS_ENABLED'] = True
+app.config['METRICS_DIR'] = os.path.join(os.path.dirname(__file__), 'database', 'metrics')
+app.config['METRICS_FLUSH_INTERVAL'] = 5  # secondes entre deux écritures par process
+# Accès : un administrateur connecté, ou le scrapeur avec ce secret en Bearer (aucun si non défini)
+app.config['METRICS_SCRAPE_TOKEN'] = os.environ.get('METRICS_SCRAPE_TOKEN')
+
+# Profileur SQL (développement / diagnostic) : instructions, candidats N+1, requêtes lentes + EXPLAIN
+app.config['SQL_PROFILER_ENABLED'] = False
+app.config['SQL_PROFILER_LOG_FILE'] = os.path.join(os.path.dirname(__file__), 'database', 'sql-profile.log')
+app.config['SQL_PROFILER_LOG_STATEMENTS'] = True  # False : seulement bilans, N+1 et requêtes lentes
+app.config['SQL_PROFILER_SLOW_MS'] = 100
+app.config['SQL_PROFILER_N_PLUS_ONE'] = 5  # exécutions de la même instruction dans une requête
+app.config['SQL_PROFILER_EXPLAIN'] = True
+app.config['SQL_PROFILER_LOG_MAX_BYTES'] = 10 * 1024 * 1024
+app.config['SQL_PROFILER_LOG_BACKUPS'] = 5
+
 # Enable CORS for all routes
 CORS(app)
 
@@ -35,13 +108,75 @@ app.register_blueprint(quote_bp, url_prefix='/api')
 app.register_blueprint(contact_bp, url_prefix='/api')
 app.register_blueprint(admin_bp, url_prefix='/api/admin')
 app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(content_bp, url_prefix='/api')
 
 # uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# DATABASE_URL : autre base (ex. celle des benchmarks) sans toucher à app.db
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Profil SQLite pour plusieurs workers gunicorn (WAL, pragmas, attente du verrou d'écriture)
+app.config['SQLITE_PRAGMAS'] = dict(DEFAULT_SQLITE_PRAGMAS)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options(app.config)
+
 db.init_app(app)
 with app.app_context():
-    db.create_all()
+    configure_sqlite(db.engine, app.config)
+    run_migrations(db.engine)
+    ensure_counters()
+    init_metrics(app, db.engine)
+    init_profiler(app, db.engine)
+
+def metrics_response():
+    pending = db.session.query(EmailOutbox.id).filter(EmailOutbox.status.in_(['pending', 'sending'])).count()
+    return Response(render_metrics({'email_outbox_pending': pending}), mimetype='text/plain; version=0.0.4')
+
+@token_required
+@admin_required
+def admin_metrics(current_user):
+    return metrics_response()
+
+@app.route('/metrics')
+def metrics():
+    """Métriques de tous les workers, format texte Prometheus (scrapeur ou administrateur)"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return "Metrics disabled", 404
+    if scrape_token_matches(app.config):
+        return metrics_response()
+    if not request.headers.get('Authorization'):
+        return "Forbidden", 403
+    return admin_metrics()
+
+@app.cli.command('outbox-worker')
+def outbox_worker():
+    """Envoie les emails de l'outbox (à lancer à côté de gunicorn : flask --app main outbox-worker)"""
+    run_worker(app)
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Rejoue chaque route, affiche le plan SQLite de ses requêtes et échoue sur un parcours complet
+
+    Écrit des lignes d'exemple : sur une base vide, ex. DATABASE_URL=sqlite:////tmp/plans.db
+    """
+    if db.session.query(User.id).first() is not None:
+        print("La base contient des données : lancer check-query-plans sur une base vide (DATABASE_URL)")
+        sys.exit(2)
+    report, problems = check_query_plans(app)
+    for route, statement, plan in report:
+        print(f"{route}: {statement}\n    {' | '.join(plan)}")
+    for route, detail in problems:
+        print(f"PROBLÈME {route}: {detail}")
+    if problems:
+        sys.exit(1)
+
+@app.cli.command('rebuild-stats-counters')
+def rebuild_stats_counters():
+    """Recalcule les compteurs de statistiques depuis les tables"""
+    rebuild_counters()
+
+# Manifeste du dossier static construit au démarrage (redémarrer après un déploiement du front)
+app.config['STATIC_PRECOMPRESS'] = False  # True : écrit les .gz/.br manquants au démarrage
+static_manifest = StaticManifest(app.static_folder, precompress=app.config['STATIC_PRECOMPRESS'])
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -50,12 +185,12 @@ def serve(path):
     if static_folder_path is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
+    asset = static_manifest.get(path) if path != "" else None
+    if asset is not None:
+        return serve_asset(asset)
     else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+        if static_manifest.index is not None:
+            return serve_asset(static_manifest.index)
         else:
             return "index.html not found", 404
 
@@ -1,9 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from src.models.user import db, User, Order, Quote, Contact, PrivateMessage, SiteContent
-from src.routes.user import token_required
-from werkzeug.security import generate_password_hash
-from flask_mail import Mail, Message
-from flask import current_app
+from src.routes.user import token_required, invalidate_auth_user
+from src.routes.outbox import queue_email, EmailOutbox
+from src.routes.events import publish
+from src.routes.pagination import paginate, InvalidCursor, encode_cursor, decode_cursor, get_limit
+from src.routes.search import search, SEARCH_INDEXES
+from src.routes.bulk import bulk_update_status, bulk_delete, BulkError
+from src.routes.importer import import_records, InvalidImport, IMPORT_MODELS
+from src.routes.serializers import project, serialize_rows, json_response, CONTACT_FIELDS, MESSAGE_FIELDS, ORDER_FIELDS, QUOTE_FIELDS, USER_FIELDS, ADMIN_THREAD_FIELDS
+from src.routes.quote_features import filter_by_feature, feature_counts
+from src.routes.threads import MessageThread, ThreadMessage, all_threads_query, thread_participants, thread_messages_query, mark_read, unread_messages, THREADS_ORDER, THREAD_MESSAGES_ORDER
+from src.routes.stats import get_totals, build_admin_stats
+from src.routes.dashboard import invalidate_user_stats, delete_user_account
+from src.routes.http_cache import conditional_collection
+from src.routes.hashing import hash_password, HashingBusy, RETRY_AFTER
 import json
 import csv
 import io
@@ -13,22 +23,6 @@ import string
 
 admin_bp = Blueprint('admin', __name__)
 
-def send_email(subject, recipient, body):
-    """Fonction utilitaire pour envoyer des emails"""
-    try:
-        mail = Mail(current_app)
-        msg = Message(
-            subject=subject,
-            recipients=[recipient],
-            body=body,
-            sender=current_app.config['MAIL_DEFAULT_SENDER']
-        )
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print(f"Erreur envoi email: {str(e)}")
-        return False
-
 from functools import wraps
 
 def admin_required(f):
@@ -47,10 +41,13 @@ def admin_required(f):
 @admin_required
 def get_all_users(current_user):
     try:
-        users = User.query.all()
-        return jsonify({
-            'users': [user.to_dict() for user in users]
-        }), 200
+        users, next_cursor = paginate(project(USER_FIELDS), User)
+        return json_response({
+            'users': serialize_rows(USER_FIELDS, users),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -89,14 +86,17 @@ def update_user(current_user, user_id):
         if 'isActive' in data:
             user.is_active = data['isActive']
         if 'password' in data:
-            user.password = generate_password_hash(data['password'])
+            user.password = hash_password(data['password'])
         
         db.session.commit()
+        invalidate_auth_user(user_id)
         
         return jsonify({
             'message': 'User updated successfully',
             'user': user.to_dict()
         }), 200
+    except HashingBusy as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': str(RETRY_AFTER)}
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -109,8 +109,10 @@ def delete_user(current_user, user_id):
         if user.id == current_user.id:
             return jsonify({'message': 'Cannot delete your own account'}), 400
         
-        db.session.delete(user)
+        delete_user_account(user)
         db.session.commit()
+        invalidate_auth_user(user_id)
+        invalidate_user_stats(user_id)
         
         return jsonify({'message': 'User deleted successfully'}), 200
     except Exception as e:
@@ -131,7 +133,7 @@ def create_user(current_user):
             first_name=data['firstName'],
             last_name=data['lastName'],
             email=data['email'],
-            password=generate_password_hash(data['password']),
+            password=hash_password(data['password']),
             company=data.get('company', ''),
             phone=data.get('phone', ''),
             role=data.get('role', 'member')
@@ -144,6 +146,8 @@ def create_user(current_user):
             'message': 'User created successfully',
             'user': new_user.to_dict()
         }), 201
+    except HashingBusy as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': str(RETRY_AFTER)}
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -152,12 +156,16 @@ def create_user(current_user):
 @admin_bp.route('/orders', methods=['GET'])
 @token_required
 @admin_required
+@conditional_collection('orders')
 def get_all_orders(current_user):
     try:
-        orders = Order.query.order_by(Order.created_at.desc()).all()
-        return jsonify({
-            'orders': [order.to_dict() for order in orders]
-        }), 200
+        orders, next_cursor = paginate(project(ORDER_FIELDS), Order)
+        return json_response({
+            'orders': serialize_rows(ORDER_FIELDS, orders),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -181,6 +189,7 @@ def create_order(current_user):
         
         db.session.add(new_order)
         db.session.commit()
+        invalidate_user_stats(data['userId'])
         
         return jsonify({
             'message': 'Order created successfully',
@@ -213,6 +222,8 @@ def update_order(current_user, order_id):
             order.progress = data['progress']
         
         db.session.commit()
+        invalidate_user_stats(order.user_id)
+        publish(order.user_id, 'order', {'orderId': order.id, 'status': order.status, 'progress': order.progress})
         
         return jsonify({
             'message': 'Order updated successfully',
@@ -227,8 +238,10 @@ def update_order(current_user, order_id):
 def delete_order(current_user, order_id):
     try:
         order = Order.query.get_or_404(order_id)
+        user_id = order.user_id
         db.session.delete(order)
         db.session.commit()
+        invalidate_user_stats(user_id)
         
         return jsonify({'message': 'Order deleted successfully'}), 200
     except Exception as e:
@@ -239,11 +252,32 @@ def delete_order(current_user, order_id):
 @admin_bp.route('/quotes', methods=['GET'])
 @token_required
 @admin_required
+@conditional_collection('quotes')
 def get_all_quotes(current_user):
     try:
-        quotes = Quote.query.order_by(Quote.created_at.desc()).all()
+        query = project(QUOTE_FIELDS)
+        feature = request.args.get('feature')
+        if feature:
+            query = filter_by_feature(query, feature)
+        quotes, next_cursor = paginate(query, Quote)
+        return json_response({
+            'quotes': serialize_rows(QUOTE_FIELDS, quotes),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@admin_bp.route('/quotes/features', methods=['GET'])
+@token_required
+@admin_required
+@conditional_collection('quotes')
+def get_quote_features(current_user):
+    try:
+        counts = feature_counts(request.args.get('status'))
         return jsonify({
-            'quotes': [quote.to_dict() for quote in quotes]
+            'features': [{'feature': feature, 'count': count} for feature, count in counts]
         }), 200
     except Exception as e:
         return jsonify({'message': str(e)}), 500
@@ -281,6 +315,67 @@ def delete_quote(current_user, quote_id):
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+# ===== TRAITEMENTS EN MASSE =====
+
+@admin_bp.route('/<any(orders, quotes, contacts):collection>/bulk', methods=['POST'])
+@token_required
+@admin_required
+def bulk_action(current_user, collection):
+    try:
+        data = request.get_json() or {}
+        action = data.get('action')
+        ids = data.get('ids')
+        filters = data.get('filter')
+
+        if action == 'update':
+            results, user_ids = bulk_update_status(collection, data.get('status'), ids, filters)
+        elif action == 'delete':
+            results, user_ids = bulk_delete(collection, ids, filters)
+        else:
+            return jsonify({'message': 'action must be update or delete'}), 400
+
+        if collection == 'orders':
+            invalidate_user_stats(*user_ids)
+
+        count = sum(1 for item in results if item['result'] != 'not_found')
+        return jsonify({
+            'message': f'{count} {collection} {action}d',
+            'count': count,
+            'results': results
+        }), 200
+    except BulkError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+# ===== RECHERCHE =====
+
+@admin_bp.route('/search', methods=['GET'])
+@token_required
+@admin_required
+def search_all(current_user):
+    try:
+        text = request.args.get('q', '').strip()
+        if not text:
+            return jsonify({'message': 'Search query is required'}), 400
+
+        kinds = request.args.get('type')
+        kinds = kinds.split(',') if kinds else list(SEARCH_INDEXES)
+        if any(kind not in SEARCH_INDEXES for kind in kinds):
+            return jsonify({'message': f'Invalid type, expected one of: {", ".join(SEARCH_INDEXES)}'}), 400
+
+        cursor = request.args.get('cursor')
+        position = decode_cursor(cursor) if cursor else None
+        hits, next_position = search(text, kinds, position, get_limit())
+        return jsonify({
+            'results': hits,
+            'nextCursor': encode_cursor(next_position) if next_position else None
+        }), 200
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
 # ===== GESTION DES CONTACTS =====
 
 @admin_bp.route('/contacts', methods=['GET'])
@@ -288,10 +383,13 @@ def delete_quote(current_user, quote_id):
 @admin_required
 def get_all_contacts(current_user):
     try:
-        contacts = Contact.query.order_by(Contact.created_at.desc()).all()
-        return jsonify({
-            'contacts': [contact.to_dict() for contact in contacts]
-        }), 200
+        contacts, next_cursor = paginate(project(CONTACT_FIELDS), Contact)
+        return json_response({
+            'contacts': serialize_rows(CONTACT_FIELDS, contacts),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -335,10 +433,13 @@ def delete_contact(current_user, contact_id):
 @admin_required
 def get_all_messages(current_user):
     try:
-        messages = PrivateMessage.query.order_by(PrivateMessage.created_at.desc()).all()
-        return jsonify({
-            'messages': [message.to_dict() for message in messages]
-        }), 200
+        messages, next_cursor = paginate(project(MESSAGE_FIELDS), PrivateMessage)
+        return json_response({
+            'messages': serialize_rows(MESSAGE_FIELDS, messages),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -349,7 +450,9 @@ def mark_message_read(current_user, message_id):
     try:
         message = PrivateMessage.query.get_or_404(message_id)
         message.is_read = True
+        recipient_id = message.recipient_id
         db.session.commit()
+        invalidate_user_stats(recipient_id)
         
         return jsonify({'message': 'Message marked as read'}), 200
     except Exception as e:
@@ -371,6 +474,8 @@ def send_admin_message(current_user):
         
         db.session.add(new_message)
         db.session.commit()
+        invalidate_user_stats(data['recipientId'])
+        publish(data['recipientId'], 'message', {'messageId': new_message.id, 'senderId': current_user.id, 'subject': new_message.subject})
         
         return jsonify({
             'message': 'Message sent successfully',
@@ -379,6 +484,60 @@ def send_admin_message(current_user):
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+@admin_bp.route('/threads', methods=['GET'])
+@token_required
+@admin_required
+@conditional_collection('messages')
+def get_all_threads(current_user):
+    try:
+        threads, next_cursor = paginate(all_threads_query(project(ADMIN_THREAD_FIELDS)), MessageThread, columns=THREADS_ORDER)
+        threads = serialize_rows(ADMIN_THREAD_FIELDS, threads)
+        participants = thread_participants([thread['id'] for thread in threads])
+        for thread in threads:
+            thread['participants'] = participants[thread['id']]
+        return json_response({
+            'threads': threads,
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@admin_bp.route('/threads/<int:thread_id>/messages', methods=['GET'])
+@token_required
+@admin_required
+@conditional_collection('messages')
+def get_admin_thread_messages(current_user, thread_id):
+    try:
+        if not MessageThread.query.filter_by(id=thread_id).first():
+            return jsonify({'message': 'Thread not found'}), 404
+        messages, next_cursor = paginate(thread_messages_query(project(MESSAGE_FIELDS), thread_id), ThreadMessage, columns=THREAD_MESSAGES_ORDER)
+        return json_response({
+            'messages': serialize_rows(MESSAGE_FIELDS, messages),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@admin_bp.route('/threads/<int:thread_id>/read', methods=['POST'])
+@token_required
+@admin_required
+def mark_admin_thread_read(current_user, thread_id):
+    try:
+        if not MessageThread.query.filter_by(id=thread_id).first():
+            return jsonify({'message': 'Thread not found'}), 404
+        # Seuls les messages adressés à cet admin sont marqués lus
+        count = mark_read(current_user.id, thread_id)
+        db.session.commit()
+        invalidate_user_stats(current_user.id)
+        
+        return jsonify({'message': 'Thread marked as read', 'count': count}), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
 # ===== GESTION DU CONTENU DU SITE =====
 
 @admin_bp.route('/content', methods=['GET'])
@@ -466,112 +625,115 @@ def delete_content(current_user, content_id):
 @admin_required
 def get_admin_stats(current_user):
     try:
-        # Statistiques générales
-        total_users = User.query.count()
-        total_orders = Order.query.count()
-        total_quotes = Quote.query.count()
-        total_contacts = Contact.query.count()
-        unread_messages = PrivateMessage.query.filter_by(recipient_id=current_user.id, is_read=False).count()
-        
-        # Revenus
-        total_revenue = db.session.query(db.func.sum(Order.price)).filter_by(status='completed').scalar() or 0
-        pending_revenue = db.session.query(db.func.sum(Order.price)).filter_by(status='pending').scalar() or 0
-        
-        # Commandes par statut
-        orders_by_status = {
-            'pending': Order.query.filter_by(status='pending').count(),
-            'in_progress': Order.query.filter_by(status='in-progress').count(),
-            'completed': Order.query.filter_by(status='completed').count(),
-            'cancelled': Order.query.filter_by(status='cancelled').count()
-        }
-        
-        # Devis par statut
-        quotes_by_status = {
-            'pending': Quote.query.filter_by(status='pending').count(),
-            'reviewed': Quote.query.filter_by(status='reviewed').count(),
-            'converted': Quote.query.filter_by(status='converted').count(),
-            'rejected': Quote.query.filter_by(status='rejected').count()
-        }
+        # Totaux par requêtes groupées, ou lus dans les compteurs s'ils sont activés
+        totals = get_totals()
+        unread_count = unread_messages(current_user.id)
         
         return jsonify({
-            'stats': {
-                'totalUsers': total_users,
-                'totalOrders': total_orders,
-                'totalQuotes': total_quotes,
-                'totalContacts': total_contacts,
-                'unreadMessages': unread_messages,
-                'totalRevenue': total_revenue,
-                'pendingRevenue': pending_revenue,
-                'ordersByStatus': orders_by_status,
-                'quotesByStatus': quotes_by_status
-            }
+            'stats': build_admin_stats(totals, unread_count)
         }), 200
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
 # ===== EXPORT/IMPORT DE DONNÉES =====
 
+EXPORT_CHUNK_SIZE = 1000  # lignes lues par aller-retour en base
+EXPORT_FLUSH_SIZE = 64 * 1024  # octets de CSV accumulés avant d'être envoyés
+
+def _export_query(data_type):
+    """En-tête et requête de l'export ; la date de création est toujours la dernière colonne"""
+    if data_type == 'users':
+        return ['ID', 'Prénom', 'Nom', 'Email', 'Entreprise', 'Téléphone', 'Rôle', 'Actif', 'Date création'], db.session.query(
+            User.id, User.first_name, User.last_name, User.email,
+            User.company, User.phone, User.role, User.is_active,
+            User.created_at
+        ).order_by(User.id)
+    
+    if data_type == 'orders':
+        return ['ID', 'Titre', 'Type', 'Statut', 'Prix', 'Progression', 'Utilisateur', 'Date création'], db.session.query(
+            Order.order_id, Order.title, Order.type, Order.status,
+            Order.price, Order.progress, Order.user_id,
+            Order.created_at
+        ).order_by(Order.id)
+    
+    if data_type == 'quotes':
+        return ['ID', 'Type projet', 'Entreprise', 'Email', 'Prix estimé', 'Statut', 'Date création'], db.session.query(
+            Quote.id, Quote.project_type, Quote.company, Quote.email,
+            Quote.estimated_price, Quote.status,
+            Quote.created_at
+        ).order_by(Quote.id)
+    
+    if data_type == 'contacts':
+        return ['ID', 'Nom', 'Email', 'Entreprise', 'Sujet', 'Statut', 'Date création'], db.session.query(
+            Contact.id, Contact.name, Contact.email, Contact.company,
+            Contact.subject, Contact.status,
+            Contact.created_at
+        ).order_by(Contact.id)
+    
+    return None, None
+
+def _stream_csv(header, query):
+    """Génère le CSV par morceaux à mesure que les lignes arrivent de la base"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(header)
+    
+    for row in query.yield_per(EXPORT_CHUNK_SIZE):
+        created_at = row[-1]
+        writer.writerow(list(row[:-1]) + [created_at.strftime('%Y-%m-%d %H:%M:%S') if created_at else ''])
+        if output.tell() >= EXPORT_FLUSH_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    
+    yield output.getvalue()
+
 @admin_bp.route('/export/<string:data_type>', methods=['GET'])
 @token_required
 @admin_required
 def export_data(current_user, data_type):
     try:
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        if data_type == 'users':
-            users = User.query.all()
-            writer.writerow(['ID', 'Prénom', 'Nom', 'Email', 'Entreprise', 'Téléphone', 'Rôle', 'Actif', 'Date création'])
-            for user in users:
-                writer.writerow([
-                    user.id, user.first_name, user.last_name, user.email,
-                    user.company, user.phone, user.role, user.is_active,
-                    user.created_at.strftime('%Y-%m-%d %H:%M:%S') if user.created_at else ''
-                ])
-        
-        elif data_type == 'orders':
-            orders = Order.query.all()
-            writer.writerow(['ID', 'Titre', 'Type', 'Statut', 'Prix', 'Progression', 'Utilisateur', 'Date création'])
-            for order in orders:
-                writer.writerow([
-                    order.order_id, order.title, order.type, order.status,
-                    order.price, order.progress, order.user_id,
-                    order.created_at.strftime('%Y-%m-%d %H:%M:%S') if order.created_at else ''
-                ])
-        
-        elif data_type == 'quotes':
-            quotes = Quote.query.all()
-            writer.writerow(['ID', 'Type projet', 'Entreprise', 'Email', 'Prix estimé', 'Statut', 'Date création'])
-            for quote in quotes:
-                writer.writerow([
-                    quote.id, quote.project_type, quote.company, quote.email,
-                    quote.estimated_price, quote.status,
-                    quote.created_at.strftime('%Y-%m-%d %H:%M:%S') if quote.created_at else ''
-                ])
-        
-        elif data_type == 'contacts':
-            contacts = Contact.query.all()
-            writer.writerow(['ID', 'Nom', 'Email', 'Entreprise', 'Sujet', 'Statut', 'Date création'])
-            for contact in contacts:
-                writer.writerow([
-                    contact.id, contact.name, contact.email, contact.company,
-                    contact.subject, contact.status,
-                    contact.created_at.strftime('%Y-%m-%d %H:%M:%S') if contact.created_at else ''
-                ])
-        
-        else:
+        header, query = _export_query(data_type)
+        if query is None:
             return jsonify({'message': 'Invalid data type'}), 400
         
-        output.seek(0)
-        return jsonify({
-            'data': output.getvalue(),
-            'filename': f'{data_type}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        }), 200
+        filename = f'{data_type}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        return Response(
+            stream_with_context(_stream_csv(header, query)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
         
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+IMPORT_MIMETYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson'
+}
 
+@admin_bp.route('/import/<string:data_type>', methods=['POST'])
+@token_required
+@admin_required
+def import_data(current_user, data_type):
+    try:
+        if data_type not in IMPORT_MODELS:
+            return jsonify({'message': 'Invalid data type'}), 400
+
+        # Corps brut (pas de multipart) : lu en flux, en mémoire bornée
+        data_format = request.args.get('format') or IMPORT_MIMETYPES.get(request.mimetype)
+        importer = import_records(data_type, data_format, request.stream)
+        if data_type == 'orders':
+            invalidate_user_stats(*importer.user_ids)
+
+        summary = importer.summary()
+        return jsonify(dict(summary, message=f'{summary["imported"]} {data_type} imported, {summary["failed"]} failed')), 200
+    except InvalidImport as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
 
 # ===== GESTION DES RÉPONSES AUX DEVIS =====
 
@@ -589,8 +751,6 @@ def admin_respond_to_quote(current_user, quote_id):
         quote.responded_at = datetime.utcnow()
         quote.status = 'sent'
         
-        db.session.commit()
-        
         # Envoyer email selon le type de compte
         if quote.has_account:
             # Email pour utilisateur avec compte
@@ -640,14 +800,30 @@ Buildrr - Build Smart
 Email: contact@buildrr.fr
             """
         
-        # Envoyer l'email au client
-        send_email(subject, quote.email, email_body)
+        # L'email au client part avec la mise à jour du devis
+        email = queue_email(subject, quote.email, email_body)
+        db.session.commit()
+        publish(quote.user_id, 'quote', {'quoteId': quote.id, 'status': quote.status, 'adminPrice': quote.admin_price})
         
         return jsonify({
             'message': 'Response sent successfully',
-            'quote': quote.to_dict()
+            'quote': quote.to_dict(),
+            'emailId': email.id,
+            'emailStatus': email.status
         }), 200
         
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+@admin_bp.route('/emails/<int:email_id>', methods=['GET'])
+@token_required
+@admin_required
+def get_email(current_user, email_id):
+    """Suivi d'un email de l'outbox (id renvoyé par les routes qui en mettent un en file)"""
+    try:
+        email = EmailOutbox.query.get_or_404(email_id)
+        return jsonify({
+            'email': email.to_dict()
+        }), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
@@ -0,0 +1,255 @@
+from flask import current_app, request, jsonify
+from functools import wraps
+from contextlib import contextmanager
+from src.routes.cache import map_shared_file
+import hashlib
+import math
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Contrôle d'admission des POST publics (devis, contact, inscription) :
+# - seaux à jetons par IP et par email, partagés entre les workers gunicorn
+#   via un fichier mappé en mémoire (verrou fcntl) -> 429 + Retry-After ;
+# - plafond global de requêtes publiques en cours, tous workers confondus -> 503.
+# Sans fcntl (Windows), l'état reste propre au process.
+
+MAGIC = b'ADMSv1\0\0'
+HEADER = struct.Struct('<8sQ')
+PROCESS = struct.Struct('<ii')  # pid, requêtes en cours
+BUCKET = struct.Struct('<Qdd')  # empreinte de la clé, jetons, date de mise à jour
+MAX_PROCESSES = 64
+PROBES = 8  # emplacements examinés par clé (adressage ouvert)
+
+# Fichier d'état inutilisable (droits, disque plein, mmap refusé) : requête admise, avec un log
+STATE_ERRORS = (OSError, ValueError, struct.error)
+
+class AdmissionState:
+    """Table de seaux à jetons et compteurs de requêtes en cours, dans un fichier partagé"""
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self.size = HEADER.size + MAX_PROCESSES * PROCESS.size + slots * BUCKET.size
+        self._buckets_offset = HEADER.size + MAX_PROCESSES * PROCESS.size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+    def _open(self):
+        # Un descripteur par process : les verrous flock ne séparent pas un parent de ses enfants
+        if self._pid == os.getpid():
+            return
+        if self.path and fcntl is not None:
+            # Taille différente (ADMISSION_SLOTS changé) : fichier neuf renommé en place, jamais
+            # tronqué sous les workers qui l'ont mappé. Un échec est réessayé à la requête suivante.
+            fd, data = map_shared_file(self.path, self.size, self._initialize)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    magic, slots = HEADER.unpack_from(data, 0)
+                    if magic != MAGIC or slots != self.slots:
+                        # Contenu d'un autre format, même taille : remis à zéro sans changer la taille
+                        self._initialize(data)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            except BaseException:
+                data.close()
+                os.close(fd)
+                raise
+            self._fd, self._map = fd, data
+        else:
+            self._map = bytearray(self.size)
+            self._initialize(self._map)
+        self._pid = os.getpid()
+
+    def _initialize(self, data):
+        data[:] = bytes(self.size)
+        HEADER.pack_into(data, 0, MAGIC, self.slots)
+
+    @contextmanager
+    def _locked(self):
+        """Données partagées, verrouillées entre threads (lock) et entre process (flock)"""
+        with self._lock:
+            self._open()
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # ===== SEAUX À JETONS =====
+
+    def _find(self, data, digest, now, capacity, period):
+        """Emplacement de la clé : existant, libre, plein depuis longtemps, ou le plus ancien"""
+        start = digest % self.slots
+        reusable = None
+        oldest = None
+        for probe in range(PROBES):
+            index = (start + probe) % self.slots
+            offset = self._buckets_offset + index * BUCKET.size
+            key, tokens, updated = BUCKET.unpack_from(data, offset)
+            if key == digest:
+                return offset, tokens, updated
+            if reusable is None and (key == 0 or now - updated >= capacity * period):
+                reusable = offset
+            if oldest is None or updated < oldest[1]:
+                oldest = (offset, updated)
+        return (reusable if reusable is not None else oldest[0]), None, None
+
+    def take(self, buckets, now=None):
+        """Prend un jeton dans chaque seau [(clé, capacité, secondes par jeton)], tous ou aucun
+
+        Retourne 0 si la requête est admise, sinon le délai d'attente en secondes.
+        """
+        now = now or time.time()
+        with self._locked() as data:
+            entries = []
+            wait = 0
+            for key, capacity, period in buckets:
+                digest = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+                offset, tokens, updated = self._find(data, digest, now, capacity, period)
+                tokens = capacity if tokens is None else min(capacity, tokens + (now - updated) / period)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) * period)
+                entries.append((offset, digest, tokens))
+
+            for offset, digest, tokens in entries:
+                BUCKET.pack_into(data, offset, digest, tokens if wait else tokens - 1, now)
+            return wait
+
+    # ===== REQUÊTES EN COURS =====
+
+    def _processes(self, data):
+        for index in range(MAX_PROCESSES):
+            offset = HEADER.size + index * PROCESS.size
+            pid, count = PROCESS.unpack_from(data, offset)
+            yield offset, pid, count
+
+    def _reap(self, data):
+        """Oublie les compteurs des process morts (worker tué en pleine requête)"""
+        for offset, pid, count in self._processes(data):
+            if pid and pid != os.getpid():
+                try:
+                    os.kill(pid, 0)
+                except ProcessLookupError:
+                    PROCESS.pack_into(data, offset, 0, 0)
+                except PermissionError:
+                    pass
+
+    def enter(self, limit):
+        """Compte une requête en cours si le total reste sous `limit` ; False sinon"""
+        with self._locked() as data:
+            total = sum(count for _, pid, count in self._processes(data) if pid)
+            if total >= limit:
+                self._reap(data)
+                total = sum(count for _, pid, count in self._processes(data) if pid)
+                if total >= limit:
+                    return False
+
+            pid = os.getpid()
+            free = None
+            for offset, slot_pid, count in self._processes(data):
+                if slot_pid == pid:
+                    PROCESS.pack_into(data, offset, pid, count + 1)
+                    return True
+                if free is None and (slot_pid == 0 or count == 0):
+                    free = offset
+            if free is None:
+                self._reap(data)
+                free = next((offset for offset, slot_pid, _ in self._processes(data) if slot_pid == 0), None)
+                if free is None:
+                    return True  # plus de place dans la table : on admet sans compter
+            PROCESS.pack_into(data, free, pid, 1)
+            return True
+
+    def leave(self):
+        with self._locked() as data:
+            pid = os.getpid()
+            for offset, slot_pid, count in self._processes(data):
+                if slot_pid == pid:
+                    PROCESS.pack_into(data, offset, pid, max(count - 1, 0))
+                    return
+
+def get_state(app=None):
+    app = app or current_app._get_current_object()
+    state = app.extensions.get('admission')
+    if state is None:
+        state = app.extensions['admission'] = AdmissionState(
+            app.config.get('ADMISSION_STATE_FILE'),
+            app.config.get('ADMISSION_SLOTS', 65536)
+        )
+    return state
+
+def client_ip():
+    """IP du client ; derrière N proxys de confiance, l'adresse ajoutée par le plus proche"""
+    hops = current_app.config.get('ADMISSION_PROXY_HOPS', 0)
+    route = request.access_route
+    if hops and len(route) >= hops:
+        return route[-hops]
+    return request.remote_addr or 'unknown'
+
+def _request_email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+def _too_many(wait):
+    retry_after = max(1, math.ceil(wait))
+    return jsonify({'message': 'Too many requests, please retry later'}), 429, {'Retry-After': str(retry_after)}
+
+def _state_unavailable(error):
+    current_app.logger.warning('Admission state unavailable, request admitted without control: %s', error)
+
+def admission_control(rule):
+    """Plafond de requêtes en cours puis seaux par IP et par email (ADMISSION_LIMITS[rule])
+
+    Le plafond est vérifié d'abord : une requête refusée en 503 ne consomme pas de jeton.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            config = current_app.config
+            if not config.get('ADMISSION_ENABLED', True):
+                return f(*args, **kwargs)
+
+            limits = config['ADMISSION_LIMITS'][rule]
+            buckets = [(f'{rule}:ip:{client_ip()}',) + tuple(limits['ip'])]
+            email = _request_email()
+            if email and 'email' in limits:
+                buckets.append((f'{rule}:email:{email}',) + tuple(limits['email']))
+
+            state = get_state()
+            try:
+                admitted = state.enter(config['ADMISSION_MAX_CONCURRENT'])
+            except STATE_ERRORS as e:
+                _state_unavailable(e)
+                return f(*args, **kwargs)
+            if not admitted:
+                retry_after = str(config.get('ADMISSION_RETRY_AFTER', 1))
+                return jsonify({'message': 'Server busy, please retry later'}), 503, {'Retry-After': retry_after}
+            try:
+                try:
+                    wait = state.take(buckets)
+                except STATE_ERRORS as e:
+                    _state_unavailable(e)
+                    wait = 0
+                if wait:
+                    return _too_many(wait)
+                return f(*args, **kwargs)
+            finally:
+                try:
+                    state.leave()
+                except STATE_ERRORS as e:
+                    _state_unavailable(e)
+        return decorated
+    return decorator
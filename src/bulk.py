@@ -0,0 +1,155 @@
+from src.models.user import db, Order, Quote, Contact
+from src.routes.changes import ChangeSet, apply_changes
+from src.routes.stats import contribution
+from src.routes.events import publish
+from src.routes.quote_features import QuoteFeature
+from datetime import datetime
+
+# Traitements en masse de l'admin : un SELECT des lignes visées puis un seul UPDATE/DELETE,
+# dans une transaction. Ces requêtes ne passent pas par le hook after_flush : leur effet sur
+# les versions des collections et les compteurs (deltas calculés depuis les lignes visées)
+# passe par un ChangeSet ; l'index FTS suit par ses triggers.
+BULK_MAX_ROWS = 1000
+BULK_MODELS = {'orders': Order, 'quotes': Quote, 'contacts': Contact}
+
+# Colonnes lues sur les lignes visées (NULL quand le modèle ne les a pas) : propriétaire,
+# contribution aux compteurs et contenu des événements SSE
+TARGET_COLUMNS = ('id', 'user_id', 'status', 'price', 'progress', 'admin_price')
+
+class BulkError(ValueError):
+    """Requête de traitement en masse invalide"""
+
+def _parse_ids(ids):
+    if not isinstance(ids, list):
+        raise BulkError('ids must be a list')
+    try:
+        ids = list(dict.fromkeys(int(value) for value in ids))
+    except (TypeError, ValueError):
+        raise BulkError('ids must be integers')
+    if len(ids) > BULK_MAX_ROWS:
+        raise BulkError(f'At most {BULK_MAX_ROWS} ids per request')
+    return ids
+
+def _parse_date(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise BulkError('Invalid date in filter')
+
+def _filter_clauses(model, filters):
+    """Filtre JSON -> conditions SQL (status, userId, createdAfter, createdBefore)"""
+    if not isinstance(filters, dict):
+        raise BulkError('filter must be an object')
+    clauses = []
+    for key, value in filters.items():
+        if key == 'status':
+            clauses.append(model.status == value)
+        elif key == 'userId' and hasattr(model, 'user_id'):
+            clauses.append(model.user_id == value)
+        elif key == 'createdAfter':
+            clauses.append(model.created_at >= _parse_date(value))
+        elif key == 'createdBefore':
+            clauses.append(model.created_at < _parse_date(value))
+        else:
+            raise BulkError(f'Unsupported filter: {key}')
+    return clauses
+
+def select_targets(model, ids=None, filters=None):
+    """Lignes (TARGET_COLUMNS) visées par la liste d'ids et/ou le filtre"""
+    if ids is None and not filters:
+        raise BulkError('ids or filter is required')
+    query = db.session.query(*[
+        (getattr(model, name) if hasattr(model, name) else db.literal(None)).label(name)
+        for name in TARGET_COLUMNS
+    ])
+    if ids is not None:
+        query = query.filter(model.id.in_(ids))
+    if filters:
+        query = query.filter(*_filter_clauses(model, filters))
+    rows = query.order_by(model.id).limit(BULK_MAX_ROWS + 1).all()
+    if len(rows) > BULK_MAX_ROWS:
+        raise BulkError(f'Filter matches more than {BULK_MAX_ROWS} rows, narrow it down')
+    return rows
+
+def _results(ids, found, outcome):
+    """Résultat par id : ids demandés dans l'ordre reçu, sinon les lignes trouvées par le filtre"""
+    if ids is None:
+        return [{'id': row_id, 'result': outcome} for row_id in found]
+    return [{'id': row_id, 'result': outcome if row_id in found else 'not_found'} for row_id in ids]
+
+def _collections(collection, user_ids):
+    if collection == 'orders':
+        return {'orders'} | {f'orders.user.{user_id}' for user_id in user_ids}
+    if collection == 'quotes':
+        return {'quotes'} | {f'quotes.user.{user_id}' for user_id in user_ids}
+    return set()
+
+def _commit(model, collection, rows, status=None):
+    """Versions des collections et compteurs des lignes retirées (status=None) ou passées à `status`"""
+    changes = ChangeSet()
+    changes.touch(_collections(collection, {row.user_id for row in rows if row.user_id is not None}))
+    for row in rows:
+        changes.count(contribution(model, row.status, row.price), -1)
+        if status is not None:
+            changes.count(contribution(model, status, row.price))
+    apply_changes(changes)
+    db.session.commit()
+
+def _publish_status(model, rows, status):
+    """Mêmes événements que les routes unitaires, pour les propriétaires des lignes"""
+    for row in rows:
+        if row.user_id is None:
+            continue
+        if model is Order:
+            publish(row.user_id, 'order', {'orderId': row.id, 'status': status, 'progress': row.progress})
+        elif model is Quote:
+            publish(row.user_id, 'quote', {'quoteId': row.id, 'status': status, 'adminPrice': row.admin_price})
+
+def bulk_update_status(collection, status, ids=None, filters=None):
+    """Change le statut de toutes les lignes visées ; retourne (résultats par id, user_ids touchés)"""
+    if not isinstance(status, str) or not status:
+        raise BulkError('status is required')
+    model = BULK_MODELS[collection]
+    ids = _parse_ids(ids) if ids is not None else None
+    try:
+        rows = select_targets(model, ids, filters)
+        found = [row.id for row in rows]
+        user_ids = {row.user_id for row in rows if row.user_id is not None}
+        if found:
+            values = {'status': status}
+            if model is Order and status == 'completed':
+                values['completed_at'] = datetime.utcnow()
+            db.session.execute(
+                db.update(model).where(model.id.in_(found)).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            _commit(model, collection, rows, status)
+            _publish_status(model, rows, status)
+        return _results(ids, set(found), 'updated'), user_ids
+    except Exception:
+        db.session.rollback()
+        raise
+
+def bulk_delete(collection, ids=None, filters=None):
+    """Supprime toutes les lignes visées ; retourne (résultats par id, user_ids touchés)"""
+    model = BULK_MODELS[collection]
+    ids = _parse_ids(ids) if ids is not None else None
+    try:
+        rows = select_targets(model, ids, filters)
+        found = [row.id for row in rows]
+        user_ids = {row.user_id for row in rows if row.user_id is not None}
+        if found:
+            if model is Quote:
+                db.session.execute(
+                    db.delete(QuoteFeature).where(QuoteFeature.quote_id.in_(found))
+                    .execution_options(synchronize_session=False)
+                )
+            db.session.execute(
+                db.delete(model).where(model.id.in_(found))
+                .execution_options(synchronize_session=False)
+            )
+            _commit(model, collection, rows)
+        return _results(ids, set(found), 'deleted'), user_ids
+    except Exception:
+        db.session.rollback()
+        raise
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class TTLCache:
+    """Cache LRU en mémoire, borné en nombre d'entrées, chaque entrée expire après `ttl` secondes
+
+    Le cache est propre à chaque worker : les invalidations ne sont vues que par le
+    process qui les fait, le TTL borne le décalage entre workers.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=None):
+        """Ajoute une entrée ; `expires_at` (timestamp) raccourcit le TTL si besoin"""
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            self._data[key] = (deadline, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+# ===== ÉTAT PARTAGÉ ENTRE WORKERS =====
+
+def _replace_file(path, size, initialize):
+    data = bytearray(size)
+    initialize(data)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def map_shared_file(path, size, initialize):
+    """(descripteur, mmap) d'un fichier de `size` octets partagé par les workers
+
+    Un fichier d'une autre taille (première ouverture, changement de configuration) n'est
+    jamais tronqué sur place : un autre process peut l'avoir mappé et mourrait d'un SIGBUS
+    au prochain accès. Le fichier attendu est écrit à côté (`initialize` remplit son contenu)
+    puis renommé à sa place ; les anciens mappings gardent l'ancien inode.
+    """
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        shared = None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                # Remplacé entre open et flock : on rouvre le fichier en place
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    if os.fstat(fd).st_size == size:
+                        shared = mmap.mmap(fd, size)
+                    else:
+                        _replace_file(path, size, initialize)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except BaseException:
+            os.close(fd)
+            raise
+        if shared is not None:
+            return fd, shared
+        os.close(fd)
+
+COUNTER = struct.Struct('<Q')
+
+class SharedGenerations:
+    """Compteurs de génération par clé, partagés entre les workers (fichier mappé en mémoire)
+
+    Une écriture incrémente le compteur de la clé ; une entrée de cache garde le compteur lu
+    avant son chargement et ne vaut plus rien dès qu'il a changé, quel que soit le worker qui
+    a écrit. La lecture est un accès mémoire, sans requête ni appel système. Plusieurs clés
+    peuvent partager un compteur : au pire une invalidation de trop. Sans fichier (ou sans
+    fcntl), les compteurs restent propres au process.
+    """
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+    def _open(self):
+        # Un descripteur par process (voir admission.AdmissionState._open)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self.path and fcntl is not None:
+                self._fd, self._map = map_shared_file(self.path, self.slots * COUNTER.size, lambda data: None)
+            else:
+                self._fd, self._map = None, bytearray(self.slots * COUNTER.size)
+            self._pid = os.getpid()
+
+    def _offset(self, key):
+        digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') % self.slots * COUNTER.size
+
+    def get(self, key):
+        self._open()
+        return COUNTER.unpack_from(self._map, self._offset(key))[0]
+
+    def bump(self, key):
+        """À appeler après le commit de l'écriture qui rend les entrées de `key` obsolètes"""
+        self._open()
+        offset = self._offset(key)
+        with self._lock:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                value = COUNTER.unpack_from(self._map, offset)[0]
+                COUNTER.pack_into(self._map, offset, value + 1)
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
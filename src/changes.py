@@ -0,0 +1,71 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.models.user import db
+from collections import defaultdict
+
+# Données dérivées des écritures : compteurs de statistiques, versions des collections (ETag),
+# fils de discussion. Un seul hook after_flush parcourt une fois les lignes ajoutées, modifiées
+# et supprimées, et chaque module abonné décrit leur effet dans un ChangeSet.
+# Les écritures Core (traitements en masse, import, mark_read) ne passent pas par le flush :
+# elles remplissent elles-mêmes un ChangeSet et appellent apply_changes dans leur transaction.
+
+class ChangeSet:
+    """Effet d'une écriture sur les données dérivées, appliqué par apply_changes"""
+
+    def __init__(self):
+        self.counters = defaultdict(float)  # compteur de statistiques -> delta
+        self.collections = set()  # collections dont la version change
+
+    def count(self, contribution, sign=1):
+        """Ajoute (sign=1) ou retire (sign=-1) la contribution d'une ligne aux compteurs"""
+        for name, value in contribution.items():
+            self.counters[name] += sign * value
+
+    def touch(self, names):
+        self.collections |= set(names)
+
+_row_handlers = []
+_appliers = []
+
+def on_row_change(handler):
+    """Abonne handler(changes, connection, obj, state) au flush ; state : 'new', 'dirty' ou 'deleted'"""
+    _row_handlers.append(handler)
+    return handler
+
+def on_apply(applier):
+    """Abonne applier(changes, connection) : écrit sa part d'un ChangeSet"""
+    _appliers.append(applier)
+    return applier
+
+def _load_previous(target, value, oldvalue, initiator):
+    return value
+
+def track_previous(*attributes):
+    """Charge l'ancienne valeur de ces attributs à l'affectation, même expirés (après un commit)
+
+    Sans elle, l'historique d'un attribut expiré n'a pas de valeur précédente et le delta
+    d'un changement (statut, lu/non lu, propriétaire) serait nul.
+    """
+    for attribute in attributes:
+        event.listen(attribute, 'set', _load_previous, active_history=True, retval=True)
+
+def apply_changes(changes, connection=None):
+    """Écrit les deltas d'un ChangeSet dans la transaction en cours (le commit reste à l'appelant)"""
+    connection = connection or db.session.connection()
+    for applier in _appliers:
+        applier(changes, connection)
+
+@event.listens_for(Session, 'after_flush')
+def _dispatch(session, flush_context):
+    rows = [(obj, 'new') for obj in session.new]
+    rows += [(obj, 'dirty') for obj in session.dirty if obj not in session.new and session.is_modified(obj)]
+    rows += [(obj, 'deleted') for obj in session.deleted]
+    if not rows:
+        return
+
+    changes = ChangeSet()
+    connection = session.connection()
+    for obj, state in rows:
+        for handler in _row_handlers:
+            handler(changes, connection, obj, state)
+    apply_changes(changes, connection)
@@ -1,26 +1,14 @@
-from flask import Blueprint, request, jsonify, current_app
-from flask_mail import Mail, Message
+from flask import Blueprint, request, jsonify
 from src.models.user import db, Contact
+from src.routes.outbox import queue_email
+from src.routes.pagination import paginate, InvalidCursor
+from src.routes.serializers import project, serialize_rows, json_response, CONTACT_FIELDS
+from src.routes.admission import admission_control
 
 contact_bp = Blueprint('contact', __name__)
 
-def send_email(subject, recipient, body):
-    """Fonction utilitaire pour envoyer des emails"""
-    try:
-        mail = Mail(current_app)
-        msg = Message(
-            subject=subject,
-            recipients=[recipient],
-            body=body,
-            sender=current_app.config['MAIL_DEFAULT_SENDER']
-        )
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print(f"Erreur envoi email: {str(e)}")
-        return False
-
 @contact_bp.route('/contact', methods=['POST'])
+@admission_control('contact')
 def submit_contact():
     try:
         data = request.get_json()
@@ -36,7 +24,7 @@ def submit_contact():
         )
         
         db.session.add(new_contact)
-        db.session.commit()
+        db.session.flush()
         
         # Préparer l'email
         email_subject = f"Nouveau message de contact - {data['subject']}"
@@ -60,13 +48,15 @@ ID du message: {new_contact.id}
 Pour répondre à ce message, connectez-vous au dashboard admin.
         """
         
-        # Envoyer l'email
-        email_sent = send_email(email_subject, 'contact@buildrr.fr', email_body)
+        # L'email est enregistré dans la même transaction que le message
+        email = queue_email(email_subject, 'contact@buildrr.fr', email_body)
+        db.session.commit()
         
         return jsonify({
             'message': 'Contact message submitted successfully',
             'contactId': new_contact.id,
-            'emailSent': email_sent
+            'emailId': email.id,
+            'emailStatus': email.status
         }), 201
         
     except Exception as e:
@@ -75,11 +65,14 @@ Pour répondre à ce message, connectez-vous au dashboard admin.
 @contact_bp.route('/contacts', methods=['GET'])
 def get_contacts():
     try:
-        contacts = Contact.query.order_by(Contact.created_at.desc()).all()
-        return jsonify({
-            'contacts': [contact.to_dict() for contact in contacts]
-        }), 200
+        contacts, next_cursor = paginate(project(CONTACT_FIELDS), Contact)
+        return json_response({
+            'contacts': serialize_rows(CONTACT_FIELDS, contacts),
+            'nextCursor': next_cursor
+        })
         
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -0,0 +1,69 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.models.user import db, SiteContent
+from src.routes.cache import TTLCache
+from src.routes.http_cache import CollectionVersion
+from src.routes.serializers import project, serialize_rows, dumps, CONTENT_SECTION_FIELDS
+import hashlib
+
+content_bp = Blueprint('content', __name__)
+
+# Contenu public du site : par page, le JSON des sections actives est construit une fois
+# puis servi depuis la mémoire du worker. Chaque écriture de l'admin incrémente la version
+# content.page.<nom> dans sa transaction (voir http_cache.collections_touched) : une lecture
+# par clé primaire suffit à savoir si le bundle en mémoire est encore celui de la base,
+# quel que soit le worker qui a écrit.
+CONTENT_CACHE_SIZE = 256  # pages
+CONTENT_CACHE_TTL = 3600  # secondes, libère les pages qui ne sont plus lues
+content_cache = TTLCache(CONTENT_CACHE_SIZE, CONTENT_CACHE_TTL)  # page -> (version, corps, ETag)
+
+def page_content_query(page_name):
+    return project(CONTENT_SECTION_FIELDS).filter(
+        SiteContent.page_name == page_name,
+        SiteContent.is_active.is_(True)
+    ).order_by(SiteContent.section_name, SiteContent.id)
+
+def build_page_bundle(page_name):
+    """(corps JSON, ETag) de la page ; (None, None) si elle n'a aucune section active"""
+    sections = serialize_rows(CONTENT_SECTION_FIELDS, page_content_query(page_name).all())
+    if not sections:
+        return None, None
+    updated = [section['updatedAt'] for section in sections if section['updatedAt']]
+    body = dumps({
+        'page': page_name,
+        'sections': sections,
+        'updatedAt': max(updated) if updated else None
+    })
+    return body, hashlib.sha1(body).hexdigest()
+
+def page_version(page_name):
+    return db.session.query(CollectionVersion.version).filter(
+        CollectionVersion.name == f'content.page.{page_name}'
+    ).scalar() or 0
+
+def get_page_bundle(page_name):
+    # Version lue avant les sections : au pire un bundle plus récent que sa version est reconstruit une fois
+    version = page_version(page_name)
+    cached = content_cache.get(page_name)
+    if cached is not None and cached[0] == version:
+        return cached[1:]
+    bundle = build_page_bundle(page_name)
+    content_cache.set(page_name, (version,) + bundle)
+    return bundle
+
+@content_bp.route('/content/<string:page_name>', methods=['GET'])
+def get_page_content(page_name):
+    try:
+        body, etag = get_page_bundle(page_name)
+        if body is None:
+            return jsonify({'message': 'Page not found'}), 404
+
+        # « If-None-Match: * » : le client a déjà une version de la page, quelle qu'elle soit
+        if request.if_none_match.star_tag or request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'public, no-cache'
+        return response
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
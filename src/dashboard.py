@@ -1,12 +1,47 @@
-from flask import Blueprint, request, jsonify
-from src.models.user import db, User, Order, PrivateMessage
-from src.routes.user import token_required
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import Blueprint, request, jsonify, Response, current_app
+from src.models.user import db, User, Order, Quote, PrivateMessage
+from src.routes.user import token_required, stream_token_required, issue_stream_token, invalidate_auth_user
+from src.routes.events import event_stream, open_stream, close_stream, publish
+from src.routes.pagination import paginate, keyset_page, get_limit, encode_cursor, decode_cursor, InvalidCursor
+from src.routes.serializers import project, serialize_rows, json_response, ORDER_FIELDS, QUOTE_FIELDS, MESSAGE_FIELDS, THREAD_FIELDS
+from src.routes.threads import ThreadParticipant, ThreadMessage, inbox_query, thread_messages_query, is_participant, mark_read, unread_messages, INBOX_ORDER, THREAD_MESSAGES_ORDER
+from src.routes.cache import TTLCache
+from src.routes.http_cache import conditional_collection, collection_versions
+from src.routes.hashing import hash_password, verify_password, HashingBusy, RETRY_AFTER
 import random
 import string
+from datetime import datetime
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+# Statistiques du dashboard par utilisateur : user_id -> (versions, stats). Une entrée ne sert
+# que si les versions des collections orders.user.{id} et messages.user.{id} n'ont pas bougé :
+# une écriture faite par n'importe quel worker (ou hors des routes) la rend obsolète.
+USER_STATS_CACHE_SIZE = 10000
+USER_STATS_CACHE_TTL = 60  # secondes
+user_stats_cache = TTLCache(USER_STATS_CACHE_SIZE, USER_STATS_CACHE_TTL)
+
+def user_stats_versions(user_id):
+    return collection_versions([f'orders.user.{user_id}', f'messages.user.{user_id}'])
+
+def invalidate_user_stats(*user_ids):
+    """Libère tout de suite les entrées des utilisateurs touchés (les versions suffisent à les écarter)"""
+    for user_id in user_ids:
+        user_stats_cache.pop(user_id)
+
+def delete_user_account(user):
+    """Supprime l'utilisateur avec ses messages et détache ses devis ; le commit reste à l'appelant
+
+    Les clés étrangères sont vérifiées par SQLite : rien ne doit plus pointer vers l'utilisateur.
+    """
+    messages = PrivateMessage.query.filter(db.or_(PrivateMessage.sender_id == user.id,
+                                                  PrivateMessage.recipient_id == user.id))
+    for message in messages:
+        db.session.delete(message)
+    for quote in Quote.query.filter_by(user_id=user.id):
+        quote.user_id = None
+    db.session.delete(user)
+
 def generate_order_id():
     """Génère un ID de commande unique"""
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
@@ -39,45 +74,72 @@ def update_profile(current_user):
         
         # Changement de mot de passe si fourni
         if 'currentPassword' in data and 'newPassword' in data:
-            if check_password_hash(current_user.password, data['currentPassword']):
-                current_user.password = generate_password_hash(data['newPassword'])
+            if verify_password(current_user.password, data['currentPassword']):
+                current_user.password = hash_password(data['newPassword'])
             else:
                 return jsonify({'message': 'Current password is incorrect'}), 400
         
         db.session.commit()
+        invalidate_auth_user(current_user.id)
         
         return jsonify({
             'message': 'Profile updated successfully',
             'user': current_user.to_dict()
         }), 200
         
+    except HashingBusy as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': str(RETRY_AFTER)}
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
 @dashboard_bp.route('/orders', methods=['GET'])
 @token_required
+@conditional_collection('orders.user.{user_id}')
 def get_user_orders(current_user):
     try:
-        orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
-        return jsonify({
-            'orders': [order.to_dict() for order in orders]
-        }), 200
+        orders, next_cursor = paginate(project(ORDER_FIELDS).filter(Order.user_id == current_user.id), Order)
+        return json_response({
+            'orders': serialize_rows(ORDER_FIELDS, orders),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
 @dashboard_bp.route('/messages', methods=['GET'])
 @token_required
+@conditional_collection('messages.user.{user_id}')
 def get_user_messages(current_user):
     try:
+        # Le curseur garde une position par boîte ; une boîte absente est épuisée
+        cursor = request.args.get('cursor')
+        positions = decode_cursor(cursor) if cursor else {'sent': None, 'received': None}
+        if not isinstance(positions, dict):
+            raise InvalidCursor('Invalid cursor')
+        limit = get_limit()
+        next_positions = {}
+        
         # Messages envoyés par l'utilisateur
-        sent_messages = PrivateMessage.query.filter_by(sender_id=current_user.id).order_by(PrivateMessage.created_at.desc()).all()
+        sent_messages = []
+        if 'sent' in positions:
+            sent_messages, position = keyset_page(project(MESSAGE_FIELDS).filter(PrivateMessage.sender_id == current_user.id), PrivateMessage, positions['sent'], limit)
+            if position:
+                next_positions['sent'] = position
         # Messages reçus par l'utilisateur
-        received_messages = PrivateMessage.query.filter_by(recipient_id=current_user.id).order_by(PrivateMessage.created_at.desc()).all()
+        received_messages = []
+        if 'received' in positions:
+            received_messages, position = keyset_page(project(MESSAGE_FIELDS).filter(PrivateMessage.recipient_id == current_user.id), PrivateMessage, positions['received'], limit)
+            if position:
+                next_positions['received'] = position
         
-        return jsonify({
-            'sentMessages': [msg.to_dict() for msg in sent_messages],
-            'receivedMessages': [msg.to_dict() for msg in received_messages]
-        }), 200
+        return json_response({
+            'sentMessages': serialize_rows(MESSAGE_FIELDS, sent_messages),
+            'receivedMessages': serialize_rows(MESSAGE_FIELDS, received_messages),
+            'nextCursor': encode_cursor(next_positions) if next_positions else None
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -102,6 +164,8 @@ def send_message_to_admin(current_user):
         
         db.session.add(new_message)
         db.session.commit()
+        invalidate_user_stats(admin.id)
+        publish(admin.id, 'message', {'messageId': new_message.id, 'senderId': current_user.id, 'subject': new_message.subject})
         
         return jsonify({
             'message': 'Message sent to admin successfully',
@@ -111,6 +175,93 @@ def send_message_to_admin(current_user):
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
+@dashboard_bp.route('/events/token', methods=['POST'])
+@token_required
+def create_stream_token(current_user):
+    # Jeton court pour ouvrir le flux en ?token= ; le client en redemande un à chaque reconnexion
+    try:
+        ttl = current_app.config.get('SSE_TOKEN_TTL', 60)
+        return jsonify({'token': issue_stream_token(current_user.id, ttl), 'expiresIn': ttl}), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@dashboard_bp.route('/events', methods=['GET'])
+@stream_token_required
+def stream_events(current_user):
+    # Flux SSE ; en ?token=, seulement un jeton obtenu par POST /events/token
+    app = current_app._get_current_object()
+    subscriber = open_stream(app, current_user.id)
+    if subscriber is None:
+        return jsonify({'message': 'Too many open streams, please retry later'}), 503, {'Retry-After': str(app.config['SSE_RETRY'] // 1000 or 1)}
+    response = Response(
+        event_stream(app, subscriber),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Client parti avant la première lecture du générateur : son finally ne s'exécute pas
+    response.call_on_close(lambda: close_stream(app, subscriber))
+    return response
+
+@dashboard_bp.route('/threads', methods=['GET'])
+@token_required
+@conditional_collection('messages.user.{user_id}')
+def get_user_threads(current_user):
+    try:
+        threads, next_cursor = paginate(inbox_query(project(THREAD_FIELDS), current_user.id), ThreadParticipant, columns=INBOX_ORDER)
+        return json_response({
+            'threads': serialize_rows(THREAD_FIELDS, threads),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@dashboard_bp.route('/threads/<int:thread_id>/messages', methods=['GET'])
+@token_required
+@conditional_collection('messages.user.{user_id}')
+def get_thread_messages(current_user, thread_id):
+    try:
+        if not is_participant(thread_id, current_user.id):
+            return jsonify({'message': 'Thread not found'}), 404
+        
+        messages, next_cursor = paginate(thread_messages_query(project(MESSAGE_FIELDS), thread_id), ThreadMessage, columns=THREAD_MESSAGES_ORDER)
+        return json_response({
+            'messages': serialize_rows(MESSAGE_FIELDS, messages),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@dashboard_bp.route('/threads/<int:thread_id>/read', methods=['POST'])
+@token_required
+def mark_thread_read(current_user, thread_id):
+    try:
+        if not is_participant(thread_id, current_user.id):
+            return jsonify({'message': 'Thread not found'}), 404
+        
+        count = mark_read(current_user.id, thread_id)
+        db.session.commit()
+        invalidate_user_stats(current_user.id)
+        
+        return jsonify({'message': 'Thread marked as read', 'count': count}), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@dashboard_bp.route('/messages/read-all', methods=['POST'])
+@token_required
+def mark_all_messages_read(current_user):
+    try:
+        count = mark_read(current_user.id)
+        db.session.commit()
+        invalidate_user_stats(current_user.id)
+        
+        return jsonify({'message': 'All messages marked as read', 'count': count}), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
 @dashboard_bp.route('/account', methods=['DELETE'])
 @token_required
 def delete_account(current_user):
@@ -118,17 +269,22 @@ def delete_account(current_user):
         data = request.get_json()
         
         # Vérifier le mot de passe
-        if not check_password_hash(current_user.password, data['password']):
+        if not verify_password(current_user.password, data['password']):
             return jsonify({'message': 'Password is incorrect'}), 400
         
         # Supprimer l'utilisateur (cascade supprimera les commandes et messages)
-        db.session.delete(current_user)
+        user_id = current_user.id
+        delete_user_account(current_user)
         db.session.commit()
+        invalidate_auth_user(user_id)
+        invalidate_user_stats(user_id)
         
         return jsonify({
             'message': 'Account deleted successfully'
         }), 200
         
+    except HashingBusy as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': str(RETRY_AFTER)}
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -136,6 +292,12 @@ def delete_account(current_user):
 @token_required
 def get_user_stats(current_user):
     try:
+        # Versions lues avant les compteurs : au pire une entrée plus récente que ses versions est recalculée
+        versions = user_stats_versions(current_user.id)
+        cached = user_stats_cache.get(current_user.id)
+        if cached is not None and cached[0] == versions:
+            return jsonify({'stats': cached[1]}), 200
+        
         # Statistiques utilisateur
         total_orders = Order.query.filter_by(user_id=current_user.id).count()
         completed_orders = Order.query.filter_by(user_id=current_user.id, status='completed').count()
@@ -145,18 +307,21 @@ def get_user_stats(current_user):
         
         total_spent = db.session.query(db.func.sum(Order.price)).filter_by(user_id=current_user.id, status='completed').scalar() or 0
         
-        unread_messages = PrivateMessage.query.filter_by(recipient_id=current_user.id, is_read=False).count()
+        unread_count = unread_messages(current_user.id)
+        
+        stats = {
+            'totalOrders': total_orders,
+            'completedOrders': completed_orders,
+            'pendingOrders': pending_orders,
+            'inProgressOrders': in_progress_orders,
+            'cancelledOrders': cancelled_orders,
+            'totalSpent': total_spent,
+            'unreadMessages': unread_count
+        }
+        user_stats_cache.set(current_user.id, (versions, stats))
         
         return jsonify({
-            'stats': {
-                'totalOrders': total_orders,
-                'completedOrders': completed_orders,
-                'pendingOrders': pending_orders,
-                'inProgressOrders': in_progress_orders,
-                'cancelledOrders': cancelled_orders,
-                'totalSpent': total_spent,
-                'unreadMessages': unread_messages
-            }
+            'stats': stats
         }), 200
         
     except Exception as e:
@@ -165,12 +330,16 @@ def get_user_stats(current_user):
 
 @dashboard_bp.route('/quotes', methods=['GET'])
 @token_required
+@conditional_collection('quotes.user.{user_id}')
 def get_user_quotes(current_user):
     try:
-        quotes = Quote.query.filter_by(user_id=current_user.id).order_by(Quote.created_at.desc()).all()
-        return jsonify({
-            'quotes': [quote.to_dict() for quote in quotes]
-        }), 200
+        quotes, next_cursor = paginate(project(QUOTE_FIELDS).filter(Quote.user_id == current_user.id), Quote)
+        return json_response({
+            'quotes': serialize_rows(QUOTE_FIELDS, quotes),
+            'nextCursor': next_cursor
+        })
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
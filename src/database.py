@@ -0,0 +1,70 @@
+from sqlalchemy import event
+
+# Profil appliqué à chaque nouvelle connexion SQLite
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # les lectures ne bloquent plus sur l'écrivain
+    'synchronous': 'NORMAL',  # suffisant en WAL, évite un fsync par commit
+    'busy_timeout': 5000,  # ms d'attente du verrou d'écriture avant "database is locked"
+    'mmap_size': 268435456,  # 256 Mo lus via mmap
+    'cache_size': -65536,  # 64 Mo de cache de pages par connexion
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON'  # les ON DELETE CASCADE des tables dérivées (devis -> fonctionnalités, fils) s'appliquent
+}
+
+def is_sqlite(uri):
+    return (uri or '').startswith('sqlite')
+
+# Instructions qui n'ouvrent pas de transaction : exécutées hors transaction, elles lisent
+# le dernier état commité sans garder d'instantané WAL ni de verrou
+READ_STATEMENTS = ('SELECT', 'PRAGMA', 'EXPLAIN')
+
+def sqlite_engine_options(config):
+    """Options du moteur SQLAlchemy pour SQLALCHEMY_ENGINE_OPTIONS (vides hors SQLite)
+
+    Un écrivain qui trouve le verrou pris attend jusqu'au busy_timeout ; au-delà, l'erreur
+    remonte à la route (500) plutôt que de rejouer une instruction au milieu d'une transaction.
+    """
+    if not is_sqlite(config.get('SQLALCHEMY_DATABASE_URI')):
+        return {}
+    pragmas = config.get('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+    return {'connect_args': {'timeout': pragmas.get('busy_timeout', 5000) / 1000}}
+
+def configure_sqlite(engine, config):
+    """Applique les pragmas et la gestion des transactions à chaque connexion (sans effet hors SQLite)
+
+    pysqlite n'ouvre de transaction qu'avant un INSERT/UPDATE/DELETE, en mode DEFERRED :
+    un SAVEPOINT ou une lecture faite après ce BEGIN fige un instantané, et l'écriture qui
+    suit échoue aussitôt (SQLITE_BUSY_SNAPSHOT, « database is locked ») si un autre worker a
+    commité entre-temps ; busy_timeout n'y peut rien. La transaction est donc ouverte ici en
+    BEGIN IMMEDIATE juste avant la première instruction qui n'est pas une lecture (écriture,
+    SAVEPOINT, DDL) : le verrou d'écriture est pris d'entrée, en attendant au besoin le
+    busy_timeout, et les lectures seules (GET, flux SSE) n'en prennent jamais.
+    L'option d'exécution `sqlite_begin` ('IMMEDIATE', 'EXCLUSIVE') ouvre la transaction dès
+    son début, avant toute lecture (migrations).
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = config.get('SQLITE_PRAGMAS', DEFAULT_SQLITE_PRAGMAS)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # Plus de BEGIN implicite de pysqlite : les transactions sont ouvertes ci-dessous
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin_eagerly(conn):
+        mode = conn.get_execution_options().get('sqlite_begin')
+        if mode:
+            conn.connection.driver_connection.execute(f'BEGIN {mode}')
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def begin_before_first_write(conn, cursor, statement, parameters, context, executemany):
+        dbapi_connection = cursor.connection
+        if dbapi_connection.in_transaction or not conn.in_transaction():
+            return
+        if not statement.lstrip()[:7].upper().startswith(READ_STATEMENTS):
+            dbapi_connection.execute('BEGIN IMMEDIATE')
@@ -0,0 +1,197 @@
+from flask import current_app
+from src.models.user import db
+from src.routes.http_cache import CollectionVersion
+from src.routes import metrics
+from collections import defaultdict
+import itertools
+import json
+import queue
+import threading
+import time
+
+# Notifications poussées aux navigateurs (Server-Sent Events).
+# Les routes d'écriture publient dans le broker du process ; un flux ouvert sur un autre
+# worker ne les reçoit pas, il voit le changement en relisant les versions des collections
+# de l'utilisateur (SSE_POLL_INTERVAL) et envoie alors un événement « sync ».
+
+class Subscriber:
+    """Un flux SSE ouvert : file bornée d'événements à envoyer"""
+
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lagged = False  # des événements ont été perdus : le client doit tout recharger
+
+    def put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.lagged = True
+
+class EventBroker:
+    """Pub/sub en mémoire : user_id -> flux ouverts sur ce worker"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id, limit=None):
+        """Nouveau flux, ou None si le worker en a déjà `limit` ouverts"""
+        subscriber = Subscriber(user_id, self.queue_size)
+        with self._lock:
+            if limit is not None and sum(len(subscribers) for subscribers in self._subscribers.values()) >= limit:
+                return None
+            self._subscribers[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.user_id]
+
+    def has_subscribers(self, user_id):
+        with self._lock:
+            return bool(self._subscribers.get(user_id))
+
+    def publish(self, user_id, event, data, synced=None):
+        """`synced` : (collection, version) déjà reflétée par l'événement, voir event_stream"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        item = (next(self._ids), event, data, synced)
+        for subscriber in subscribers:
+            subscriber.put(item)
+        return len(subscribers)
+
+    def connections(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+def get_broker(app=None):
+    app = app or current_app._get_current_object()
+    broker = app.extensions.get('event_broker')
+    if broker is None:
+        broker = app.extensions['event_broker'] = EventBroker(app.config.get('SSE_QUEUE_SIZE', 100))
+    return broker
+
+# Collection de l'utilisateur (clé de user_collections) dont chaque événement signale un changement
+EVENT_COLLECTIONS = {'order': 'orders', 'quote': 'quotes', 'message': 'messages'}
+
+def publish(user_id, event, data):
+    """Pousse un événement aux flux de l'utilisateur (à appeler après le commit)
+
+    La version de sa collection, lue après le commit, part avec l'événement : le flux
+    n'envoie pas de « sync » pour un changement que l'événement a déjà apporté.
+    """
+    if user_id is None:
+        return
+    broker = get_broker()
+    if not broker.has_subscribers(user_id):
+        return
+    synced = None
+    key = EVENT_COLLECTIONS.get(event)
+    if key is not None:
+        name = user_collections(user_id)[key]
+        version = db.session.query(CollectionVersion.version).filter_by(name=name).scalar() or 0
+        synced = (key, version)
+    broker.publish(user_id, event, data, synced)
+
+def _track_connections(broker):
+    # Jauge par worker, additionnée entre les process par /metrics
+    metrics.registry.set_gauge('sse_connections', value=broker.connections())
+    metrics.flush()
+
+def format_event(event, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+def user_collections(user_id):
+    """Collections dont dépendent les écrans du dashboard de l'utilisateur"""
+    return {
+        'messages': f'messages.user.{user_id}',
+        'orders': f'orders.user.{user_id}',
+        'quotes': f'quotes.user.{user_id}'
+    }
+
+def read_versions(names):
+    versions = dict(db.session.query(CollectionVersion.name, CollectionVersion.version)
+                    .filter(CollectionVersion.name.in_(list(names.values()))))
+    # Pas de transaction (ni d'instantané WAL) gardée ouverte entre deux lectures
+    db.session.close()
+    return {key: versions.get(name, 0) for key, name in names.items()}
+
+def open_stream(app, user_id):
+    """Inscrit un flux pour l'utilisateur ; None si le worker a déjà SSE_MAX_STREAMS flux ouverts"""
+    broker = get_broker(app)
+    subscriber = broker.subscribe(user_id, app.config.get('SSE_MAX_STREAMS'))
+    if subscriber is not None:
+        _track_connections(broker)
+    return subscriber
+
+def close_stream(app, subscriber):
+    """Désinscrit le flux (sans effet s'il l'est déjà)"""
+    broker = get_broker(app)
+    broker.unsubscribe(subscriber)
+    _track_connections(broker)
+
+def event_stream(app, subscriber):
+    """Générateur du flux SSE : événements publiés, « sync » sur changement de version, keepalive
+
+    Le flux se ferme après SSE_MAX_DURATION ; le navigateur se reconnecte seul
+    (ce qui revérifie aussi le jeton).
+    """
+    heartbeat = app.config['SSE_HEARTBEAT_INTERVAL']
+    poll = app.config['SSE_POLL_INTERVAL']
+    max_duration = app.config['SSE_MAX_DURATION']
+    names = user_collections(subscriber.user_id)
+    synced = {}  # version de chaque collection déjà apportée par un événement envoyé
+    try:
+        with app.app_context():
+            versions = read_versions(names)
+        yield f"retry: {app.config['SSE_RETRY']}\n\n"
+        yield format_event('ready', {'collections': sorted(names)})
+
+        started = last_poll = last_write = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now - started >= max_duration:
+                return
+            timeout = max(0, min(poll - (now - last_poll), heartbeat - (now - last_write)))
+            try:
+                event_id, event, data, event_synced = subscriber.queue.get(timeout=timeout)
+                yield format_event(event, data, event_id)
+                last_write = time.monotonic()
+                if event_synced is not None:
+                    key, version = event_synced
+                    synced[key] = max(version, synced.get(key, 0))
+            except queue.Empty:
+                pass
+
+            if subscriber.lagged:
+                subscriber.lagged = False
+                yield format_event('sync', {'collections': sorted(names)})
+                last_write = time.monotonic()
+
+            if time.monotonic() - last_poll >= poll:
+                with app.app_context():
+                    current = read_versions(names)
+                changed = sorted(key for key in names
+                                 if current[key] != versions[key] and current[key] != synced.get(key))
+                versions = current
+                synced.clear()
+                last_poll = time.monotonic()
+                if changed:
+                    yield format_event('sync', {'collections': changed})
+                    last_write = last_poll
+
+            if time.monotonic() - last_write >= heartbeat:
+                yield ': keepalive\n\n'
+                last_write = time.monotonic()
+    finally:
+        close_stream(app, subscriber)
@@ -0,0 +1,138 @@
+from flask import current_app
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+import os
+import threading
+
+RETRY_AFTER = 1  # secondes suggérées au client quand la file est pleine
+DEFAULT_WORKERS = 2  # process de hachage par worker gunicorn : N workers lancent 2N process
+
+class HashingBusy(Exception):
+    """La file de hachage est pleine : la requête doit être refusée (503)"""
+
+class PasswordHasher:
+    """Pool de process dédié au hachage des mots de passe, avec une file bornée
+
+    Le thread de la requête attend le résultat sans tenir le GIL : les routes
+    légères du même worker restent servies pendant un pic de connexions.
+    """
+
+    def __init__(self, workers, queue_size, method=None, timeout=10):
+        self.workers = workers
+        self.method = method
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            # Un pool hérité du process parent (fork gunicorn) n'est pas utilisable
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor):
+        """Oublie un pool cassé (process enfant tué, OOM) : le prochain appel en crée un neuf"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, args, blocking=False):
+        """Soumet une tâche sur une place de la file ; retourne (pool, future)
+
+        Sans `blocking`, une file pleine lève HashingBusy ; avec, l'appelant attend sa place.
+        """
+        if not self._slots.acquire(blocking=blocking):
+            raise HashingBusy('Server busy, please retry later')
+        try:
+            for attempt in range(2):
+                executor = self._get_executor()
+                try:
+                    future = executor.submit(fn, *args)
+                    break
+                except BrokenProcessPool:
+                    self._discard(executor)
+                    if attempt:
+                        raise
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        return executor, future
+
+    def _result(self, fn, args, executor, future, timeout=None, blocking=False):
+        """Résultat d'une tâche ; si le pool a cassé pendant l'attente, rejouée une fois sur un pool neuf"""
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise HashingBusy('Server busy, please retry later')
+        except BrokenProcessPool:
+            self._discard(executor)
+        executor, future = self._submit(fn, args, blocking)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise HashingBusy('Server busy, please retry later')
+
+    def _run(self, fn, *args):
+        executor, future = self._submit(fn, args)
+        return self._result(fn, args, executor, future, self.timeout)
+
+    def hash(self, password):
+        if self.method:
+            return self._run(generate_password_hash, password, self.method)
+        return self._run(generate_password_hash, password)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def hash_many(self, passwords):
+        """Hache une série de mots de passe (import), au plus `workers` tâches à la fois
+
+        Chaque tâche prend une place de la même file bornée que les connexions, en
+        attendant au lieu de refuser ; les autres places restent aux connexions, qui
+        attendent au plus un tour de pool derrière l'import.
+        """
+        args = (self.method,) if self.method else ()
+        window = threading.BoundedSemaphore(self.workers)
+        tasks = []
+        for password in passwords:
+            window.acquire()
+            try:
+                executor, future = self._submit(generate_password_hash, (password,) + args, blocking=True)
+            except BaseException:
+                window.release()
+                raise
+            future.add_done_callback(lambda f: window.release())
+            tasks.append(((password,) + args, executor, future))
+        return [self._result(generate_password_hash, task_args, executor, future, blocking=True)
+                for task_args, executor, future in tasks]
+
+def get_hasher(app=None):
+    app = app or current_app._get_current_object()
+    hasher = app.extensions.get('password_hasher')
+    if hasher is None:
+        hasher = app.extensions['password_hasher'] = PasswordHasher(
+            workers=app.config.get('PASSWORD_HASH_WORKERS') or DEFAULT_WORKERS,
+            queue_size=app.config.get('PASSWORD_HASH_QUEUE_SIZE', 32),
+            method=app.config.get('PASSWORD_HASH_METHOD'),
+            timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        )
+    return hasher
+
+def hash_password(password):
+    """generate_password_hash exécuté dans le pool (HashingBusy si la file est pleine)"""
+    return get_hasher().hash(password)
+
+def hash_passwords(passwords):
+    """Version par lot de hash_password pour les imports (attend au lieu de refuser)"""
+    return get_hasher().hash_many(passwords)
+
+def verify_password(pwhash, password):
+    """check_password_hash exécuté dans le pool (HashingBusy si la file est pleine)"""
+    return get_hasher().verify(pwhash, password)
@@ -0,0 +1,93 @@
+from flask import current_app, request, make_response
+from sqlalchemy.orm import attributes
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models.user import db, Order, Quote, PrivateMessage, SiteContent
+from src.routes.changes import on_row_change, on_apply, track_previous
+from functools import wraps
+import hashlib
+
+class CollectionVersion(db.Model):
+    """Compteur d'écritures par collection, sert de jeton de version (ETag) aux listes"""
+    __tablename__ = 'collection_version'
+
+    name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+def _values(obj, key):
+    """Valeurs actuelle et précédente d'un attribut (une ligne peut changer de propriétaire)"""
+    history = attributes.get_history(obj, key)
+    values = set(history.added or ()) | set(history.unchanged or ()) | set(history.deleted or ())
+    return {value for value in values if value is not None}
+
+def collections_touched(obj):
+    """Collections dont le contenu change quand cette ligne est écrite"""
+    if isinstance(obj, Order):
+        return {'orders'} | {f'orders.user.{user_id}' for user_id in _values(obj, 'user_id')}
+    if isinstance(obj, Quote):
+        return {'quotes'} | {f'quotes.user.{user_id}' for user_id in _values(obj, 'user_id')}
+    if isinstance(obj, PrivateMessage):
+        user_ids = _values(obj, 'sender_id') | _values(obj, 'recipient_id')
+        return {'messages'} | {f'messages.user.{user_id}' for user_id in user_ids}
+    if isinstance(obj, SiteContent):
+        return {f'content.page.{page_name}' for page_name in _values(obj, 'page_name')}
+    return set()
+
+def bump_versions(names, connection=None):
+    """Incrémente la version des collections (écritures Core : passer par un ChangeSet)"""
+    if not names:
+        return
+    connection = connection or db.session.connection()
+    table = CollectionVersion.__table__
+    # Une seule instruction pour toutes les collections (un import touche des milliers d'utilisateurs)
+    stmt = sqlite_insert(table).on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': table.c.version + 1}
+    )
+    connection.execute(stmt, [{'name': name, 'version': 1} for name in sorted(names)])
+
+track_previous(Order.user_id, Quote.user_id, PrivateMessage.sender_id, PrivateMessage.recipient_id,
+               SiteContent.page_name)
+
+@on_row_change
+def _touch_collections(changes, connection, obj, state):
+    changes.touch(collections_touched(obj))
+
+@on_apply
+def _bump_collection_versions(changes, connection):
+    bump_versions(changes.collections, connection)
+
+def collection_versions(names):
+    """Versions des collections dans l'ordre de `names` (0 pour une collection jamais écrite)"""
+    versions = dict(db.session.query(CollectionVersion.name, CollectionVersion.version)
+                    .filter(CollectionVersion.name.in_(names)))
+    return tuple(versions.get(name, 0) for name in names)
+
+def collection_etag(names):
+    """ETag faible d'une réponse de liste : versions des collections + paramètres de la requête"""
+    names = sorted(names)
+    token = '|'.join(f'{name}={version}' for name, version in zip(names, collection_versions(names)))
+    token += '|' + request.query_string.decode('latin-1')
+    return hashlib.sha1(token.encode('utf-8')).hexdigest()
+
+def conditional_collection(*names):
+    """Répond 304 sans charger de lignes si la collection n'a pas changé (If-None-Match)
+
+    Les noms peuvent contenir {user_id}, remplacé par l'utilisateur courant.
+    La version est lue avant les données : au pire l'ETag est plus ancien que
+    le contenu, et le client recharge une fois de trop.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            etag = collection_etag([name.format(user_id=current_user.id) for name in names])
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(current_user, *args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
@@ -0,0 +1,413 @@
+from src.models.user import db, User, Order, Quote, Contact
+from src.routes.changes import ChangeSet, apply_changes
+from src.routes.stats import contribution
+from src.routes.quote_features import QuoteFeature, normalize_features
+from src.routes.hashing import hash_passwords
+from datetime import datetime
+import csv
+import io
+import json
+import random
+import string
+
+# Import en flux : le corps de la requête est lu ligne à ligne, les lignes valides sont
+# insérées par lots (un executemany et un commit par lot), les lignes invalides sont
+# signalées avec leur numéro sans interrompre l'import.
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000  # erreurs détaillées dans la réponse (les suivantes sont seulement comptées)
+IMPORT_MODELS = {'users': User, 'orders': Order, 'quotes': Quote, 'contacts': Contact}
+
+class InvalidImport(ValueError):
+    """Fichier d'import inutilisable (format, en-tête)"""
+
+class RowError(ValueError):
+    """Ligne d'import invalide"""
+
+# ===== CONVERSIONS =====
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _int(value):
+    value = _text(value)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        raise RowError(f'Invalid integer: {value}')
+
+def _float(value):
+    value = _text(value)
+    try:
+        return float(value.replace(',', '.')) if value is not None else None
+    except ValueError:
+        raise RowError(f'Invalid number: {value}')
+
+def _bool(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    value = str(value).strip().lower()
+    if not value:
+        return None
+    if value in ('1', 'true', 'yes', 'oui', 'vrai'):
+        return True
+    if value in ('0', 'false', 'no', 'non', 'faux'):
+        return False
+    raise RowError(f'Invalid boolean: {value}')
+
+def _datetime(value):
+    value = _text(value)
+    try:
+        return datetime.fromisoformat(value) if value is not None else None
+    except ValueError:
+        raise RowError(f'Invalid date: {value}')
+
+def _email(value):
+    value = _text(value)
+    if value is not None and '@' not in value:
+        raise RowError(f'Invalid email: {value}')
+    return value
+
+def _role(value):
+    value = _text(value)
+    if value is not None and value not in ('member', 'admin'):
+        raise RowError(f'Invalid role: {value}')
+    return value
+
+def _features(value):
+    """Liste JSON (NDJSON), ou texte « a;b;c » / liste JSON en texte (CSV)"""
+    if value is None or isinstance(value, list):
+        return value
+    value = str(value).strip()
+    if value.startswith('['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            raise RowError('Invalid features list')
+    return [feature for feature in value.split(';')]
+
+# ===== CHAMPS PAR TYPE =====
+
+# (clé JSON, colonne, libellés de l'export acceptés en en-tête, conversion, obligatoire)
+IMPORT_FIELDS = {
+    'users': [
+        ('firstName', 'first_name', ['Prénom'], _text, True),
+        ('lastName', 'last_name', ['Nom'], _text, True),
+        ('email', 'email', ['Email'], _email, True),
+        ('company', 'company', ['Entreprise'], _text, False),
+        ('phone', 'phone', ['Téléphone'], _text, False),
+        ('role', 'role', ['Rôle'], _role, False),
+        ('isActive', 'is_active', ['Actif'], _bool, False),
+        ('createdAt', 'created_at', ['Date création'], _datetime, False),
+        ('password', None, [], _text, False),
+        ('passwordHash', 'password', [], _text, False),
+    ],
+    'orders': [
+        ('orderId', 'order_id', ['ID'], _text, False),
+        ('title', 'title', ['Titre'], _text, True),
+        ('type', 'type', ['Type'], _text, True),
+        ('status', 'status', ['Statut'], _text, False),
+        ('price', 'price', ['Prix'], _float, True),
+        ('description', 'description', [], _text, False),
+        ('progress', 'progress', ['Progression'], _int, False),
+        ('userId', 'user_id', ['Utilisateur'], _int, True),
+        ('createdAt', 'created_at', ['Date création'], _datetime, False),
+        ('completedAt', 'completed_at', [], _datetime, False),
+    ],
+    'quotes': [
+        ('projectType', 'project_type', ['Type projet'], _text, True),
+        ('features', None, [], _features, False),
+        ('budget', 'budget', [], _text, False),
+        ('timeline', 'timeline', [], _text, False),
+        ('company', 'company', ['Entreprise'], _text, False),
+        ('email', 'email', ['Email'], _email, True),
+        ('phone', 'phone', [], _text, False),
+        ('description', 'description', [], _text, False),
+        ('estimatedPrice', 'estimated_price', ['Prix estimé'], _float, False),
+        ('status', 'status', ['Statut'], _text, False),
+        ('userId', 'user_id', [], _int, False),
+        ('hasAccount', 'has_account', [], _bool, False),
+        ('createdAt', 'created_at', ['Date création'], _datetime, False),
+    ],
+    'contacts': [
+        ('name', 'name', ['Nom'], _text, True),
+        ('email', 'email', ['Email'], _email, True),
+        ('company', 'company', ['Entreprise'], _text, False),
+        ('phone', 'phone', [], _text, False),
+        ('subject', 'subject', ['Sujet'], _text, True),
+        ('message', 'message', [], _text, True),
+        ('status', 'status', ['Statut'], _text, False),
+        ('createdAt', 'created_at', ['Date création'], _datetime, False),
+    ],
+}
+
+def _labels(data_type):
+    """Libellé d'en-tête ou clé JSON -> clé JSON"""
+    labels = {}
+    for key, _, aliases, _, _ in IMPORT_FIELDS[data_type]:
+        labels[key] = key
+        for alias in aliases:
+            labels[alias] = key
+    return labels
+
+# ===== LECTURE DU FLUX =====
+
+def _text_stream(stream):
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+def csv_records(stream, data_type):
+    """(numéro de ligne, dict clé -> valeur) pour chaque ligne du CSV, sans tout charger"""
+    reader = csv.reader(_text_stream(stream))
+    header = next(reader, None)
+    if not header:
+        raise InvalidImport('Empty file')
+    labels = _labels(data_type)
+    keys = [labels.get(label.strip()) for label in header]
+    missing = [key for key, _, _, _, required in IMPORT_FIELDS[data_type] if required and key not in keys]
+    if missing:
+        raise InvalidImport(f'Missing columns: {", ".join(missing)}')
+
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, RowError(str(e))
+            continue
+        if any(value.strip() for value in values):
+            yield reader.line_num, {key: value for key, value in zip(keys, values) if key}
+
+def ndjson_records(stream, data_type):
+    """(numéro de ligne, dict clé -> valeur) pour chaque objet JSON, un par ligne"""
+    labels = _labels(data_type)
+    for number, line in enumerate(_text_stream(stream), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, RowError('Invalid JSON')
+            continue
+        if not isinstance(record, dict):
+            yield number, RowError('Each line must be a JSON object')
+            continue
+        yield number, {labels[key]: value for key, value in record.items() if key in labels}
+
+# ===== IMPORT =====
+
+def _order_reference():
+    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+
+class Importer:
+    """Valide et insère les lignes d'un import par lots ; garde un résumé borné des erreurs"""
+
+    def __init__(self, data_type, batch_size=IMPORT_BATCH_SIZE):
+        self.data_type = data_type
+        self.model = IMPORT_MODELS[data_type]
+        self.table = self.model.__table__
+        self.fields = IMPORT_FIELDS[data_type]
+        self.batch_size = batch_size
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.user_ids = set()  # propriétaires des commandes importées (cache des stats)
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'line': line, 'message': message})
+
+    def run(self, records):
+        batch = []
+        try:
+            for line, record in records:
+                if isinstance(record, RowError):
+                    self.error(line, str(record))
+                    continue
+                try:
+                    batch.append((line, self.convert(record)))
+                except RowError as e:
+                    self.error(line, str(e))
+                    continue
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+        except UnicodeDecodeError:
+            self.error(None, 'File is not valid UTF-8, import stopped')
+        if batch:
+            self.flush(batch)
+        return self.summary()
+
+    def summary(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['line'] or 0),
+            'errorsTruncated': self.failed > len(self.errors)
+        }
+
+    def convert(self, record):
+        """dict clé JSON -> (valeurs de colonnes, extras), lève RowError"""
+        values = {}
+        extras = {}
+        for key, column, _, convert, required in self.fields:
+            value = convert(record.get(key))
+            if value is None:
+                if required:
+                    raise RowError(f'{key} is required')
+                continue
+            if column is None:
+                extras[key] = value
+            else:
+                values[column] = value
+
+        if self.data_type == 'users' and 'password' not in values and 'password' not in extras:
+            raise RowError('password or passwordHash is required')
+        if self.data_type == 'orders':
+            values.setdefault('order_id', _order_reference())
+            if values.get('status') == 'completed':
+                values.setdefault('completed_at', values.get('created_at') or datetime.utcnow())
+        if self.data_type == 'quotes':
+            features = extras.get('features') or []
+            if not isinstance(features, list):
+                raise RowError('features must be a list')
+            extras['features'] = normalize_features(features)
+            values['features'] = json.dumps(extras['features'], ensure_ascii=False, separators=(',', ':'))
+        return values, extras
+
+    # Vérifications qui demandent la base, faites une fois par lot
+    def _check_batch(self, batch):
+        valid = []
+        if self.data_type == 'users':
+            emails = [values['email'] for _, (values, _) in batch]
+            seen = {email for (email,) in db.session.query(User.email).filter(User.email.in_(emails))}
+            for line, (values, extras) in batch:
+                if values['email'] in seen:
+                    self.error(line, 'Email already exists')
+                    continue
+                seen.add(values['email'])
+                valid.append((line, (values, extras)))
+
+            # Mots de passe en clair : hachés en parallèle dans le pool
+            plain = [(values, extras['password']) for _, (values, extras) in valid if 'password' not in values]
+            for (values, _), pwhash in zip(plain, hash_passwords([password for _, password in plain])):
+                values['password'] = pwhash
+            return valid
+
+        if self.data_type in ('orders', 'quotes'):
+            user_ids = {values['user_id'] for _, (values, _) in batch if values.get('user_id') is not None}
+            existing_users = {user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(user_ids))}
+            references = set()
+            if self.data_type == 'orders':
+                references = {reference for (reference,) in db.session.query(Order.order_id).filter(
+                    Order.order_id.in_([values['order_id'] for _, (values, _) in batch]))}
+            for line, (values, extras) in batch:
+                if values.get('user_id') is not None and values['user_id'] not in existing_users:
+                    self.error(line, f'User {values["user_id"]} not found')
+                    continue
+                if self.data_type == 'orders':
+                    if values['order_id'] in references:
+                        self.error(line, f'Order ID {values["order_id"]} already exists')
+                        continue
+                    references.add(values['order_id'])
+                valid.append((line, (values, extras)))
+            return valid
+
+        return batch
+
+    def _insert(self, rows):
+        """executemany par jeu de colonnes (les champs facultatifs absents gardent leur défaut)"""
+        groups = {}
+        for values, extras in rows:
+            groups.setdefault(frozenset(values), []).append((values, extras))
+        for group in groups.values():
+            self._insert_group(group)
+
+    def _insert_group(self, rows):
+        """executemany de lignes aux mêmes colonnes ; pour les devis, ajoute les lignes de quote_feature"""
+        if self.data_type != 'quotes':
+            db.session.execute(self.table.insert(), [values for values, _ in rows])
+            return
+        result = db.session.execute(
+            self.table.insert().returning(self.table.c.id, sort_by_parameter_order=True),
+            [values for values, _ in rows]
+        )
+        links = [
+            {'quote_id': quote_id, 'feature': feature, 'position': position}
+            for (quote_id,), (_, extras) in zip(result.all(), rows)
+            for position, feature in enumerate(extras['features'])
+        ]
+        if links:
+            db.session.execute(QuoteFeature.__table__.insert(), links)
+
+    def _collections(self, rows):
+        if self.data_type == 'orders':
+            return {'orders'} | {f'orders.user.{values["user_id"]}' for values, _ in rows}
+        if self.data_type == 'quotes':
+            return {'quotes'} | {f'quotes.user.{values["user_id"]}' for values, _ in rows if values.get('user_id') is not None}
+        return set()
+
+    def _value(self, values, column):
+        """Valeur insérée, ou défaut de la colonne quand le champ était absent"""
+        if column in values:
+            return values[column]
+        default = self.table.c[column].default if column in self.table.c else None
+        return default.arg if default is not None and default.is_scalar else None
+
+    def _apply(self, rows):
+        """Versions des collections et compteurs des lignes insérées (pas de hook after_flush en Core)"""
+        changes = ChangeSet()
+        changes.touch(self._collections(rows))
+        for values, _ in rows:
+            changes.count(contribution(self.model, self._value(values, 'status'), self._value(values, 'price')))
+        apply_changes(changes)
+
+    def flush(self, batch):
+        """Insère un lot dans une transaction ; en cas d'échec, ligne par ligne pour isoler les fautives"""
+        batch = self._check_batch(batch)
+        if not batch:
+            return
+        rows = [row for _, row in batch]
+        try:
+            self._insert(rows)
+            self._apply(rows)
+            db.session.commit()
+            self._imported(rows)
+            return
+        except Exception:
+            db.session.rollback()
+
+        # Le premier SAVEPOINT ouvre la transaction en BEGIN IMMEDIATE (voir database.py) : pysqlite
+        # ne l'ouvre plus lui-même, les savepoints sont fiables. Les compteurs d'une ligne sont écrits
+        # dans son savepoint : annulés avec elle, validés avec elle.
+        inserted = []
+        for line, row in batch:
+            try:
+                with db.session.begin_nested():
+                    self._insert([row])
+                    self._apply([row])
+                inserted.append(row)
+            except Exception as e:
+                self.error(line, str(getattr(e, 'orig', None) or e))
+        db.session.commit()
+        self._imported(inserted)
+
+    def _imported(self, rows):
+        self.imported += len(rows)
+        if self.data_type == 'orders':
+            self.user_ids |= {values['user_id'] for values, _ in rows}
+
+def import_records(data_type, data_format, stream):
+    """Importe le flux (csv ou ndjson) ; retourne l'Importer (résumé, utilisateurs touchés)"""
+    if data_format == 'csv':
+        records = csv_records(stream, data_type)
+    elif data_format == 'ndjson':
+        records = ndjson_records(stream, data_type)
+    else:
+        raise InvalidImport('Unsupported format, expected csv or ndjson')
+    importer = Importer(data_type)
+    importer.run(records)
+    return importer
@@ -0,0 +1,129 @@
+from flask import current_app
+from smtplib import SMTPException, SMTPServerDisconnected
+from src.routes.metrics import registry, observe_smtp
+import os
+import threading
+import time
+
+# Erreurs SMTP qui indiquent une connexion morte : on reconnecte et on renvoie une fois
+RECONNECT_ERRORS = (SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+class _PooledConnection:
+    """Connexion SMTP authentifiée, gardée ouverte entre deux envois"""
+
+    def __init__(self, mail):
+        self.connection = mail.connect()
+        self.connection.__enter__()
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+    def is_stale(self, max_idle, max_messages):
+        if max_idle and time.monotonic() - self.last_used > max_idle:
+            return True
+        return bool(max_messages) and self.sent >= max_messages
+
+    def send(self, message):
+        self.connection.send(message)
+        self.last_used = time.monotonic()
+        self.sent += 1
+
+    def close(self):
+        try:
+            self.connection.__exit__(None, None, None)
+        except Exception:
+            pass
+
+class MailTransport:
+    """Transport email partagé par worker : petit pool de connexions SMTP chaudes"""
+
+    def __init__(self, app):
+        self.mail = app.extensions['mail']
+        self.pool_size = app.config.get('MAIL_TRANSPORT_POOL_SIZE', 1)
+        self.max_idle = app.config.get('MAIL_TRANSPORT_MAX_IDLE', 60)
+        self.max_messages = app.config.get('MAIL_TRANSPORT_MAX_MESSAGES', 100)
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            # Après un fork, les sockets du process parent ne sont pas réutilisables
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+            while self._idle:
+                pooled = self._idle.pop()
+                if not pooled.is_stale(self.max_idle, self.max_messages):
+                    return pooled
+                pooled.close()
+        try:
+            return _PooledConnection(self.mail)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, pooled):
+        if pooled is not None:
+            with self._lock:
+                self._idle.append(pooled)
+        self._slots.release()
+
+    def send(self, message):
+        """Envoie un message sur une connexion du pool, avec une reconnexion si elle a expiré"""
+        self.send_many([message])
+
+    def send_many(self, messages):
+        """Envoie plusieurs messages sur la même session SMTP"""
+        # Durée mesurée par message, ouverture de connexion comprise
+        started = time.perf_counter()
+        try:
+            pooled = self._acquire()
+        except Exception as e:
+            observe_smtp(time.perf_counter() - started, e)
+            raise
+        try:
+            for message in messages:
+                try:
+                    pooled.send(message)
+                except RECONNECT_ERRORS:
+                    # Connexion fermée côté serveur : on en ouvre une nouvelle et on réessaie
+                    registry.inc('smtp_reconnects_total')
+                    pooled.close()
+                    pooled = None
+                    pooled = _PooledConnection(self.mail)
+                    pooled.send(message)
+                now = time.perf_counter()
+                observe_smtp(now - started)
+                started = now
+        except Exception as e:
+            observe_smtp(time.perf_counter() - started, e)
+            if pooled is not None and isinstance(e, SMTPException) and not isinstance(e, SMTPServerDisconnected):
+                # Réponse d'erreur du serveur (destinataire refusé...) : la session reste utilisable
+                self._release(pooled)
+            else:
+                if pooled is not None:
+                    pooled.close()
+                self._release(None)
+            raise
+        self._release(pooled)
+
+    def close(self):
+        with self._lock:
+            for pooled in self._idle:
+                pooled.close()
+            self._idle = []
+
+_transport_lock = threading.Lock()
+
+def get_transport(app=None):
+    """Retourne le transport email de l'application (créé au premier envoi, un seul par process)"""
+    app = app or current_app._get_current_object()
+    transport = app.extensions.get('mail_transport')
+    if transport is None:
+        with _transport_lock:
+            transport = app.extensions.get('mail_transport')
+            if transport is None:
+                transport = app.extensions['mail_transport'] = MailTransport(app)
+    return transport
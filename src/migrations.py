@@ -0,0 +1,220 @@
+from src.models.user import db, User, Order, Quote, Contact, PrivateMessage, SiteContent
+from src.routes.outbox import EmailOutbox
+from src.routes.search import SEARCH_INDEXES, create_search_index
+from src.routes.threads import MessageThread, ThreadParticipant, ThreadMessage
+from src.routes.quote_features import QuoteFeature
+
+# Migrations versionnées : (version, description, fonction(connexion)), dans l'ordre.
+# La version appliquée est stockée dans PRAGMA user_version du fichier SQLite.
+# Chaque migration doit pouvoir être rejouée sans erreur (plusieurs workers démarrent ensemble).
+MIGRATIONS = []
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return fn
+    return register
+
+def _indexed_columns(connection, table_name):
+    """Colonnes (dans l'ordre) de chaque index existant sur la table"""
+    quote = connection.dialect.identifier_preparer.quote
+    indexes = []
+    for row in connection.exec_driver_sql(f'PRAGMA index_list({quote(table_name)})').fetchall():
+        columns = connection.exec_driver_sql(f'PRAGMA index_info({quote(row[1])})').fetchall()
+        indexes.append([column[2] for column in sorted(columns)])
+    return indexes
+
+def create_index(connection, name, table, columns, unique=False):
+    """Crée un index sauf si un index existant commence déjà par ces colonnes"""
+    for existing in _indexed_columns(connection, table.name):
+        if existing[:len(columns)] == columns:
+            return
+    quote = connection.dialect.identifier_preparer.quote
+    connection.exec_driver_sql(
+        f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {quote(name)} '
+        f'ON {quote(table.name)} ({", ".join(quote(column) for column in columns)})'
+    )
+
+def current_version(connection):
+    return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+# Attente maximale du verrou pendant qu'un autre worker applique une migration (secondes)
+MIGRATION_LOCK_TIMEOUT = 600
+
+def run_migrations(engine, lock_timeout=MIGRATION_LOCK_TIMEOUT):
+    """Crée les tables manquantes puis applique les migrations en attente, chacune dans sa transaction
+
+    Tous les workers gunicorn passent ici au démarrage. Chaque transaction est ouverte en
+    BEGIN EXCLUSIVE avant de lire user_version : un seul worker applique une étape (DDL
+    compris, transactionnel en SQLite), les autres attendent puis la trouvent déjà faite.
+    """
+    applied = []
+    with engine.connect() as connection:
+        busy_timeout = connection.exec_driver_sql('PRAGMA busy_timeout').scalar()
+        connection.exec_driver_sql(f'PRAGMA busy_timeout={int(lock_timeout * 1000)}')
+        connection.commit()
+        connection.execution_options(sqlite_begin='EXCLUSIVE')
+        try:
+            with connection.begin():
+                db.metadata.create_all(connection)
+            for version, description, fn in MIGRATIONS:
+                with connection.begin():
+                    if current_version(connection) >= version:
+                        continue
+                    fn(connection)
+                    connection.exec_driver_sql(f'PRAGMA user_version={int(version)}')
+                applied.append((version, description))
+        finally:
+            connection.execution_options(sqlite_begin=None)
+            connection.exec_driver_sql(f'PRAGMA busy_timeout={busy_timeout}')
+            connection.commit()
+    return applied
+
+# ===== MIGRATIONS =====
+
+@migration(1, 'Index composites des listes, filtres et statistiques')
+def add_query_indexes(connection):
+    # Listes paginées sur (created_at, id), globales et par utilisateur
+    create_index(connection, 'ix_user_created', User.__table__, ['created_at', 'id'])
+    create_index(connection, 'ix_order_created', Order.__table__, ['created_at', 'id'])
+    create_index(connection, 'ix_order_user_created', Order.__table__, ['user_id', 'created_at', 'id'])
+    create_index(connection, 'ix_quote_created', Quote.__table__, ['created_at', 'id'])
+    create_index(connection, 'ix_quote_user_created', Quote.__table__, ['user_id', 'created_at', 'id'])
+    create_index(connection, 'ix_contact_created', Contact.__table__, ['created_at', 'id'])
+    create_index(connection, 'ix_message_created', PrivateMessage.__table__, ['created_at', 'id'])
+    create_index(connection, 'ix_message_sender_created', PrivateMessage.__table__, ['sender_id', 'created_at', 'id'])
+    create_index(connection, 'ix_message_recipient_created', PrivateMessage.__table__, ['recipient_id', 'created_at', 'id'])
+
+    # Index couvrants : les agrégats par statut ne lisent pas la table
+    create_index(connection, 'ix_order_status_price', Order.__table__, ['status', 'price'])
+    create_index(connection, 'ix_order_user_status_price', Order.__table__, ['user_id', 'status', 'price'])
+    create_index(connection, 'ix_quote_status', Quote.__table__, ['status'])
+    create_index(connection, 'ix_message_recipient_unread', PrivateMessage.__table__, ['recipient_id', 'is_read'])
+
+    # Recherches ponctuelles
+    create_index(connection, 'ix_user_email', User.__table__, ['email'])
+    create_index(connection, 'ix_user_role', User.__table__, ['role'])
+    create_index(connection, 'ix_email_outbox_status_next', EmailOutbox.__table__, ['status', 'next_attempt_at'])
+
+@migration(2, 'Fonctionnalités des devis : JSON compact et table quote_feature')
+def backfill_quote_features(connection):
+    quote = connection.dialect.identifier_preparer.quote
+    quote_table = quote(Quote.__tablename__)
+    feature_table = quote(QuoteFeature.__tablename__)
+    # JSON1 : les valeurs qui ne sont pas une liste JSON deviennent une liste vide
+    connection.exec_driver_sql(
+        f"UPDATE {quote_table} SET features = CASE "
+        f"WHEN json_valid(features) AND json_type(features) = 'array' THEN features "
+        f"ELSE '[]' END"
+    )
+    connection.exec_driver_sql(
+        f"INSERT OR IGNORE INTO {feature_table} (quote_id, feature, position) "
+        f"SELECT q.id, trim(item.value), item.key FROM {quote_table} AS q, json_each(q.features) AS item "
+        f"WHERE item.type = 'text' AND trim(item.value) != ''"
+    )
+    # Réécrit le JSON depuis quote_feature pour que les deux formes restent identiques
+    connection.exec_driver_sql(
+        f"UPDATE {quote_table} SET features = ("
+        f"SELECT json_group_array(feature) FROM (SELECT feature FROM {feature_table} "
+        f"WHERE quote_id = {quote_table}.id ORDER BY position))"
+    )
+
+@migration(3, 'Index plein texte FTS5 des devis, contacts et messages')
+def add_search_indexes(connection):
+    for kind in SEARCH_INDEXES:
+        create_search_index(connection, kind)
+
+@migration(4, 'Fils de discussion : fils, participants et liens message -> fil')
+def backfill_message_threads(connection):
+    quote = connection.dialect.identifier_preparer.quote
+    messages = quote(PrivateMessage.__tablename__)
+    threads = quote(MessageThread.__tablename__)
+    participants = quote(ThreadParticipant.__tablename__)
+    links = quote(ThreadMessage.__tablename__)
+    pair = f'min(m.sender_id, m.recipient_id), max(m.sender_id, m.recipient_id)'
+
+    connection.exec_driver_sql(
+        f"INSERT OR IGNORE INTO {threads} (user_low_id, user_high_id, created_at, message_count) "
+        f"SELECT {pair}, min(m.created_at), count(*) FROM {messages} AS m GROUP BY 1, 2"
+    )
+    connection.exec_driver_sql(
+        f"INSERT OR IGNORE INTO {links} (message_id, thread_id, created_at) "
+        f"SELECT m.id, t.id, m.created_at FROM {messages} AS m JOIN {threads} AS t "
+        f"ON t.user_low_id = min(m.sender_id, m.recipient_id) AND t.user_high_id = max(m.sender_id, m.recipient_id)"
+    )
+    # Dernier message et sujet (celui du premier message) de chaque fil
+    connection.exec_driver_sql(
+        f"UPDATE {threads} SET "
+        f"last_message_id = (SELECT message_id FROM {links} WHERE thread_id = {threads}.id ORDER BY created_at DESC, message_id DESC LIMIT 1), "
+        f"last_message_at = (SELECT max(created_at) FROM {links} WHERE thread_id = {threads}.id), "
+        f"subject = (SELECT m.subject FROM {links} AS l JOIN {messages} AS m ON m.id = l.message_id "
+        f"WHERE l.thread_id = {threads}.id ORDER BY l.created_at, l.message_id LIMIT 1), "
+        f"message_count = (SELECT count(*) FROM {links} WHERE thread_id = {threads}.id)"
+    )
+    connection.exec_driver_sql(
+        f"INSERT OR IGNORE INTO {participants} (thread_id, user_id, unread_count, last_message_at) "
+        f"SELECT id, user_low_id, 0, last_message_at FROM {threads} "
+        f"UNION SELECT id, user_high_id, 0, last_message_at FROM {threads}"
+    )
+    # CROSS JOIN : parcours des messages du fil, pas de tous les non-lus du destinataire (l'admin en a des milliers)
+    connection.exec_driver_sql(
+        f"UPDATE {participants} SET unread_count = (SELECT count(*) FROM {links} AS l CROSS JOIN {messages} AS m ON m.id = l.message_id "
+        f"WHERE l.thread_id = {participants}.thread_id AND m.recipient_id = {participants}.user_id "
+        f"AND m.is_read = 0 AND m.sender_id != m.recipient_id)"
+    )
+
+@migration(5, 'Index des sections de contenu par page')
+def add_content_index(connection):
+    create_index(connection, 'ix_site_content_page', SiteContent.__table__, ['page_name', 'section_name'])
+
+# Tables paginées sur (created_at, id) : une date NULL casse l'ordre et le curseur
+KEYSET_TABLES = (User.__table__, Order.__table__, Quote.__table__, Contact.__table__, PrivateMessage.__table__)
+LEGACY_CREATED_AT = '1970-01-01 00:00:00.000000'
+
+@migration(6, 'Dates de création obligatoires sur les tables paginées')
+def require_created_at(connection):
+    quote = connection.dialect.identifier_preparer.quote
+    for table in KEYSET_TABLES:
+        name = quote(table.name)
+        # Ligne sans date : celle de la ligne précédente (les ids suivent l'ordre d'insertion)
+        connection.exec_driver_sql(
+            f"UPDATE {name} SET created_at = coalesce((SELECT p.created_at FROM {name} AS p "
+            f"WHERE p.id < {name}.id AND p.created_at IS NOT NULL ORDER BY p.id DESC LIMIT 1), "
+            f"'{LEGACY_CREATED_AT}') WHERE created_at IS NULL"
+        )
+        # SQLite n'ajoute pas NOT NULL à une colonne existante sans recréer la table : triggers équivalents
+        for operation in ('INSERT', 'UPDATE OF created_at'):
+            trigger = quote(f"{table.name}_created_at_{operation.split()[0].lower()}")
+            connection.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {trigger} BEFORE {operation} ON {name} "
+                f"WHEN NEW.created_at IS NULL BEGIN "
+                f"SELECT RAISE(ABORT, 'NOT NULL constraint failed: {table.name}.created_at'); END"
+            )
+
+    # Fils construits avant le renseignement des dates
+    messages = quote(PrivateMessage.__tablename__)
+    threads = quote(MessageThread.__tablename__)
+    participants = quote(ThreadParticipant.__tablename__)
+    links = quote(ThreadMessage.__tablename__)
+    connection.exec_driver_sql(
+        f"UPDATE {links} SET created_at = (SELECT created_at FROM {messages} WHERE id = {links}.message_id) "
+        f"WHERE created_at IS NULL"
+    )
+    connection.exec_driver_sql(
+        f"UPDATE {threads} SET last_message_at = (SELECT max(created_at) FROM {links} WHERE thread_id = {threads}.id) "
+        f"WHERE last_message_at IS NULL"
+    )
+    connection.exec_driver_sql(
+        f"UPDATE {participants} SET last_message_at = (SELECT last_message_at FROM {threads} WHERE id = {participants}.thread_id) "
+        f"WHERE last_message_at IS NULL"
+    )
+
+@migration(7, 'Fils de discussion recréés avec ON DELETE CASCADE')
+def cascade_message_threads(connection):
+    # SQLite ne modifie pas une clé étrangère existante : les tables dérivées sont recréées puis reremplies
+    for model in (ThreadMessage, ThreadParticipant, MessageThread):
+        model.__table__.drop(connection, checkfirst=True)
+    for model in (MessageThread, ThreadParticipant, ThreadMessage):
+        model.__table__.create(connection)
+    backfill_message_threads(connection)
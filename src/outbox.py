@@ -0,0 +1,134 @@
+from flask import current_app
+from flask_mail import Message
+from src.models.user import db
+from src.routes.mail_transport import get_transport
+from datetime import datetime, timedelta
+import time
+
+class EmailOutbox(db.Model):
+    """Email en attente d'envoi, écrit dans la même transaction que la demande"""
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    recipient = db.Column(db.String(120), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'subject': self.subject,
+            'recipient': self.recipient,
+            'status': self.status,
+            'attempts': self.attempts,
+            'lastError': self.last_error,
+            'nextAttemptAt': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'sentAt': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+def queue_email(subject, recipient, body):
+    """Ajoute un email à l'outbox ; il part avec le prochain commit de la session"""
+    email = EmailOutbox(
+        subject=subject,
+        recipient=recipient,
+        body=body,
+        status='pending'
+    )
+    db.session.add(email)
+    return email
+
+def _claim(email_id, now, lease):
+    """Réserve un email pour ce worker (un seul worker peut gagner la réservation)"""
+    result = db.session.execute(
+        db.update(EmailOutbox)
+        .where(
+            EmailOutbox.id == email_id,
+            EmailOutbox.status.in_(['pending', 'sending']),
+            EmailOutbox.next_attempt_at <= now
+        )
+        .values(
+            status='sending',
+            attempts=EmailOutbox.attempts + 1,
+            next_attempt_at=now + timedelta(seconds=lease)
+        )
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def _send(email):
+    msg = Message(
+        subject=email.subject,
+        recipients=[email.recipient],
+        body=email.body,
+        sender=current_app.config['MAIL_DEFAULT_SENDER']
+    )
+    # Connexion SMTP partagée : un lot d'emails ne coûte qu'une négociation TLS
+    get_transport().send(msg)
+
+def due_emails_query(now, batch_size):
+    # Les emails restés en 'sending' au-delà du bail (worker arrêté) sont repris
+    return db.session.query(EmailOutbox.id).filter(
+        EmailOutbox.status.in_(['pending', 'sending']),
+        EmailOutbox.next_attempt_at <= now
+    ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(batch_size)
+
+def deliver_pending(batch_size=None):
+    """Envoie les emails arrivés à échéance, retourne le nombre d'emails envoyés"""
+    config = current_app.config
+    batch_size = batch_size or config.get('MAIL_OUTBOX_BATCH_SIZE', 50)
+    max_attempts = config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 6)
+    retry_base = config.get('MAIL_OUTBOX_RETRY_BASE', 30)
+    retry_max = config.get('MAIL_OUTBOX_RETRY_MAX', 3600)
+    lease = config.get('MAIL_OUTBOX_LEASE', 300)
+
+    now = datetime.utcnow()
+    due_ids = [row[0] for row in due_emails_query(now, batch_size).all()]
+
+    sent = 0
+    for email_id in due_ids:
+        if not _claim(email_id, now, lease):
+            continue
+
+        email = db.session.get(EmailOutbox, email_id)
+        try:
+            _send(email)
+            email.status = 'sent'
+            email.sent_at = datetime.utcnow()
+            email.last_error = None
+            sent += 1
+        except Exception as e:
+            print(f"Erreur envoi email #{email.id} (tentative {email.attempts}): {str(e)}")
+            email.last_error = str(e)
+            if email.attempts >= max_attempts:
+                email.status = 'failed'
+            else:
+                # Backoff exponentiel entre deux tentatives
+                delay = min(retry_base * 2 ** (email.attempts - 1), retry_max)
+                email.status = 'pending'
+                email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        db.session.commit()
+
+    return sent
+
+def run_worker(app, once=False):
+    """Boucle du worker d'envoi, lancée dans un process séparé des workers gunicorn"""
+    poll_interval = app.config.get('MAIL_OUTBOX_POLL_INTERVAL', 5)
+    while True:
+        with app.app_context():
+            try:
+                sent = deliver_pending()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Erreur worker outbox: {str(e)}")
+                sent = 0
+        if once:
+            return sent
+        if not sent:
+            time.sleep(poll_interval)
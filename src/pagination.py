@@ -0,0 +1,70 @@
+from flask import request
+from src.models.user import db
+from datetime import datetime
+import base64
+import json
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+class InvalidCursor(ValueError):
+    """Curseur de pagination illisible ou falsifié"""
+
+def encode_cursor(position):
+    """Encode une position (valeur JSON) en curseur opaque pour l'URL"""
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+
+def get_limit():
+    """Taille de page demandée (?limit=), bornée à MAX_LIMIT"""
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    return max(1, min(limit, MAX_LIMIT))
+
+def _parse_position(position):
+    try:
+        created_at, last_id = position
+        return datetime.fromisoformat(created_at), int(last_id)
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+
+def _sort_columns(model, columns):
+    return columns or (model.created_at, model.id)
+
+def keyset_query(query, model, position=None, limit=DEFAULT_LIMIT, columns=None):
+    """Requête d'une page triée sur (created_at, id) décroissants, reprise après `position`
+
+    `columns` remplace le couple (date, id) de tri, ex. (Thread.last_message_at, Thread.id).
+    """
+    sort_column, id_column = _sort_columns(model, columns)
+    if position is not None:
+        created_at, last_id = _parse_position(position)
+        # Comparaison de tuples : SQLite reprend directement dans l'index (created_at, id)
+        query = query.filter(db.tuple_(sort_column, id_column) < (created_at, last_id))
+
+    # Une ligne de plus que demandé pour savoir s'il reste une page
+    return query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+def keyset_page(query, model, position=None, limit=DEFAULT_LIMIT, columns=None):
+    """Une page de keyset_query : les lignes et la position de la page suivante (None en fin de liste)"""
+    rows = keyset_query(query, model, position, limit, columns).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    sort_column, id_column = _sort_columns(model, columns)
+    return rows, [getattr(last, sort_column.key).isoformat(), getattr(last, id_column.key)]
+
+def paginate(query, model, columns=None):
+    """Applique ?limit=&cursor= à la requête, retourne (lignes, nextCursor)"""
+    cursor = request.args.get('cursor')
+    position = decode_cursor(cursor) if cursor else None
+    rows, next_position = keyset_page(query, model, position, get_limit(), columns)
+    return rows, encode_cursor(next_position) if next_position else None
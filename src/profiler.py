@@ -0,0 +1,108 @@
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from logging.handlers import RotatingFileHandler
+from src.routes.query_plans import is_full_scan
+from collections import defaultdict
+import logging
+import os
+import time
+
+# Profileur SQL (désactivé par défaut, SQL_PROFILER_ENABLED) :
+# - chaque instruction avec sa durée et l'endpoint Flask qui l'a émise (niveau DEBUG) ;
+# - bilan par requête HTTP et candidats N+1 : même instruction exécutée au moins
+#   SQL_PROFILER_N_PLUS_ONE fois dans une requête (paramètres différents) ;
+# - requêtes lentes avec leur EXPLAIN QUERY PLAN.
+# Les paramètres ne sont pas journalisés (mots de passe hachés, emails...).
+
+logger = logging.getLogger('sql_profiler')
+
+_settings = {'slow': 0.1, 'repeats': 5, 'explain': True}
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return 'cli'
+
+def _compact(statement):
+    return ' '.join(statement.split())
+
+def _explain(cursor, statement, parameters):
+    """Plan SQLite de l'instruction, sur la connexion qui vient de l'exécuter"""
+    try:
+        rows = cursor.connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+    except Exception as e:
+        return [f'(plan indisponible : {e})']
+    return [row[-1] for row in rows]
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('profiler_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['profiler_start'].pop()
+    endpoint = _endpoint()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('%.1fms endpoint=%s %s%s', elapsed * 1000, endpoint, 'executemany ' if executemany else '', _compact(statement))
+
+    if has_request_context() and 'sql_profile' in g and not executemany:
+        entry = g.sql_profile[statement]
+        entry[0] += 1
+        entry[1] += elapsed
+
+    if elapsed >= _settings['slow']:
+        plan = []
+        if _settings['explain'] and not executemany and conn.dialect.name == 'sqlite':
+            plan = _explain(cursor, statement, parameters)
+        lines = [f'  {"FULL SCAN " if is_full_scan(detail) else ""}PLAN {detail}' for detail in plan]
+        logger.warning('SLOW %.1fms endpoint=%s %s', elapsed * 1000, endpoint, '\n'.join([_compact(statement)] + lines))
+
+def _handle_error(context):
+    # L'instruction a échoué : after_cursor_execute ne sera pas appelé
+    starts = context.connection.info.get('profiler_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def _before_request():
+    g.sql_profile = defaultdict(lambda: [0, 0.0])
+    g.sql_profile_start = time.perf_counter()
+
+def _after_request(response):
+    profile = g.pop('sql_profile', None)
+    if profile is None:
+        return response
+    endpoint = _endpoint()
+    statements = sum(count for count, _ in profile.values())
+    sql_time = sum(total for _, total in profile.values())
+    logger.info('REQUEST endpoint=%s status=%s %d statements %.1fms SQL / %.1fms', endpoint, response.status_code,
+                statements, sql_time * 1000, (time.perf_counter() - g.sql_profile_start) * 1000)
+    for statement, (count, total) in sorted(profile.items(), key=lambda item: -item[1][0]):
+        if count < _settings['repeats']:
+            break
+        logger.warning('N+1 endpoint=%s %dx %.1fms %s', endpoint, count, total * 1000, _compact(statement))
+    return response
+
+def init_profiler(app, engine):
+    """Branche le profileur sur le moteur et les requêtes si SQL_PROFILER_ENABLED"""
+    if not app.config.get('SQL_PROFILER_ENABLED', False):
+        return
+    _settings['slow'] = app.config.get('SQL_PROFILER_SLOW_MS', 100) / 1000
+    _settings['repeats'] = app.config.get('SQL_PROFILER_N_PLUS_ONE', 5)
+    _settings['explain'] = app.config.get('SQL_PROFILER_EXPLAIN', True)
+
+    path = app.config['SQL_PROFILER_LOG_FILE']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=app.config.get('SQL_PROFILER_LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=app.config.get('SQL_PROFILER_LOG_BACKUPS', 5),
+        delay=True
+    )
+    handler.setFormatter(logging.Formatter('%(asctime)s pid=%(process)d %(levelname)s %(message)s'))
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG if app.config.get('SQL_PROFILER_LOG_STATEMENTS', True) else logging.INFO)
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,265 @@
+from flask import request, has_request_context
+from sqlalchemy import event
+from src.models.user import db, User, Order, Quote, Contact, PrivateMessage, SiteContent
+from src.routes.hashing import hash_password
+from src.routes.outbox import EmailOutbox, due_emails_query
+from src.routes.threads import MessageThread
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import jwt
+
+# Vérification des plans de requête : chaque route est rejouée par le client de test sur
+# quelques lignes d'exemple, les instructions SQL qu'elle émet réellement sont capturées
+# (avec leurs paramètres), puis passées à EXPLAIN QUERY PLAN. Les listes sont demandées
+# avec ?limit=1 et la page suivante est rejouée : le plan des curseurs est vérifié aussi.
+
+SAMPLE_PASSWORD = 'plans-password'
+
+# Routes dont le parcours complet est voulu : export de toute la table, éditeur du contenu
+# du site (quelques dizaines de sections, toutes affichées)
+FULL_SCAN_ALLOWED = {'admin.export_data', 'admin.get_site_content'}
+
+# Endpoints sans SQL
+NO_QUERY_ENDPOINTS = {'static', 'serve'}
+
+QUOTE_REQUEST = {
+    'projectType': 'website', 'features': ['Blog', 'SEO'], 'budget': '2000-5000€', 'timeline': '2-3 mois',
+    'company': 'Plans SARL', 'description': 'Site vitrine', 'estimatedPrice': 3500
+}
+
+# (endpoint, méthode, chemin, compte, corps) ; chemins et corps callables reçoivent les ids d'exemple.
+# Un corps texte est envoyé tel quel avec le type indiqué dans le chemin (?format=).
+# Les suppressions viennent en dernier : les routes précédentes utilisent encore les lignes.
+ROUTE_REQUESTS = [
+    # user_bp
+    ('user.register', 'POST', '/api/register', None, {
+        'firstName': 'Plan', 'lastName': 'Register', 'email': 'register@plans.invalid', 'password': SAMPLE_PASSWORD}),
+    ('user.login', 'POST', '/api/login', None, {'email': 'member@plans.invalid', 'password': SAMPLE_PASSWORD}),
+    ('user.get_profile', 'GET', '/api/profile', 'member', None),
+    # quote_bp
+    ('quote.submit_quote', 'POST', '/api/quote', None, dict(QUOTE_REQUEST, email='quote@plans.invalid')),
+    ('quote.get_quotes', 'GET', '/api/quotes?limit=1', None, None),
+    ('quote.get_user_quotes', 'GET', '/api/quotes/user?limit=1', 'member', None),
+    ('quote.user_respond_to_quote', 'POST', '/api/quotes/{sent_quote_id}/respond', 'member',
+     {'response': 'accepted', 'message': 'OK'}),
+    # contact_bp
+    ('contact.submit_contact', 'POST', '/api/contact', None, {
+        'name': 'Plan', 'email': 'contact@plans.invalid', 'subject': 'Plans', 'message': 'Message'}),
+    ('contact.get_contacts', 'GET', '/api/contacts?limit=1', None, None),
+    # admin_bp
+    ('admin.get_all_users', 'GET', '/api/admin/users?limit=1', 'admin', None),
+    ('admin.get_user', 'GET', '/api/admin/users/{member_id}', 'admin', None),
+    ('admin.update_user', 'PUT', '/api/admin/users/{member_id}', 'admin', {'company': 'Plans'}),
+    ('admin.create_user', 'POST', '/api/admin/users', 'admin', {
+        'firstName': 'Plan', 'lastName': 'Admin', 'email': 'created@plans.invalid', 'password': SAMPLE_PASSWORD}),
+    ('admin.get_all_orders', 'GET', '/api/admin/orders?limit=1', 'admin', None),
+    ('admin.create_order', 'POST', '/api/admin/orders', 'admin',
+     lambda ids: {'title': 'Commande', 'type': 'website', 'price': 1500, 'userId': ids['member_id']}),
+    ('admin.update_order', 'PUT', '/api/admin/orders/{order_id}', 'admin', {'status': 'in-progress', 'progress': 50}),
+    ('admin.get_all_quotes', 'GET', '/api/admin/quotes?limit=1', 'admin', None),
+    ('admin.get_all_quotes', 'GET', '/api/admin/quotes?limit=1&feature=Blog', 'admin', None),
+    ('admin.get_quote_features', 'GET', '/api/admin/quotes/features', 'admin', None),
+    ('admin.get_quote_features', 'GET', '/api/admin/quotes/features?status=pending', 'admin', None),
+    ('admin.update_quote', 'PUT', '/api/admin/quotes/{quote_id}', 'admin', {'status': 'reviewed'}),
+    ('admin.admin_respond_to_quote', 'POST', '/api/admin/quotes/{quote_id}/respond', 'admin',
+     {'response': 'Proposition', 'price': 4200, 'timeline': '2 mois'}),
+    ('admin.bulk_action', 'POST', '/api/admin/orders/bulk', 'admin',
+     lambda ids: {'action': 'update', 'status': 'pending', 'filter': {'userId': ids['member_id']}}),
+    ('admin.bulk_action', 'POST', '/api/admin/quotes/bulk', 'admin',
+     lambda ids: {'action': 'update', 'status': 'pending', 'ids': [ids['quote_id']]}),
+    ('admin.bulk_action', 'POST', '/api/admin/contacts/bulk', 'admin',
+     lambda ids: {'action': 'delete', 'ids': [ids['bulk_contact_id']]}),
+    ('admin.search_all', 'GET', '/api/admin/search?q=site+vitrine&limit=1', 'admin', None),
+    ('admin.get_all_contacts', 'GET', '/api/admin/contacts?limit=1', 'admin', None),
+    ('admin.update_contact', 'PUT', '/api/admin/contacts/{contact_id}', 'admin', {'status': 'read'}),
+    ('admin.get_all_messages', 'GET', '/api/admin/messages?limit=1', 'admin', None),
+    ('admin.mark_message_read', 'PUT', '/api/admin/messages/{admin_message_id}/read', 'admin', None),
+    ('admin.send_admin_message', 'POST', '/api/admin/messages', 'admin',
+     lambda ids: {'subject': 'Plans', 'message': 'Message', 'recipientId': ids['member_id']}),
+    ('admin.get_all_threads', 'GET', '/api/admin/threads?limit=1', 'admin', None),
+    ('admin.get_admin_thread_messages', 'GET', '/api/admin/threads/{thread_id}/messages?limit=1', 'admin', None),
+    ('admin.mark_admin_thread_read', 'POST', '/api/admin/threads/{thread_id}/read', 'admin', None),
+    ('admin.get_site_content', 'GET', '/api/admin/content', 'admin', None),
+    ('admin.create_content', 'POST', '/api/admin/content', 'admin',
+     {'pageName': 'home', 'sectionName': 'created', 'contentType': 'text', 'content': 'Contenu'}),
+    ('admin.update_content', 'PUT', '/api/admin/content/{content_id}', 'admin', {'content': 'Contenu modifié'}),
+    ('admin.get_email', 'GET', '/api/admin/emails/{email_id}', 'admin', None),
+    ('admin.get_admin_stats', 'GET', '/api/admin/stats', 'admin', None),
+    ('admin.export_data', 'GET', '/api/admin/export/orders', 'admin', None),
+    ('admin.import_data', 'POST', '/api/admin/import/contacts?format=ndjson', 'admin',
+     '{"name": "Import", "email": "import@plans.invalid", "subject": "Import", "message": "Ligne"}\n'),
+    ('admin.import_data', 'POST', '/api/admin/import/orders?format=csv', 'admin',
+     lambda ids: f"orderId,title,type,status,price,userId\nIMPORT1,Site,website,completed,100,{ids['member_id']}\n"),
+    # dashboard_bp
+    ('dashboard.get_profile', 'GET', '/api/dashboard/profile', 'member', None),
+    ('dashboard.update_profile', 'PUT', '/api/dashboard/profile', 'member', {'phone': '0600000000'}),
+    ('dashboard.get_user_orders', 'GET', '/api/dashboard/orders?limit=1', 'member', None),
+    ('dashboard.get_user_messages', 'GET', '/api/dashboard/messages?limit=1', 'member', None),
+    ('dashboard.send_message_to_admin', 'POST', '/api/dashboard/messages', 'member', {'subject': 'Question', 'message': 'Message'}),
+    ('dashboard.create_stream_token', 'POST', '/api/dashboard/events/token', 'member', None),
+    ('dashboard.stream_events', 'GET', '/api/dashboard/events', 'member', None),
+    ('dashboard.get_user_threads', 'GET', '/api/dashboard/threads?limit=1', 'member', None),
+    ('dashboard.get_thread_messages', 'GET', '/api/dashboard/threads/{thread_id}/messages?limit=1', 'member', None),
+    ('dashboard.mark_thread_read', 'POST', '/api/dashboard/threads/{thread_id}/read', 'member', None),
+    ('dashboard.mark_all_messages_read', 'POST', '/api/dashboard/messages/read-all', 'member', None),
+    ('dashboard.get_user_stats', 'GET', '/api/dashboard/stats', 'member', None),
+    ('dashboard.get_user_quotes', 'GET', '/api/dashboard/quotes?limit=1', 'member', None),
+    ('dashboard.dashboard_respond_to_quote', 'POST', '/api/dashboard/quotes/{answered_quote_id}/respond', 'member',
+     {'response': 'rejected'}),
+    # content_bp et /metrics
+    ('content.get_page_content', 'GET', '/api/content/home', None, None),
+    ('metrics', 'GET', '/metrics', 'admin', None),
+    # Suppressions
+    ('admin.delete_order', 'DELETE', '/api/admin/orders/{spare_order_id}', 'admin', None),
+    ('admin.delete_quote', 'DELETE', '/api/admin/quotes/{spare_quote_id}', 'admin', None),
+    ('admin.delete_contact', 'DELETE', '/api/admin/contacts/{spare_contact_id}', 'admin', None),
+    ('admin.delete_content', 'DELETE', '/api/admin/content/{spare_content_id}', 'admin', None),
+    ('admin.delete_user', 'DELETE', '/api/admin/users/{spare_id}', 'admin', None),
+    ('dashboard.delete_account', 'DELETE', '/api/dashboard/account', 'owner', {'password': SAMPLE_PASSWORD}),
+]
+
+# Requêtes émises hors des routes (worker d'envoi des emails)
+def worker_queries():
+    return [('outbox.deliver_pending', due_emails_query(datetime.utcnow(), 50))]
+
+def sample_rows():
+    """Deux lignes de chaque liste (une page suivante existe) et les cibles des écritures"""
+    password = hash_password(SAMPLE_PASSWORD)
+    users = {key: User(first_name='Plan', last_name=key, email=f'{key}@plans.invalid', password=password, role=role)
+             for key, role in (('admin', 'admin'), ('member', 'member'), ('spare', 'member'), ('owner', 'member'))}
+    db.session.add_all(users.values())
+    db.session.flush()
+    member_id = users['member'].id
+
+    def order(code):
+        return Order(order_id=code, title='Site vitrine', type='website', price=1000, user_id=member_id)
+
+    def quote(status):
+        return Quote(project_type='website', features='["Blog"]', email='member@plans.invalid', description='Site vitrine',
+                     status=status, user_id=member_id, has_account=True)
+
+    def contact():
+        return Contact(name='Plan', email='contact@plans.invalid', subject='Site vitrine', message='Message')
+
+    rows = {
+        'order_id': order('PLAN0001'), 'spare_order_id': order('PLAN0002'),
+        'quote_id': quote('pending'), 'spare_quote_id': quote('pending'),
+        'sent_quote_id': quote('sent'), 'answered_quote_id': quote('sent'),
+        'contact_id': contact(), 'spare_contact_id': contact(), 'bulk_contact_id': contact(),
+        'content_id': SiteContent(page_name='home', section_name='hero', content_type='text', content='Bienvenue'),
+        'spare_content_id': SiteContent(page_name='home', section_name='footer', content_type='text', content='Pied'),
+        'admin_message_id': PrivateMessage(subject='Question', message='Site vitrine', sender_id=member_id,
+                                           recipient_id=users['admin'].id),
+        'email_id': EmailOutbox(subject='Plans', recipient='member@plans.invalid', body='Corps'),
+        'member_message_id': PrivateMessage(subject='Réponse', message='Site vitrine', sender_id=users['admin'].id,
+                                            recipient_id=member_id),
+    }
+    db.session.add_all(rows.values())
+    db.session.commit()
+    ids = {key: row.id for key, row in rows.items()}
+    ids.update({f'{key}_id': user.id for key, user in users.items()})
+    ids['thread_id'] = db.session.query(MessageThread.id).scalar()
+    return ids
+
+def _token(app, user_id):
+    return jwt.encode({'user_id': user_id, 'exp': datetime.utcnow() + timedelta(hours=1)},
+                      app.config['SECRET_KEY'], algorithm='HS256')
+
+def _open(app, client, ids, method, path, role, body, follow=True):
+    path = path.format(**ids)
+    kwargs = {'method': method, 'headers': {}}
+    if role is not None:
+        kwargs['headers']['Authorization'] = f"Bearer {_token(app, ids[f'{role}_id'])}"
+    body = body(ids) if callable(body) else body
+    if isinstance(body, str):
+        kwargs['data'] = body
+    elif body is not None:
+        kwargs['json'] = body
+    # Réponse non lue : un flux SSE n'est pas parcouru, seules comptent les requêtes de la route
+    response = client.open(path, buffered=False, **kwargs)
+    status = response.status_code
+    next_cursor = None
+    if follow and method == 'GET' and response.is_json:
+        next_cursor = (response.get_json() or {}).get('nextCursor')
+    response.close()
+    if next_cursor:
+        separator = '&' if '?' in path else '?'
+        next_page = f'{path}{separator}cursor={quote(next_cursor)}'.replace('{', '{{').replace('}', '}}')
+        status = max(status, _open(app, client, ids, method, next_page, role, None, follow=False))
+    return status
+
+def capture_route_statements(app, requests=ROUTE_REQUESTS):
+    """Rejoue les routes ; {(endpoint, instruction): paramètres} et les routes en échec"""
+    statements = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and request.endpoint:
+            if executemany:
+                parameters = parameters[0] if parameters else ()
+            statements.setdefault((request.endpoint, statement), parameters)
+
+    failures = []
+    ids = sample_rows()
+    client = app.test_client()
+    # Les POST publics rejoués ne doivent pas consommer les seaux d'admission partagés
+    admission = app.config.get('ADMISSION_ENABLED', True)
+    app.config['ADMISSION_ENABLED'] = False
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for endpoint, method, path, role, body in requests:
+            status = _open(app, client, ids, method, path, role, body)
+            if status >= 400:
+                failures.append((endpoint, f'{method} {path} -> {status}'))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+        app.config['ADMISSION_ENABLED'] = admission
+    return statements, failures
+
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+def explain_statement(statement, parameters=()):
+    """Lignes 'detail' de EXPLAIN QUERY PLAN pour une instruction SQL et ses paramètres"""
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+    return [row[-1] for row in rows]
+
+def explain(query):
+    """Lignes 'detail' de EXPLAIN QUERY PLAN pour une requête ORM ou Core"""
+    statement = getattr(query, 'statement', query)
+    compiled = statement.compile(dialect=db.session.connection().dialect, compile_kwargs={'render_postcompile': True})
+    parameters = [compiled.params[name] for name in compiled.positiontup]
+    return explain_statement(str(compiled), tuple(
+        value.isoformat(' ') if isinstance(value, datetime) else value for value in parameters))
+
+def is_full_scan(detail):
+    """SCAN sans index : la table est lue en entier
+
+    Ni une table FTS5 interrogée par MATCH, ni le parcours du résultat d'une sous-requête
+    (lignes déjà filtrées) n'en sont un.
+    """
+    return (detail.startswith('SCAN ') and ' USING ' not in detail and not detail.startswith('SCAN CONSTANT')
+            and ' VIRTUAL TABLE INDEX ' not in detail and not detail.startswith('SCAN (subquery-'))
+
+def check_query_plans(app):
+    """Plans des instructions émises par chaque route, et la liste des problèmes
+
+    Problèmes : parcours complet non autorisé, route en erreur, ou route de l'application
+    absente de ROUTE_REQUESTS. Écrit des lignes d'exemple : à lancer sur une base vide.
+    """
+    statements, problems = capture_route_statements(app)
+    replayed = {endpoint for endpoint, *_ in ROUTE_REQUESTS}
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint not in replayed and rule.endpoint not in NO_QUERY_ENDPOINTS:
+            problems.append((rule.endpoint, f'route non rejouée ({rule.rule})'))
+
+    report = []
+    plans = [(endpoint, statement, explain_statement(statement, parameters))
+             for (endpoint, statement), parameters in statements.items()
+             if statement.lstrip()[:7].upper().startswith(EXPLAINABLE)]
+    plans += [(endpoint, str(query), explain(query)) for endpoint, query in worker_queries()]
+    for endpoint, statement, plan in plans:
+        report.append((endpoint, ' '.join(statement.split()), plan))
+        if endpoint not in FULL_SCAN_ALLOWED:
+            for detail in plan:
+                if is_full_scan(detail):
+                    problems.append((endpoint, f"{detail} : {' '.join(statement.split())}"))
+    return report, problems
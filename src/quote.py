@@ -1,29 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
-from flask_mail import Mail, Message
+from flask import Blueprint, request, jsonify
 from src.models.user import db, Quote, User
-from src.routes.user import token_required
-import json
+from src.routes.user import token_required, decode_token
+from src.routes.outbox import queue_email
+from src.routes.quote_features import set_quote_features
+from src.routes.http_cache import conditional_collection
+from src.routes.pagination import paginate, InvalidCursor
+from src.routes.serializers import project, serialize_rows, json_response, QUOTE_FIELDS
+from src.routes.admission import admission_control
 from datetime import datetime
 
 quote_bp = Blueprint('quote', __name__)
 
-def send_email(subject, recipient, body):
-    """Fonction utilitaire pour envoyer des emails"""
-    try:
-        mail = Mail(current_app)
-        msg = Message(
-            subject=subject,
-            recipients=[recipient],
-            body=body,
-            sender=current_app.config['MAIL_DEFAULT_SENDER']
-        )
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print(f"Erreur envoi email: {str(e)}")
-        return False
-
 @quote_bp.route('/quote', methods=['POST'])
+@admission_control('quote')
 def submit_quote():
     try:
         data = request.get_json()
@@ -36,10 +25,9 @@ def submit_quote():
             # Récupérer l'utilisateur connecté
             auth_header = request.headers.get('Authorization')
             if auth_header:
-                import jwt
                 token = auth_header.split(' ')[1]
                 try:
-                    decoded_token = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+                    decoded_token = decode_token(token)
                     user_id = decoded_token['user_id']
                 except:
                     pass
@@ -47,7 +35,6 @@ def submit_quote():
         # Créer une nouvelle demande de devis
         new_quote = Quote(
             project_type=data['projectType'],
-            features=json.dumps(data['features']),
             budget=data['budget'],
             timeline=data['timeline'],
             company=data['company'],
@@ -58,9 +45,10 @@ def submit_quote():
             user_id=user_id,
             has_account=has_account
         )
+        set_quote_features(new_quote, data['features'])
         
         db.session.add(new_quote)
-        db.session.commit()
+        db.session.flush()
         
         # Préparer l'email pour l'admin
         email_subject = f"Nouvelle demande de devis - {data['company']}"
@@ -96,13 +84,15 @@ ID de la demande: {new_quote.id}
 Pour répondre à cette demande, connectez-vous au dashboard admin.
         """
         
-        # Envoyer l'email à l'admin
-        email_sent = send_email(email_subject, 'contact@buildrr.fr', email_body)
+        # L'email à l'admin est enregistré dans la même transaction que le devis
+        email = queue_email(email_subject, 'contact@buildrr.fr', email_body)
+        db.session.commit()
         
         return jsonify({
             'message': 'Quote submitted successfully',
             'quoteId': new_quote.id,
-            'emailSent': email_sent,
+            'emailId': email.id,
+            'emailStatus': email.status,
             'hasAccount': has_account
         }), 201
         
@@ -112,24 +102,31 @@ Pour répondre à cette demande, connectez-vous au dashboard admin.
 @quote_bp.route('/quotes', methods=['GET'])
 def get_quotes():
     try:
-        quotes = Quote.query.order_by(Quote.created_at.desc()).all()
-        return jsonify({
-            'quotes': [quote.to_dict() for quote in quotes]
-        }), 200
-        
+        quotes, next_cursor = paginate(project(QUOTE_FIELDS), Quote)
+        return json_response({
+            'quotes': serialize_rows(QUOTE_FIELDS, quotes),
+            'nextCursor': next_cursor
+        })
+        
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
 @quote_bp.route('/quotes/user', methods=['GET'])
 @token_required
+@conditional_collection('quotes.user.{user_id}')
 def get_user_quotes(current_user):
     """Récupérer les devis de l'utilisateur connecté"""
     try:
-        quotes = Quote.query.filter_by(user_id=current_user.id).order_by(Quote.created_at.desc()).all()
-        return jsonify({
-            'quotes': [quote.to_dict() for quote in quotes]
-        }), 200
-        
+        quotes, next_cursor = paginate(project(QUOTE_FIELDS).filter(Quote.user_id == current_user.id), Quote)
+        return json_response({
+            'quotes': serialize_rows(QUOTE_FIELDS, quotes),
+            'nextCursor': next_cursor
+        })
+        
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -158,8 +155,6 @@ def user_respond_to_quote(current_user, quote_id):
         quote.client_message = message
         quote.status = 'accepted' if response_type == 'accepted' else 'rejected'
         
-        db.session.commit()
-        
         # Envoyer un email à l'admin
         subject = f"Réponse au devis #{quote.id} - {quote.company}"
         response_text = "ACCEPTÉ" if response_type == 'accepted' else "REFUSÉ"
@@ -186,11 +181,14 @@ Réponse reçue le: {datetime.utcnow().strftime('%d/%m/%Y à %H:%M')}
 Connectez-vous au dashboard admin pour plus de détails.
         """
         
-        send_email(subject, 'contact@buildrr.fr', email_body)
+        email = queue_email(subject, 'contact@buildrr.fr', email_body)
+        db.session.commit()
         
         return jsonify({
             'message': f'Quote {response_type} successfully',
-            'quote': quote.to_dict()
+            'quote': quote.to_dict(),
+            'emailId': email.id,
+            'emailStatus': email.status
         }), 200
         
     except Exception as e:
@@ -0,0 +1,55 @@
+from src.models.user import db, Quote
+import json
+
+class QuoteFeature(db.Model):
+    """Fonctionnalité demandée dans un devis (une ligne par fonctionnalité)
+
+    Quote.features garde la liste en JSON (lu tel quel par les listes, interrogeable
+    avec json_each) ; cette table permet de filtrer et d'agréger par fonctionnalité
+    avec un index.
+    """
+    __tablename__ = 'quote_feature'
+    __table_args__ = (
+        db.Index('ix_quote_feature_feature', 'feature', 'quote_id'),
+    )
+
+    quote_id = db.Column(db.Integer, db.ForeignKey(Quote.id, ondelete='CASCADE'), primary_key=True)
+    feature = db.Column(db.String(100), primary_key=True)
+    position = db.Column(db.Integer, default=0, nullable=False)
+
+    quote = db.relationship(Quote, backref=db.backref('feature_links', cascade='all, delete-orphan', lazy=True))
+
+def normalize_features(features):
+    """Liste de fonctionnalités sans doublons ni valeurs vides, dans l'ordre reçu"""
+    seen = []
+    for feature in features or []:
+        feature = str(feature).strip()
+        if feature and feature not in seen:
+            seen.append(feature)
+    return seen
+
+def set_quote_features(quote, features):
+    """Écrit les fonctionnalités d'un devis : JSON compact + lignes de quote_feature"""
+    features = normalize_features(features)
+    quote.features = json.dumps(features, ensure_ascii=False, separators=(',', ':'))
+    quote.feature_links = [
+        QuoteFeature(feature=feature, position=position)
+        for position, feature in enumerate(features)
+    ]
+    return features
+
+def filter_by_feature(query, feature):
+    """Restreint une requête de devis à ceux qui demandent cette fonctionnalité"""
+    return query.filter(Quote.id.in_(
+        db.select(QuoteFeature.quote_id).where(QuoteFeature.feature == feature)
+    ))
+
+def feature_counts_query(status=None):
+    """Nombre de devis par fonctionnalité, calculé en SQL"""
+    query = db.session.query(QuoteFeature.feature, db.func.count(QuoteFeature.quote_id))
+    if status:
+        query = query.join(Quote, Quote.id == QuoteFeature.quote_id).filter(Quote.status == status)
+    return query.group_by(QuoteFeature.feature).order_by(db.func.count(QuoteFeature.quote_id).desc(), QuoteFeature.feature)
+
+def feature_counts(status=None):
+    return feature_counts_query(status).all()
@@ -0,0 +1,113 @@
+from src.models.user import db, Quote, Contact, PrivateMessage
+from src.routes.pagination import InvalidCursor
+from datetime import datetime
+import re
+
+# Index plein texte FTS5 « external content » : le texte reste dans les tables,
+# l'index est tenu à jour par des triggers SQLite (donc aussi pour les écritures en masse).
+# type -> (modèle, table FTS, colonnes indexées, colonne affichée comme titre)
+SEARCH_INDEXES = {
+    'quotes': (Quote, 'quote_fts', ['company', 'email', 'description'], 'company'),
+    'contacts': (Contact, 'contact_fts', ['name', 'subject', 'message'], 'subject'),
+    'messages': (PrivateMessage, 'message_fts', ['subject', 'message'], 'subject'),
+}
+
+# Accents ignorés (« developpement » trouve « développement »)
+TOKENIZER = 'unicode61 remove_diacritics 2'
+MAX_TERMS = 10
+SNIPPET_TOKENS = 16
+
+def create_search_index(connection, kind):
+    """Table FTS5, triggers de synchronisation et indexation des lignes existantes"""
+    model, fts, columns, _ = SEARCH_INDEXES[kind]
+    quote = connection.dialect.identifier_preparer.quote
+    table = quote(model.__table__.name)
+    names = ', '.join(quote(column) for column in columns)
+    new_values = ', '.join(f'new.{quote(column)}' for column in columns)
+    old_values = ', '.join(f'old.{quote(column)}' for column in columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values});"
+
+    connection.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, "
+        f"content={table}, content_rowid='id', tokenize='{TOKENIZER}')"
+    )
+    connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END")
+    connection.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END")
+    connection.exec_driver_sql(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END"
+    )
+    connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+def fts_query(text):
+    """Texte libre -> requête MATCH : chaque mot entre guillemets, en préfixe, tous requis
+
+    Les guillemets neutralisent la syntaxe FTS5 (AND, NEAR, *, :, ...) saisie par l'utilisateur.
+    """
+    terms = [term for term in text.split() if re.search(r'\w', term)][:MAX_TERMS]
+    return ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+def _branch(kind, order):
+    # Scores bm25 de tables FTS différentes non comparables (statistiques propres à chaque
+    # index) : chaque table classe ses résultats, les tables sont ensuite entrelacées par rang
+    model, fts, columns, title = SEARCH_INDEXES[kind]
+    table = model.__table__.name
+    return (
+        f"SELECT '{kind}' AS kind, {order} AS kind_order, {fts}.rowid AS id, {fts}.rank AS score, "
+        f"row_number() OVER (ORDER BY {fts}.rank, {fts}.rowid) AS position, "
+        f'"{table}".{title} AS title, "{table}".created_at AS created_at '
+        f'FROM {fts} JOIN "{table}" ON "{table}".id = {fts}.rowid '
+        f"WHERE {fts} MATCH :match"
+    )
+
+def search_statement(match, kinds, position=None, limit=50):
+    """Résultats entrelacés : le 1er de chaque type, puis le 2e, ... repris après `position` = [rang, ordre]"""
+    union = ' UNION ALL '.join(_branch(kind, order) for order, kind in enumerate(SEARCH_INDEXES) if kind in kinds)
+    params = {'match': match, 'limit': limit + 1}
+    where = ''
+    if position is not None:
+        try:
+            rank, kind_order = position
+            params['position'], params['kind_order'] = int(rank), int(kind_order)
+        except Exception:
+            raise InvalidCursor('Invalid cursor')
+        where = 'WHERE (position, kind_order) > (:position, :kind_order) '
+    return db.text(
+        f'SELECT kind, kind_order, id, score, position, title, created_at FROM ({union}) '
+        f'{where}ORDER BY position, kind_order LIMIT :limit'
+    ).bindparams(**params)
+
+def _snippets(match, kind, ids):
+    """Extraits des lignes d'une page (snippet() n'est pas utilisable sous un classement fenêtré)"""
+    _, fts, _, _ = SEARCH_INDEXES[kind]
+    rows = db.session.execute(db.text(
+        f"SELECT rowid, snippet({fts}, -1, '', '', '…', {SNIPPET_TOKENS}) FROM {fts} "
+        f"WHERE {fts} MATCH :match AND rowid IN :ids"
+    ).bindparams(db.bindparam('ids', expanding=True)), {'match': match, 'ids': ids})
+    return dict(rows.fetchall())
+
+def search(text, kinds, position=None, limit=50):
+    """Une page de résultats et la position de la page suivante (None en fin de liste)"""
+    match = fts_query(text)
+    if not match:
+        return [], None
+    rows = db.session.execute(search_statement(match, kinds, position, limit)).fetchall()
+    next_position = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_position = [last.position, last.kind_order]
+    ids = {}
+    for row in rows:
+        ids.setdefault(row.kind, []).append(row.id)
+    snippets = {kind: _snippets(match, kind, kind_ids) for kind, kind_ids in ids.items()}
+    hits = [{
+        'type': row.kind,
+        'id': row.id,
+        'title': row.title,
+        'snippet': snippets[row.kind].get(row.id),
+        'score': row.score,
+        'createdAt': datetime.fromisoformat(str(row.created_at)).isoformat() if row.created_at else None
+    } for row in rows]
+    return hits, next_position
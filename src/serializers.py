@@ -0,0 +1,168 @@
+from flask import current_app
+from src.models.user import db, User, Order, Quote, Contact, PrivateMessage, SiteContent
+from src.routes.threads import MessageThread, ThreadParticipant, Counterpart, CounterpartUser, LastMessage
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Sérialisation des listes sans objets ORM : on ne sélectionne que les colonnes
+# exposées et on encode les tuples directement, avec les mêmes clés que to_dict().
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def _features(value):
+    return json.loads(value) if value else []
+
+def _raw_features(value):
+    # Quote.features est déjà du JSON (écrit par set_quote_features) : recopié sans réencodage.
+    # orjson n'inspecte pas un Fragment, la valeur est donc validée avant ; invalide, elle
+    # passe par json.loads comme dans to_dict().
+    if not value:
+        return []
+    try:
+        orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return json.loads(value)
+    return orjson.Fragment(value)
+
+if orjson is not None and hasattr(orjson, 'Fragment'):
+    _features = _raw_features
+
+# (clé JSON, colonne, conversion)
+USER_FIELDS = [
+    ('id', User.id, None),
+    ('firstName', User.first_name, None),
+    ('lastName', User.last_name, None),
+    ('email', User.email, None),
+    ('company', User.company, None),
+    ('phone', User.phone, None),
+    ('role', User.role, None),
+    ('isActive', User.is_active, None),
+    ('createdAt', User.created_at, _iso)
+]
+
+ORDER_FIELDS = [
+    ('id', Order.id, None),
+    ('orderId', Order.order_id, None),
+    ('title', Order.title, None),
+    ('type', Order.type, None),
+    ('status', Order.status, None),
+    ('price', Order.price, None),
+    ('description', Order.description, None),
+    ('progress', Order.progress, None),
+    ('userId', Order.user_id, None),
+    ('createdAt', Order.created_at, _iso),
+    ('completedAt', Order.completed_at, _iso)
+]
+
+QUOTE_FIELDS = [
+    ('id', Quote.id, None),
+    ('projectType', Quote.project_type, None),
+    ('features', Quote.features, _features),
+    ('budget', Quote.budget, None),
+    ('timeline', Quote.timeline, None),
+    ('company', Quote.company, None),
+    ('email', Quote.email, None),
+    ('phone', Quote.phone, None),
+    ('description', Quote.description, None),
+    ('estimatedPrice', Quote.estimated_price, None),
+    ('status', Quote.status, None),
+    ('userId', Quote.user_id, None),
+    ('hasAccount', Quote.has_account, None),
+    ('adminResponse', Quote.admin_response, None),
+    ('adminPrice', Quote.admin_price, None),
+    ('adminTimeline', Quote.admin_timeline, None),
+    ('respondedAt', Quote.responded_at, _iso),
+    ('clientResponse', Quote.client_response, None),
+    ('clientResponseAt', Quote.client_response_at, _iso),
+    ('clientMessage', Quote.client_message, None),
+    ('createdAt', Quote.created_at, _iso)
+]
+
+CONTACT_FIELDS = [
+    ('id', Contact.id, None),
+    ('name', Contact.name, None),
+    ('email', Contact.email, None),
+    ('company', Contact.company, None),
+    ('phone', Contact.phone, None),
+    ('subject', Contact.subject, None),
+    ('message', Contact.message, None),
+    ('status', Contact.status, None),
+    ('createdAt', Contact.created_at, _iso)
+]
+
+MESSAGE_FIELDS = [
+    ('id', PrivateMessage.id, None),
+    ('subject', PrivateMessage.subject, None),
+    ('message', PrivateMessage.message, None),
+    ('senderId', PrivateMessage.sender_id, None),
+    ('recipientId', PrivateMessage.recipient_id, None),
+    ('isRead', PrivateMessage.is_read, None),
+    ('createdAt', PrivateMessage.created_at, _iso)
+]
+
+# Boîte de réception d'un utilisateur (voir threads.inbox_query)
+THREAD_FIELDS = [
+    ('id', ThreadParticipant.thread_id, None),
+    ('subject', MessageThread.subject, None),
+    ('participantId', Counterpart.user_id, None),
+    ('participantFirstName', CounterpartUser.first_name, None),
+    ('participantLastName', CounterpartUser.last_name, None),
+    ('lastMessageAt', ThreadParticipant.last_message_at, _iso),
+    ('lastMessageSubject', LastMessage.subject, None),
+    ('lastMessageSenderId', LastMessage.sender_id, None),
+    ('messageCount', MessageThread.message_count, None),
+    ('unreadCount', ThreadParticipant.unread_count, None)
+]
+
+# Tous les fils, vue admin (voir threads.all_threads_query)
+ADMIN_THREAD_FIELDS = [
+    ('id', MessageThread.id, None),
+    ('subject', MessageThread.subject, None),
+    ('lastMessageAt', MessageThread.last_message_at, _iso),
+    ('lastMessageSubject', LastMessage.subject, None),
+    ('lastMessageSenderId', LastMessage.sender_id, None),
+    ('messageCount', MessageThread.message_count, None)
+]
+
+# Sections publiques d'une page du site (voir content.page_content_query)
+CONTENT_SECTION_FIELDS = [
+    ('id', SiteContent.id, None),
+    ('sectionName', SiteContent.section_name, None),
+    ('contentType', SiteContent.content_type, None),
+    ('content', SiteContent.content, None),
+    ('updatedAt', SiteContent.updated_at, _iso)
+]
+
+def project(fields):
+    """Requête qui ne sélectionne que les colonnes des champs (lignes = tuples)"""
+    return db.session.query(*[column for _, column, _ in fields])
+
+def serialize_rows(fields, rows):
+    """Tuples -> dicts avec les clés de to_dict(), sans passer par l'ORM"""
+    keys = [key for key, _, _ in fields]
+    converters = [(index, convert) for index, (_, _, convert) in enumerate(fields) if convert]
+    if not converters:
+        return [dict(zip(keys, row)) for row in rows]
+
+    items = []
+    for row in rows:
+        values = list(row)
+        for index, convert in converters:
+            values[index] = convert(values[index])
+        items.append(dict(zip(keys, values)))
+    return items
+
+def dumps(payload):
+    """JSON en bytes, avec orjson s'il est installé"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Équivalent de jsonify() avec l'encodeur rapide"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
@@ -0,0 +1,132 @@
+from flask import current_app, request, send_file
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fichiers produits par le build du front : contenu figé, cache d'un an. La liste vient du
+# manifeste de Vite (build.manifest) ; sans manifeste, seuls les noms de assets/ portant le
+# hash de 8 caractères de Vite (ex. assets/index-4f8a9c2b.js) sont considérés comme figés.
+VITE_MANIFEST = '.vite/manifest.json'
+HASHED_NAME = re.compile(r'^assets/.+[.-][A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+COMPRESSIBLE = {'.html', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.xml', '.map', '.ico', '.webmanifest'}
+MIN_COMPRESS_SIZE = 1024  # octets
+
+# Variantes précompressées, par ordre de préférence
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+class StaticAsset:
+    """Métadonnées d'un fichier statique, calculées une fois au démarrage"""
+
+    def __init__(self, path, name, immutable=False):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.cache_control = IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        self.etag = digest.hexdigest()[:32]
+        self.variants = {}
+
+    def representation(self, accept_encodings):
+        """(chemin, encodage, etag) de la meilleure variante acceptée par le client"""
+        for encoding, suffix in ENCODINGS:
+            if encoding in self.variants and accept_encodings[encoding]:
+                return self.variants[encoding], encoding, f'{self.etag}-{suffix[1:]}'
+        return self.path, None, self.etag
+
+class StaticManifest:
+    """Index du dossier static : chemin relatif -> StaticAsset, sans accès disque par requête"""
+
+    def __init__(self, folder, precompress=False):
+        self.folder = folder
+        self.assets = {}
+        self.index = None
+        if folder and os.path.isdir(folder):
+            if precompress:
+                self._precompress()
+            self._build()
+
+    def _files(self):
+        for root, dirs, files in os.walk(self.folder):
+            for filename in files:
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, self.folder).replace(os.sep, '/'), path
+
+    def _precompress(self):
+        """Écrit les variantes .gz (et .br si brotli est installé) manquantes"""
+        for name, path in list(self._files()):
+            if os.path.splitext(name)[1] not in COMPRESSIBLE or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            if not os.path.exists(path + '.gz'):
+                with open(path + '.gz', 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9))
+            if brotli is not None and not os.path.exists(path + '.br'):
+                with open(path + '.br', 'wb') as f:
+                    f.write(brotli.compress(data))
+
+    def _fingerprinted(self, files):
+        """Noms des fichiers dont le nom change avec le contenu (None : pas de manifeste lisible)"""
+        if VITE_MANIFEST not in files:
+            return None
+        try:
+            with open(files[VITE_MANIFEST], encoding='utf-8') as f:
+                chunks = json.load(f).values()
+            names = set()
+            for chunk in chunks:
+                names.add(chunk['file'])
+                names.update(chunk.get('css', []))
+                names.update(chunk.get('assets', []))
+            return names
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def _build(self):
+        files = dict(self._files())
+        fingerprinted = self._fingerprinted(files)
+        for name, path in files.items():
+            if any(name.endswith(suffix) and name[:-len(suffix)] in files for _, suffix in ENCODINGS):
+                continue
+            if fingerprinted is not None:
+                immutable = name in fingerprinted
+            else:
+                immutable = HASHED_NAME.match(name) is not None
+            asset = StaticAsset(path, name, immutable)
+            for encoding, suffix in ENCODINGS:
+                if name + suffix in files:
+                    asset.variants[encoding] = files[name + suffix]
+            self.assets[name] = asset
+        self.index = self.assets.get('index.html')
+
+    def get(self, name):
+        return self.assets.get(name)
+
+def serve_asset(asset):
+    """Réponse pour un fichier du manifeste : variante compressée, ETag fort, 304"""
+    path, encoding, etag = asset.representation(request.accept_encodings)
+    headers = {'Cache-Control': asset.cache_control}
+    if asset.variants:
+        headers['Vary'] = 'Accept-Encoding'
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = send_file(path, mimetype=asset.mimetype, conditional=False, etag=False, max_age=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers.update(headers)
+    return response
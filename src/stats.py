@@ -0,0 +1,145 @@
+from flask import current_app, has_app_context
+from sqlalchemy.orm import attributes
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models.user import db, User, Order, Quote, Contact
+from src.routes.changes import on_row_change, on_apply, track_previous
+from collections import defaultdict
+
+class StatsCounter(db.Model):
+    """Compteurs agrégés tenus à jour à chaque écriture (STATS_COUNTERS_ENABLED)"""
+    __tablename__ = 'stats_counter'
+
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Float, default=0, nullable=False)
+
+def counters_enabled():
+    return has_app_context() and current_app.config.get('STATS_COUNTERS_ENABLED', False)
+
+def compute_totals():
+    """Totaux calculés en base : une requête groupée par table"""
+    totals = defaultdict(float)
+
+    users, contacts = db.session.query(
+        db.select(db.func.count(User.id)).scalar_subquery(),
+        db.select(db.func.count(Contact.id)).scalar_subquery()
+    ).one()
+    totals['users.count'] = users
+    totals['contacts.count'] = contacts
+
+    for status, count, revenue in db.session.query(Order.status, db.func.count(Order.id), db.func.sum(Order.price)).group_by(Order.status):
+        totals[f'orders.count.{status}'] = count
+        totals[f'orders.revenue.{status}'] = revenue or 0
+
+    for status, count in db.session.query(Quote.status, db.func.count(Quote.id)).group_by(Quote.status):
+        totals[f'quotes.count.{status}'] = count
+
+    return totals
+
+def read_counters():
+    """Totaux lus dans la table de compteurs : une seule requête, quelle que soit la volumétrie"""
+    totals = defaultdict(float)
+    for name, value in db.session.query(StatsCounter.name, StatsCounter.value):
+        totals[name] = value
+    return totals
+
+def rebuild_counters():
+    """Recalcule tous les compteurs depuis les tables (activation, réparation)"""
+    totals = compute_totals()
+    db.session.query(StatsCounter).delete()
+    db.session.add_all([StatsCounter(name=name, value=value) for name, value in totals.items()])
+    db.session.commit()
+
+def ensure_counters():
+    """Initialise les compteurs au démarrage s'ils sont activés et encore vides"""
+    if counters_enabled() and not db.session.query(StatsCounter.name).first():
+        rebuild_counters()
+
+def get_totals():
+    return read_counters() if counters_enabled() else compute_totals()
+
+def _sum(totals, prefix):
+    return sum(value for name, value in totals.items() if name.startswith(prefix))
+
+def build_admin_stats(totals, unread_messages):
+    return {
+        'totalUsers': int(totals['users.count']),
+        'totalOrders': int(_sum(totals, 'orders.count.')),
+        'totalQuotes': int(_sum(totals, 'quotes.count.')),
+        'totalContacts': int(totals['contacts.count']),
+        'unreadMessages': unread_messages,
+        'totalRevenue': totals['orders.revenue.completed'] or 0,
+        'pendingRevenue': totals['orders.revenue.pending'] or 0,
+        'ordersByStatus': {
+            'pending': int(totals['orders.count.pending']),
+            'in_progress': int(totals['orders.count.in-progress']),
+            'completed': int(totals['orders.count.completed']),
+            'cancelled': int(totals['orders.count.cancelled'])
+        },
+        'quotesByStatus': {
+            'pending': int(totals['quotes.count.pending']),
+            'reviewed': int(totals['quotes.count.reviewed']),
+            'converted': int(totals['quotes.count.converted']),
+            'rejected': int(totals['quotes.count.rejected'])
+        }
+    }
+
+# ===== MAINTENANCE INCRÉMENTALE =====
+
+def contribution(model, status=None, price=None):
+    """Compteurs auxquels contribue une ligne de `model` (statut et prix des commandes et devis)"""
+    if model is User:
+        return {'users.count': 1}
+    if model is Contact:
+        return {'contacts.count': 1}
+    if model is Order:
+        return {f'orders.count.{status}': 1, f'orders.revenue.{status}': price or 0}
+    if model is Quote:
+        return {f'quotes.count.{status}': 1}
+    return {}
+
+def _previous(obj, key):
+    """Valeur d'un attribut avant les modifications en cours de flush"""
+    history = attributes.get_history(obj, key)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, key)
+
+def _row_contribution(obj, current):
+    """Contribution d'une ligne ORM, avec ses valeurs actuelles ou précédentes"""
+    value = getattr if current else _previous
+    model = type(obj)
+    if model is Order:
+        return contribution(model, value(obj, 'status'), value(obj, 'price'))
+    if model is Quote:
+        return contribution(model, value(obj, 'status'))
+    return contribution(model)
+
+track_previous(Order.status, Order.price, Quote.status)
+
+@on_row_change
+def _count_row(changes, connection, obj, state):
+    if state == 'new':
+        changes.count(_row_contribution(obj, True))
+    elif state == 'deleted':
+        changes.count(_row_contribution(obj, False), -1)
+    elif isinstance(obj, (Order, Quote)):
+        changes.count(_row_contribution(obj, False), -1)
+        changes.count(_row_contribution(obj, True))
+
+def add_to_counters(deltas, connection=None):
+    """Ajoute les deltas aux compteurs, en une instruction"""
+    rows = [{'name': name, 'value': delta} for name, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    connection = connection or db.session.connection()
+    table = StatsCounter.__table__
+    stmt = sqlite_insert(table)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'value': table.c.value + stmt.excluded.value}
+    ), rows)
+
+@on_apply
+def _apply_counters(changes, connection):
+    if counters_enabled():
+        add_to_counters(changes.counters, connection)
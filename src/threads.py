@@ -0,0 +1,244 @@
+from sqlalchemy.orm import attributes, aliased
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models.user import db, User, PrivateMessage
+from src.routes.changes import ChangeSet, on_row_change, apply_changes, track_previous
+from datetime import datetime
+
+# Conversations : un fil par paire d'utilisateurs. Les fils, les participants (avec leur
+# nombre de non-lus) et le lien message -> fil sont tenus à jour à chaque flush, pour que
+# la boîte de réception se lise page par page sans parcourir l'historique. Les compteurs
+# de non-lus des participants sont aussi la source des « messages non lus » des stats.
+
+class MessageThread(db.Model):
+    """Fil de discussion entre deux utilisateurs (user_low_id < user_high_id)"""
+    __tablename__ = 'message_thread'
+    __table_args__ = (
+        db.UniqueConstraint('user_low_id', 'user_high_id', name='uq_message_thread_pair'),
+        db.Index('ix_message_thread_last', 'last_message_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_low_id = db.Column(db.Integer, db.ForeignKey(User.id, ondelete='CASCADE'), nullable=False)
+    user_high_id = db.Column(db.Integer, db.ForeignKey(User.id, ondelete='CASCADE'), nullable=False)
+    subject = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_message_at = db.Column(db.DateTime)
+    last_message_id = db.Column(db.Integer)
+    message_count = db.Column(db.Integer, default=0, nullable=False)
+
+class ThreadParticipant(db.Model):
+    """Place d'un utilisateur dans un fil : compteur de non-lus et date pour trier sa boîte"""
+    __tablename__ = 'thread_participant'
+    __table_args__ = (
+        db.Index('ix_thread_participant_inbox', 'user_id', 'last_message_at', 'thread_id'),
+    )
+
+    thread_id = db.Column(db.Integer, db.ForeignKey(MessageThread.id, ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey(User.id, ondelete='CASCADE'), primary_key=True)
+    unread_count = db.Column(db.Integer, default=0, nullable=False)
+    last_message_at = db.Column(db.DateTime)
+
+class ThreadMessage(db.Model):
+    """Message -> fil, avec la date du message pour paginer un fil sur son index"""
+    __tablename__ = 'thread_message'
+    __table_args__ = (
+        db.Index('ix_thread_message_thread', 'thread_id', 'created_at', 'message_id'),
+    )
+
+    message_id = db.Column(db.Integer, db.ForeignKey(PrivateMessage.id, ondelete='CASCADE'), primary_key=True)
+    thread_id = db.Column(db.Integer, db.ForeignKey(MessageThread.id, ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime)
+
+# L'autre participant d'un fil, vu depuis la boîte d'un utilisateur
+Counterpart = aliased(ThreadParticipant, name='counterpart')
+CounterpartUser = aliased(User, name='counterpart_user')
+LastMessage = aliased(PrivateMessage, name='last_message')
+
+# ===== MISE À JOUR À CHAQUE FLUSH (hook de src/changes.py) =====
+
+def _is_unread(message):
+    return not message.is_read and message.sender_id != message.recipient_id
+
+def _message_added(connection, message):
+    threads = MessageThread.__table__
+    participants = ThreadParticipant.__table__
+    created_at = message.created_at or datetime.utcnow()
+    low, high = sorted((message.sender_id, message.recipient_id))
+
+    stmt = sqlite_insert(threads).values(
+        user_low_id=low, user_high_id=high, subject=message.subject, created_at=created_at,
+        last_message_at=created_at, last_message_id=message.id, message_count=1
+    )
+    newer = stmt.excluded.last_message_at >= threads.c.last_message_at
+    thread_id = connection.execute(stmt.on_conflict_do_update(
+        index_elements=['user_low_id', 'user_high_id'],
+        set_={
+            'last_message_at': db.case((newer, stmt.excluded.last_message_at), else_=threads.c.last_message_at),
+            'last_message_id': db.case((newer, stmt.excluded.last_message_id), else_=threads.c.last_message_id),
+            'message_count': threads.c.message_count + 1
+        }
+    ).returning(threads.c.id)).scalar_one()
+
+    for user_id in {low, high}:
+        unread = 1 if user_id == message.recipient_id and _is_unread(message) else 0
+        stmt = sqlite_insert(participants).values(
+            thread_id=thread_id, user_id=user_id, unread_count=unread, last_message_at=created_at
+        )
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=['thread_id', 'user_id'],
+            set_={
+                'unread_count': participants.c.unread_count + stmt.excluded.unread_count,
+                'last_message_at': db.func.max(participants.c.last_message_at, stmt.excluded.last_message_at)
+            }
+        ))
+
+    connection.execute(ThreadMessage.__table__.insert().values(
+        message_id=message.id, thread_id=thread_id, created_at=created_at
+    ))
+
+def _read_changed(connection, message, delta):
+    participants = ThreadParticipant.__table__
+    thread_id = db.select(ThreadMessage.thread_id).where(ThreadMessage.message_id == message.id).scalar_subquery()
+    connection.execute(participants.update().where(
+        participants.c.thread_id == thread_id,
+        participants.c.user_id == message.recipient_id
+    ).values(unread_count=db.func.max(participants.c.unread_count + delta, 0)))
+
+def refresh_thread(connection, thread_id):
+    """Recalcule un fil depuis ses messages (après suppression) ; supprime le fil s'il est vide"""
+    threads = MessageThread.__table__
+    participants = ThreadParticipant.__table__
+    links = ThreadMessage.__table__
+    in_thread = links.c.thread_id == thread_id
+
+    count = connection.execute(db.select(db.func.count()).select_from(links).where(in_thread)).scalar()
+    if not count:
+        connection.execute(participants.delete().where(participants.c.thread_id == thread_id))
+        connection.execute(threads.delete().where(threads.c.id == thread_id))
+        return
+
+    last = connection.execute(
+        db.select(links.c.message_id, links.c.created_at).where(in_thread)
+        .order_by(links.c.created_at.desc(), links.c.message_id.desc()).limit(1)
+    ).one()
+    connection.execute(threads.update().where(threads.c.id == thread_id).values(
+        message_count=count, last_message_id=last.message_id, last_message_at=last.created_at
+    ))
+    unread = (
+        db.select(db.func.count()).select_from(links)
+        .join(PrivateMessage.__table__, PrivateMessage.id == links.c.message_id)
+        .where(in_thread, PrivateMessage.recipient_id == participants.c.user_id,
+               PrivateMessage.is_read == False, PrivateMessage.sender_id != PrivateMessage.recipient_id)
+        .scalar_subquery()
+    )
+    connection.execute(participants.update().where(participants.c.thread_id == thread_id).values(
+        unread_count=unread, last_message_at=last.created_at
+    ))
+
+def _message_deleted(connection, message):
+    # Le lien message -> fil est déjà parti avec le message (ON DELETE CASCADE) : fil retrouvé par la paire
+    threads = MessageThread.__table__
+    low, high = sorted((message.sender_id, message.recipient_id))
+    thread_id = connection.execute(db.select(threads.c.id).where(
+        threads.c.user_low_id == low, threads.c.user_high_id == high
+    )).scalar()
+    if thread_id is None:
+        return
+    refresh_thread(connection, thread_id)
+
+track_previous(PrivateMessage.is_read)
+
+@on_row_change
+def _update_threads(changes, connection, obj, state):
+    if not isinstance(obj, PrivateMessage):
+        return
+    if state == 'new':
+        _message_added(connection, obj)
+    elif state == 'deleted':
+        _message_deleted(connection, obj)
+    else:
+        history = attributes.get_history(obj, 'is_read')
+        if history.added and history.deleted and bool(history.added[0]) != bool(history.deleted[0]):
+            _read_changed(connection, obj, -1 if history.added[0] else 1)
+
+# ===== LECTURE =====
+
+def inbox_query(query, user_id):
+    """Fils de l'utilisateur (requête projetée sur THREAD_FIELDS), à paginer sur INBOX_ORDER"""
+    return (query.select_from(ThreadParticipant)
+            .join(MessageThread, MessageThread.id == ThreadParticipant.thread_id)
+            .outerjoin(LastMessage, LastMessage.id == MessageThread.last_message_id)
+            .outerjoin(Counterpart, db.and_(Counterpart.thread_id == ThreadParticipant.thread_id,
+                                            Counterpart.user_id != ThreadParticipant.user_id))
+            .outerjoin(CounterpartUser, CounterpartUser.id == Counterpart.user_id)
+            .filter(ThreadParticipant.user_id == user_id))
+
+INBOX_ORDER = (ThreadParticipant.last_message_at, ThreadParticipant.thread_id)
+
+def all_threads_query(query):
+    """Tous les fils (admin), à paginer sur THREADS_ORDER"""
+    return (query.select_from(MessageThread)
+            .outerjoin(LastMessage, LastMessage.id == MessageThread.last_message_id))
+
+THREADS_ORDER = (MessageThread.last_message_at, MessageThread.id)
+
+def thread_participants(thread_ids):
+    """Participants des fils d'une page : {thread_id: [participant, ...]}"""
+    participants = {thread_id: [] for thread_id in thread_ids}
+    rows = (db.session.query(ThreadParticipant.thread_id, ThreadParticipant.user_id, ThreadParticipant.unread_count,
+                             User.first_name, User.last_name, User.role)
+            .outerjoin(User, User.id == ThreadParticipant.user_id)
+            .filter(ThreadParticipant.thread_id.in_(thread_ids)))
+    for thread_id, user_id, unread_count, first_name, last_name, role in rows:
+        participants[thread_id].append({
+            'userId': user_id,
+            'name': f'{first_name} {last_name}' if first_name else None,
+            'role': role,
+            'unreadCount': unread_count
+        })
+    return participants
+
+def is_participant(thread_id, user_id):
+    return db.session.query(ThreadParticipant.thread_id).filter_by(thread_id=thread_id, user_id=user_id).first() is not None
+
+def thread_messages_query(query, thread_id):
+    """Messages d'un fil (requête projetée sur MESSAGE_FIELDS), à paginer sur THREAD_MESSAGES_ORDER"""
+    return (query.join(ThreadMessage, ThreadMessage.message_id == PrivateMessage.id)
+            .add_columns(*THREAD_MESSAGES_ORDER)
+            .filter(ThreadMessage.thread_id == thread_id))
+
+THREAD_MESSAGES_ORDER = (ThreadMessage.created_at.label('thread_created_at'), ThreadMessage.message_id)
+
+# ===== LECTURE GROUPÉE =====
+
+def mark_read(user_id, thread_id=None):
+    """Marque lus les messages reçus par l'utilisateur (dans un fil ou partout) en un UPDATE
+
+    Retourne le nombre de messages marqués ; le commit reste à l'appelant.
+    """
+    messages = PrivateMessage.__table__
+    participants = ThreadParticipant.__table__
+    unread = [messages.c.recipient_id == user_id, messages.c.is_read == False]
+    if thread_id is not None:
+        unread.append(messages.c.id.in_(db.select(ThreadMessage.message_id).where(ThreadMessage.thread_id == thread_id)))
+
+    # Expéditeurs concernés : leur liste de messages envoyés change aussi
+    senders = {sender_id for (sender_id,) in db.session.execute(db.select(messages.c.sender_id).where(*unread).distinct())}
+    if not senders:
+        return 0
+
+    count = db.session.execute(messages.update().where(*unread).values(is_read=True)).rowcount
+    reset = participants.update().where(participants.c.user_id == user_id)
+    if thread_id is not None:
+        reset = reset.where(participants.c.thread_id == thread_id)
+    db.session.execute(reset.values(unread_count=0))
+    changes = ChangeSet()
+    changes.touch({'messages'} | {f'messages.user.{uid}' for uid in senders | {user_id}})
+    apply_changes(changes)
+    return count
+
+def unread_messages(user_id):
+    """Messages non lus de l'utilisateur, somme des compteurs de ses fils"""
+    return db.session.query(db.func.coalesce(db.func.sum(ThreadParticipant.unread_count), 0)).filter(
+        ThreadParticipant.user_id == user_id
+    ).scalar()
@@ -1,31 +1,128 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.orm import make_transient_to_detached
 from src.models.user import db, User
-from werkzeug.security import generate_password_hash, check_password_hash
+from src.routes.cache import TTLCache, SharedGenerations
+from src.routes.hashing import hash_password, verify_password, HashingBusy, RETRY_AFTER
+from src.routes.admission import admission_control
 import jwt
 import datetime
+import hashlib
+import threading
 from functools import wraps
 
 user_bp = Blueprint('user', __name__)
 
+# Claims des tokens déjà vérifiés, par empreinte du token ; une entrée ne survit pas à l'exp du token
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 3600  # secondes
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+def decode_token(token):
+    """Claims d'un token valide ; un token déjà vu évite la vérification de signature"""
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    claims = token_cache.get(key)
+    if claims is None:
+        claims = jwt.decode(token, 'asdf#FGSgvasgf$5$WGT', algorithms=['HS256'])
+        # Le cache expire l'entrée à l'instant exact où jwt.decode la refuserait
+        token_cache.set(key, claims, expires_at=claims.get('exp'))
+    return claims
+
+# Rôle des utilisateurs authentifiés, par user_id : token_required et admin_required n'ont
+# besoin d'aucune requête. Chaque entrée garde la génération de l'utilisateur lue avant son
+# chargement ; update_profile, update_user, delete_user et delete_account l'incrémentent dans
+# un fichier partagé, si bien qu'une rétrogradation ou une suppression vaut tout de suite pour
+# tous les workers.
+AUTH_CACHE_SIZE = 10000
+AUTH_CACHE_TTL = 300  # secondes
+auth_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+_generations_lock = threading.Lock()
+
+def get_auth_generations(app=None):
+    app = app or current_app._get_current_object()
+    generations = app.extensions.get('auth_generations')
+    if generations is None:
+        with _generations_lock:
+            generations = app.extensions.get('auth_generations')
+            if generations is None:
+                generations = app.extensions['auth_generations'] = SharedGenerations(
+                    app.config.get('AUTH_GENERATIONS_FILE'),
+                    app.config.get('AUTH_GENERATIONS_SLOTS', 65536)
+                )
+    return generations
+
+def invalidate_auth_user(user_id):
+    """À appeler après le commit de toute modification ou suppression d'un utilisateur"""
+    get_auth_generations().bump(user_id)
+
+def _cached_user(user_id, role):
+    """User persistant dont seuls id et role sont chargés ; les autres colonnes sont lues
+    ensemble, en une requête, au premier accès d'une vue"""
+    user = db.session.identity_map.get(db.session.identity_key(User, user_id))
+    if user is None:
+        user = User(id=user_id, role=role)
+        make_transient_to_detached(user)
+        db.session.add(user)
+    return user
+
+def load_current_user(user_id):
+    """Utilisateur courant pour token_required ; None s'il n'existe plus"""
+    generation = get_auth_generations().get(user_id)
+    cached = auth_cache.get(user_id)
+    if cached is not None and cached[0] == generation:
+        return _cached_user(user_id, cached[1])
+    user = db.session.get(User, user_id)
+    if user is not None:
+        auth_cache.set(user_id, (generation, user.role))
+    return user
+
+# Jeton du flux SSE : passé en ?token= (EventSource n'envoie pas d'en-tête), il finit dans
+# les logs d'accès et l'historique ; il est donc court et n'ouvre que le flux
+STREAM_TOKEN_SCOPE = 'events'
+
+def issue_stream_token(user_id, ttl):
+    return jwt.encode({
+        'user_id': user_id,
+        'scope': STREAM_TOKEN_SCOPE,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=ttl)
+    }, 'asdf#FGSgvasgf$5$WGT', algorithm='HS256')
+
+def _authenticate(token, f, args, kwargs, scope=None):
+    if not token:
+        return jsonify({'message': 'Token is missing!'}), 401
+    
+    try:
+        if token.startswith('Bearer '):
+            token = token[7:]
+        data = decode_token(token)
+        # Un jeton de flux n'ouvre pas l'API, un jeton de session ne passe pas en ?token=
+        if data.get('scope') != scope:
+            raise jwt.InvalidTokenError('Wrong token scope')
+        current_user = load_current_user(data['user_id'])
+    except:
+        return jsonify({'message': 'Token is invalid!'}), 401
+    
+    if current_user is None:
+        return jsonify({'message': 'Token is invalid!'}), 401
+    
+    return f(current_user, *args, **kwargs)
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-        
-        try:
-            if token.startswith('Bearer '):
-                token = token[7:]
-            data = jwt.decode(token, 'asdf#FGSgvasgf$5$WGT', algorithms=['HS256'])
-            current_user = User.query.filter_by(id=data['user_id']).first()
-        except:
-            return jsonify({'message': 'Token is invalid!'}), 401
-        
-        return f(current_user, *args, **kwargs)
+        return _authenticate(request.headers.get('Authorization'), f, args, kwargs)
+    return decorated
+
+def stream_token_required(f):
+    """Comme token_required, ou un jeton de flux (issue_stream_token) en ?token="""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.headers.get('Authorization'):
+            return _authenticate(request.headers.get('Authorization'), f, args, kwargs)
+        return _authenticate(request.args.get('token'), f, args, kwargs, scope=STREAM_TOKEN_SCOPE)
     return decorated
 
 @user_bp.route('/register', methods=['POST'])
+@admission_control('register')
 def register():
     try:
         data = request.get_json()
@@ -35,7 +132,7 @@ def register():
             return jsonify({'message': 'Email already exists'}), 400
         
         # Créer un nouvel utilisateur
-        hashed_password = generate_password_hash(data['password'])
+        hashed_password = hash_password(data['password'])
         new_user = User(
             first_name=data['firstName'],
             last_name=data['lastName'],
@@ -66,6 +163,8 @@ def register():
             }
         }), 201
         
+    except HashingBusy as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': str(RETRY_AFTER)}
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
@@ -75,7 +174,7 @@ def login():
         data = request.get_json()
         user = User.query.filter_by(email=data['email']).first()
         
-        if user and check_password_hash(user.password, data['password']):
+        if user and verify_password(user.password, data['password']):
             token = jwt.encode({
                 'user_id': user.id,
                 'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24)
@@ -95,6 +194,8 @@ def login():
         else:
             return jsonify({'message': 'Invalid credentials'}), 401
             
+    except HashingBusy as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': str(RETRY_AFTER)}
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
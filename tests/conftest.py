@@ -0,0 +1,72 @@
+"""Fixtures partagées : l'application sur une base SQLite temporaire, vidée après chaque test
+
+Lancer depuis la racine du dépôt : python -m pytest tests
+"""
+import datetime
+import os
+import sys
+import tempfile
+
+import jwt
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP_DIR = tempfile.mkdtemp(prefix='buildrr-tests-')
+# main.py lit DATABASE_URL à l'import : le schéma et les migrations vont sur la base de test
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TMP_DIR, 'test.db')}"
+
+import main  # noqa: E402
+from src.models.user import db, User  # noqa: E402
+from src.routes.user import token_cache, auth_cache  # noqa: E402
+from src.routes.dashboard import user_stats_cache  # noqa: E402
+from src.routes.content import content_cache  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+PASSWORD = 'password'
+
+@pytest.fixture(scope='session')
+def app():
+    app = main.app
+    app.config.update(
+        TESTING=True,
+        MAIL_SUPPRESS_SEND=True,
+        ADMISSION_ENABLED=False,
+        ADMISSION_STATE_FILE=os.path.join(TMP_DIR, 'admission.bin'),
+        AUTH_GENERATIONS_FILE=os.path.join(TMP_DIR, 'auth-generations.bin')
+    )
+    app.extensions['mail'].suppress = True
+    return app
+
+@pytest.fixture(autouse=True)
+def clean_database(app):
+    """Chaque test part de tables et de caches vides (les triggers FTS suivent les suppressions)"""
+    with app.app_context():
+        yield
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        db.session.remove()
+    # Les ids repartent de 1 : une entrée gardée en cache serait celle d'un autre utilisateur
+    for cache in (token_cache, auth_cache, user_stats_cache, content_cache):
+        cache.clear()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def make_user(email='member@example.fr', role='member', **values):
+    user = User(first_name=values.pop('first_name', 'Test'), last_name=values.pop('last_name', 'User'), email=email,
+                password=generate_password_hash(PASSWORD), role=role, **values)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def auth_headers(user_id):
+    token = jwt.encode({
+        'user_id': user_id,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, main.app.config['SECRET_KEY'], algorithm='HS256')
+    return {'Authorization': f'Bearer {token}'}
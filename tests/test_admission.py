@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from src.routes.admission import AdmissionState
+from tests.conftest import TMP_DIR
+
+CONTACT = {'name': 'Jean', 'email': 'jean@example.fr', 'subject': 'Question', 'message': 'Bonjour'}
+
+@pytest.fixture
+def admission(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ADMISSION_ENABLED', True)
+    monkeypatch.setitem(app.config, 'ADMISSION_LIMITS', dict(app.config['ADMISSION_LIMITS'], contact={'ip': (2, 60)}))
+    monkeypatch.setitem(app.config, 'ADMISSION_STATE_FILE', os.path.join(TMP_DIR, 'admission-test.bin'))
+    app.extensions.pop('admission', None)
+    yield app
+    app.extensions.pop('admission', None)
+    if os.path.exists(app.config['ADMISSION_STATE_FILE']):
+        os.remove(app.config['ADMISSION_STATE_FILE'])
+
+def test_bucket_refills_over_time():
+    state = AdmissionState(None, 64)
+    bucket = [('contact:ip:1.2.3.4', 2, 10)]
+    assert state.take(bucket, now=1000) == 0
+    assert state.take(bucket, now=1000) == 0
+    assert state.take(bucket, now=1000) == 10
+    assert state.take(bucket, now=1005) == pytest.approx(5)
+    assert state.take(bucket, now=1010) == 0
+    # Un refus ne consomme rien : le seau est de nouveau vide, pas en dette
+    assert state.take(bucket, now=1010) == pytest.approx(10)
+    assert state.take([('contact:ip:5.6.7.8', 2, 10)], now=1010) == 0
+
+def test_requests_refused_for_concurrency_keep_their_tokens(admission, client, monkeypatch):
+    monkeypatch.setitem(admission.config, 'ADMISSION_MAX_CONCURRENT', 0)
+    for _ in range(3):
+        assert client.post('/api/contact', json=CONTACT).status_code == 503
+    monkeypatch.setitem(admission.config, 'ADMISSION_MAX_CONCURRENT', 16)
+    assert [client.post('/api/contact', json=CONTACT).status_code for _ in range(3)] == [201, 201, 429]
+
+def test_unusable_state_file_admits_the_request(admission, client, monkeypatch, caplog):
+    monkeypatch.setitem(admission.config, 'ADMISSION_STATE_FILE', os.path.join(TMP_DIR, 'missing-dir', 'admission.bin'))
+    assert client.post('/api/contact', json=CONTACT).status_code == 201
+    assert 'Admission state unavailable' in caplog.text
+
+def test_new_slot_count_replaces_the_file_without_truncating_it(tmp_path):
+    path = str(tmp_path / 'admission.bin')
+    old = AdmissionState(path, 64)
+    bucket = [('contact:ip:1.2.3.4', 1, 60)]
+    assert old.take(bucket, now=1000) == 0
+    inode = os.stat(path).st_ino
+
+    # Worker redémarré avec une autre configuration pendant que l'ancien tourne encore
+    new = AdmissionState(path, 128)
+    assert new.take(bucket, now=1000) == 0
+    assert os.stat(path).st_ino != inode and os.path.getsize(path) == new.size
+    # L'ancien mapping reste lisible (un fichier tronqué sous lui donnerait un SIGBUS) et garde son état
+    assert old.take(bucket, now=1000) == pytest.approx(60)
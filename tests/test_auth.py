@@ -0,0 +1,81 @@
+import datetime
+
+import jwt
+from sqlalchemy import event
+
+from src.models.user import db, User
+from src.routes.cache import SharedGenerations
+from tests.conftest import make_user, auth_headers
+
+def _statements(app):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    return statements, lambda: event.remove(db.engine, 'before_cursor_execute', listener)
+
+def _other_worker(app):
+    """Compteurs de génération tels que les voit un autre worker (même fichier, autre mapping)"""
+    return SharedGenerations(app.config['AUTH_GENERATIONS_FILE'], app.config['AUTH_GENERATIONS_SLOTS'])
+
+def test_demoted_admin_loses_access_on_the_next_request(app, client):
+    admin = make_user('admin@example.fr', role='admin')
+    headers = auth_headers(admin.id)
+    assert client.get('/api/admin/users', headers=headers).status_code == 200
+
+    # Rétrogradation par un autre worker : seule la génération partagée a changé
+    db.session.execute(db.update(User).where(User.id == admin.id).values(role='member'))
+    db.session.commit()
+    _other_worker(app).bump(admin.id)
+    assert client.get('/api/admin/users', headers=headers).status_code == 403
+
+def test_deleted_user_gets_401(app, client):
+    member = make_user()
+    headers = auth_headers(member.id)
+    assert client.get('/api/profile', headers=headers).status_code == 200
+
+    db.session.execute(db.delete(User).where(User.id == member.id))
+    db.session.commit()
+    _other_worker(app).bump(member.id)
+    assert client.get('/api/profile', headers=headers).status_code == 401
+    assert client.get('/api/dashboard/profile', headers=headers).status_code == 401
+
+def test_admin_routes_invalidate_the_cached_role(client):
+    admin = make_user('admin@example.fr', role='admin')
+    other = make_user('other@example.fr', role='admin')
+    assert client.get('/api/admin/users', headers=auth_headers(other.id)).status_code == 200
+    response = client.put(f'/api/admin/users/{other.id}', headers=auth_headers(admin.id), json={'role': 'member'})
+    assert response.status_code == 200
+    assert client.get('/api/admin/users', headers=auth_headers(other.id)).status_code == 403
+
+def test_cached_identity_saves_the_user_query(app, client):
+    member = make_user(company='ACME')
+    headers = auth_headers(member.id)
+    assert client.get('/api/profile', headers=headers).status_code == 200
+    db.session.remove()
+
+    statements, stop = _statements(app)
+    try:
+        body = client.get('/api/profile', headers=headers).get_json()
+        client.get('/api/dashboard/orders', headers=headers)
+    finally:
+        stop()
+    assert body['user']['company'] == 'ACME'
+    # Profil : les colonnes restantes en une requête ; commandes : aucune lecture de user
+    assert len([statement for statement in statements if 'FROM user' in statement]) == 1
+
+def test_views_receive_a_real_user(client):
+    member = make_user()
+    headers = auth_headers(member.id)
+    response = client.put('/api/dashboard/profile', headers=headers, json={'company': 'Nouvelle'})
+    assert response.status_code == 200 and response.get_json()['user']['company'] == 'Nouvelle'
+    assert db.session.get(User, member.id).company == 'Nouvelle'
+
+def test_expired_and_forged_tokens_are_rejected(app, client):
+    member = make_user()
+    expired = jwt.encode({'user_id': member.id, 'exp': datetime.datetime.utcnow() - datetime.timedelta(seconds=1)},
+                         app.config['SECRET_KEY'], algorithm='HS256')
+    forged = jwt.encode({'user_id': member.id, 'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)},
+                        'not-the-secret-key-of-this-application', algorithm='HS256')
+    for token in (expired, forged):
+        assert client.get('/api/profile', headers={'Authorization': f'Bearer {token}'}).status_code == 401
+    assert client.get('/api/profile').status_code == 401
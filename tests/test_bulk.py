@@ -0,0 +1,62 @@
+import pytest
+
+from src.models.user import db, Order, Quote, Contact
+from src.routes.events import get_broker
+from src.routes.stats import compute_totals, read_counters, rebuild_counters
+from tests.conftest import make_user, auth_headers
+
+@pytest.fixture
+def counters(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'STATS_COUNTERS_ENABLED', True)
+    rebuild_counters()
+
+def _nonzero(totals):
+    return {name: value for name, value in totals.items() if value}
+
+def _data():
+    member = make_user()
+    orders = [Order(order_id=f'B{i}', title='t', type='website', price=100 * (i + 1), user_id=member.id,
+                    status='pending' if i < 2 else 'in-progress') for i in range(3)]
+    quotes = [Quote(project_type='website', email=f'q{i}@example.fr', user_id=member.id) for i in range(2)]
+    contacts = [Contact(name='n', email='c@example.fr', subject='s', message='m') for _ in range(2)]
+    db.session.add_all(orders + quotes + contacts)
+    db.session.commit()
+    return member, orders, quotes, contacts
+
+def _bulk(client, admin, collection, **body):
+    response = client.post(f'/api/admin/{collection}/bulk', headers=auth_headers(admin.id), json=body)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+def test_bulk_writes_apply_counter_deltas(client, counters):
+    admin = make_user('admin@example.fr', role='admin')
+    member, orders, quotes, contacts = _data()
+
+    _bulk(client, admin, 'orders', action='update', status='completed', filter={'status': 'pending'})
+    _bulk(client, admin, 'orders', action='delete', ids=[orders[2].id])
+    _bulk(client, admin, 'quotes', action='update', status='reviewed', ids=[quotes[0].id, 999])
+    _bulk(client, admin, 'quotes', action='delete', ids=[quotes[1].id])
+    _bulk(client, admin, 'contacts', action='delete', ids=[contacts[0].id])
+
+    assert _nonzero(read_counters()) == _nonzero(compute_totals()) == {
+        'users.count': 2,
+        'orders.count.completed': 2,
+        'orders.revenue.completed': 300,
+        'quotes.count.reviewed': 1,
+        'contacts.count': 1
+    }
+
+def test_bulk_status_update_notifies_the_owners(app, client):
+    admin = make_user('admin@example.fr', role='admin')
+    member, orders, quotes, contacts = _data()
+    subscriber = get_broker(app).subscribe(member.id)
+    try:
+        _bulk(client, admin, 'orders', action='update', status='completed', ids=[orders[0].id])
+        _bulk(client, admin, 'quotes', action='update', status='reviewed', ids=[quotes[0].id])
+        events = [subscriber.queue.get_nowait()[1:3] for _ in range(subscriber.queue.qsize())]
+    finally:
+        get_broker(app).unsubscribe(subscriber)
+    assert events == [
+        ('order', {'orderId': orders[0].id, 'status': 'completed', 'progress': 0}),
+        ('quote', {'quoteId': quotes[0].id, 'status': 'reviewed', 'adminPrice': None})
+    ]
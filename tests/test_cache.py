@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import event
+
+from src.models.user import db, Order
+from src.routes import cache as cache_module
+from src.routes.cache import TTLCache
+from tests.conftest import make_user, auth_headers
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    return now
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(10, ttl=60)
+    cache.set('a', 1)
+    clock[0] += 59
+    assert cache.get('a') == 1
+    clock[0] += 1
+    assert cache.get('a') is None and len(cache) == 0
+
+def test_expires_at_only_shortens_the_ttl(clock):
+    cache = TTLCache(10, ttl=60)
+    cache.set('short', 1, expires_at=clock[0] + 5)
+    cache.set('long', 2, expires_at=clock[0] + 3600)
+    clock[0] += 5
+    assert cache.get('short') is None
+    clock[0] += 54
+    assert cache.get('long') == 2
+    clock[0] += 1
+    assert cache.get('long') is None
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.pop('a') == 1 and cache.pop('a') is None
+
+def test_user_stats_follow_writes_from_any_worker(client):
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    headers = auth_headers(member.id)
+    assert client.get('/api/dashboard/stats', headers=headers).get_json()['stats']['totalOrders'] == 0
+
+    # Écriture hors des routes de ce worker : seule la version orders.user.{id} en base a changé
+    db.session.add(Order(order_id='C1', title='t', type='website', price=10, user_id=member.id))
+    db.session.commit()
+    assert client.get('/api/dashboard/stats', headers=headers).get_json()['stats']['totalOrders'] == 1
+
+    response = client.post('/api/admin/orders', headers=auth_headers(admin.id),
+                           json={'title': 't', 'type': 'website', 'price': 20, 'userId': member.id})
+    assert response.status_code == 201
+    assert client.get('/api/dashboard/stats', headers=headers).get_json()['stats']['totalOrders'] == 2
+
+def test_cached_user_stats_cost_one_version_lookup(client):
+    member = make_user()
+    headers = auth_headers(member.id)
+    first = client.get('/api/dashboard/stats', headers=headers).get_json()['stats']
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert client.get('/api/dashboard/stats', headers=headers).get_json()['stats'] == first
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert [statement for statement in statements if 'FROM "order"' in statement or 'thread_participant' in statement] == []
+    assert len([statement for statement in statements if 'collection_version' in statement]) == 1
@@ -0,0 +1,46 @@
+from src.models.user import db, SiteContent
+from src.routes.http_cache import CollectionVersion
+from tests.conftest import make_user, auth_headers
+
+def _get(client, page, etag=None):
+    return client.get(f'/api/content/{page}', headers={'If-None-Match': etag} if etag else {})
+
+def _versions():
+    return dict(db.session.query(CollectionVersion.name, CollectionVersion.version)
+                .filter(CollectionVersion.name.like('content.page.%')))
+
+def test_writes_from_any_worker_replace_the_cached_page(client):
+    section = SiteContent(page_name='home', section_name='hero', content_type='text', content='Bienvenue')
+    db.session.add(section)
+    db.session.commit()
+    first = _get(client, 'home')
+    assert first.status_code == 200 and first.get_json()['sections'][0]['content'] == 'Bienvenue'
+    etag = first.headers['ETag']
+    assert _get(client, 'home', etag).status_code == 304
+
+    # Écriture sans passer par les routes de ce worker : seule la version en base a changé
+    section.content = 'Bonjour'
+    db.session.commit()
+    second = _get(client, 'home', etag)
+    assert second.status_code == 200 and second.get_json()['sections'][0]['content'] == 'Bonjour'
+    assert second.headers['ETag'] != etag
+
+def test_admin_writes_bump_the_page_versions(client):
+    admin = make_user('admin@example.fr', role='admin')
+    response = client.post('/api/admin/content', headers=auth_headers(admin.id), json={
+        'pageName': 'home', 'sectionName': 'hero', 'contentType': 'text', 'content': 'Bienvenue'
+    })
+    content_id = response.get_json()['content']['id']
+    assert _versions() == {'content.page.home': 1}
+
+    client.put(f'/api/admin/content/{content_id}', headers=auth_headers(admin.id), json={'pageName': 'about'})
+    assert _versions() == {'content.page.home': 2, 'content.page.about': 1}
+    assert _get(client, 'home').status_code == 404
+    assert _get(client, 'about').status_code == 200
+
+def test_if_none_match_star(client):
+    assert _get(client, 'home', '*').status_code == 404
+    db.session.add(SiteContent(page_name='home', section_name='hero', content_type='text', content='Bienvenue'))
+    db.session.commit()
+    response = _get(client, 'home', '*')
+    assert response.status_code == 304 and response.headers['ETag']
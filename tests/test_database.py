@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import db, User, Order, Quote, PrivateMessage
+from src.routes.threads import MessageThread
+from tests.conftest import make_user, auth_headers
+
+def _writer(app, member_id, order_id, delay, errors):
+    """Lit puis écrit dans la même transaction (savepoint, comme le repli de l'import)"""
+    with app.app_context():
+        try:
+            db.session.begin_nested()
+            existing = db.session.query(Order.id).filter_by(user_id=member_id).count()
+            time.sleep(delay)
+            db.session.add(Order(order_id=order_id, title=f'{existing}', type='website', price=10, user_id=member_id))
+            db.session.commit()
+        except Exception as e:
+            errors.append(e)
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+def test_concurrent_read_then_write_transactions_wait_for_the_lock(app):
+    member_id = make_user().id
+    errors = []
+    first = threading.Thread(target=_writer, args=(app, member_id, 'W1', 0.3, errors))
+    second = threading.Thread(target=_writer, args=(app, member_id, 'W2', 0, errors))
+    first.start()
+    time.sleep(0.1)
+    second.start()
+    first.join()
+    second.join()
+
+    assert errors == []
+    # Le second écrivain a attendu le commit du premier : il a lu sa commande
+    titles = dict(db.session.query(Order.order_id, Order.title))
+    assert titles == {'W1': '0', 'W2': '1'}
+
+def test_admin_deletes_a_user_with_orders_quotes_and_messages(client):
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    db.session.add_all([
+        Order(order_id='O1', title='t', type='website', price=10, user_id=member.id),
+        Quote(project_type='website', email=member.email, user_id=member.id),
+        PrivateMessage(subject='s', message='m', sender_id=member.id, recipient_id=admin.id)
+    ])
+    db.session.commit()
+    member_id = member.id
+
+    response = client.delete(f'/api/admin/users/{member_id}', headers=auth_headers(admin.id))
+    assert response.status_code == 200, response.get_json()
+    assert db.session.get(User, member_id) is None
+    assert db.session.query(Order).count() == 0 and db.session.query(PrivateMessage).count() == 0
+    # Le devis reste, détaché ; le fil de messages part avec l'utilisateur (ON DELETE CASCADE)
+    assert db.session.query(Quote.user_id).all() == [(None,)]
+    assert db.session.query(MessageThread).count() == 0
+
+def test_admin_deletes_an_order(client):
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    order = Order(order_id='O1', title='t', type='website', price=10, user_id=member.id)
+    db.session.add(order)
+    db.session.commit()
+
+    response = client.delete(f'/api/admin/orders/{order.id}', headers=auth_headers(admin.id))
+    assert response.status_code == 200, response.get_json()
+    assert db.session.query(Order).count() == 0 and db.session.get(User, member.id) is not None
+
+def test_orphan_rows_are_refused():
+    db.session.add(Order(order_id='O1', title='t', type='website', price=10, user_id=999))
+    with pytest.raises(IntegrityError, match='FOREIGN KEY'):
+        db.session.commit()
+    db.session.rollback()
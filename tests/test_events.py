@@ -0,0 +1,62 @@
+import pytest
+
+from src.models.user import db, Order
+from src.routes.events import event_stream, open_stream, close_stream
+from src.routes.http_cache import bump_versions
+from tests.conftest import make_user, auth_headers
+
+@pytest.fixture
+def short_streams(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SSE_MAX_DURATION', 0)
+
+def _stream_token(client, user):
+    response = client.post('/api/dashboard/events/token', headers=auth_headers(user.id))
+    assert response.status_code == 200
+    return response.get_json()['token']
+
+def test_query_string_only_accepts_a_stream_token(client, short_streams):
+    member = make_user()
+    session_token = auth_headers(member.id)['Authorization'][7:]
+    assert client.get('/api/dashboard/events', query_string={'token': session_token}).status_code == 401
+
+    stream_token = _stream_token(client, member)
+    response = client.get('/api/dashboard/events', query_string={'token': stream_token})
+    assert response.status_code == 200 and 'event: ready' in response.get_data(as_text=True)
+    # Le jeton de flux n'ouvre pas le reste de l'API
+    assert client.get('/api/profile', headers={'Authorization': f'Bearer {stream_token}'}).status_code == 401
+
+def test_streams_beyond_the_worker_cap_get_503(app, client, monkeypatch, short_streams):
+    member = make_user()
+    monkeypatch.setitem(app.config, 'SSE_MAX_STREAMS', 1)
+    subscriber = open_stream(app, member.id)
+    try:
+        response = client.get('/api/dashboard/events', headers=auth_headers(member.id))
+        assert response.status_code == 503 and response.headers['Retry-After']
+    finally:
+        close_stream(app, subscriber)
+    assert client.get('/api/dashboard/events', headers=auth_headers(member.id)).status_code == 200
+
+def _events(chunks):
+    return [line[len('event: '):] for chunk in chunks for line in chunk.splitlines() if line.startswith('event: ')]
+
+def test_no_sync_for_a_change_already_sent_as_an_event(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'SSE_POLL_INTERVAL', 0)
+    monkeypatch.setitem(app.config, 'SSE_MAX_DURATION', 0.2)
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    order = Order(order_id='E1', title='t', type='website', price=10, user_id=member.id)
+    db.session.add(order)
+    db.session.commit()
+
+    stream = event_stream(app, open_stream(app, member.id))
+    assert _events([next(stream), next(stream)]) == ['ready']
+    response = client.put(f'/api/admin/orders/{order.id}', headers=auth_headers(admin.id), json={'status': 'completed'})
+    assert response.status_code == 200
+    assert _events(stream) == ['order']
+
+    # Écriture d'un autre worker : pas d'événement dans ce process, seulement la version
+    stream = event_stream(app, open_stream(app, member.id))
+    assert _events([next(stream), next(stream)]) == ['ready']
+    bump_versions([f'orders.user.{member.id}'], db.session.connection())
+    db.session.commit()
+    assert _events(stream) == ['sync']
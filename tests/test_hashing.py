@@ -0,0 +1,43 @@
+import os
+import time
+
+import pytest
+from werkzeug.security import check_password_hash
+
+from src.routes.hashing import PasswordHasher, HashingBusy
+
+METHOD = 'pbkdf2:sha256:1000'
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, queue_size=1, method=METHOD, timeout=10)
+    yield hasher
+    if hasher._executor is not None:
+        hasher._executor.shutdown(wait=True, cancel_futures=True)
+
+def test_hash_and_verify(hasher):
+    pwhash = hasher.hash('secret')
+    assert pwhash.startswith('pbkdf2:sha256:1000$')
+    assert hasher.verify(pwhash, 'secret') and not hasher.verify(pwhash, 'other')
+
+def test_full_queue_is_refused(hasher):
+    hasher._submit(time.sleep, (1,))
+    hasher._submit(time.sleep, (1,))
+    with pytest.raises(HashingBusy):
+        hasher.hash('secret')
+
+def test_pool_is_recreated_after_a_child_dies(hasher):
+    # Process enfant tué pendant une tâche (OOM killer) : le pool est cassé pour de bon
+    executor, future = hasher._submit(os._exit, (1,))
+    with pytest.raises(Exception):
+        future.result(timeout=10)
+    assert hasher.verify(hasher.hash('secret'), 'secret')
+    assert hasher._executor is not executor
+
+def test_hash_many_waits_for_the_shared_queue(hasher):
+    hasher._submit(time.sleep, (0.5,))
+    hasher._submit(time.sleep, (0.5,))
+    hashes = hasher.hash_many(['a', 'b', 'c'])
+    assert [check_password_hash(pwhash, password) for pwhash, password in zip(hashes, 'abc')] == [True] * 3
+    # Toutes les places sont rendues une fois l'import terminé
+    assert hasher._slots._value == 2
@@ -0,0 +1,31 @@
+from src.models.user import db, Order
+from tests.conftest import make_user, auth_headers
+
+def test_unchanged_collection_answers_304(client):
+    member = make_user()
+    headers = auth_headers(member.id)
+    db.session.add(Order(order_id='E1', title='t', type='website', price=10, user_id=member.id))
+    db.session.commit()
+
+    first = client.get('/api/dashboard/orders', headers=headers)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/')
+    cached = client.get('/api/dashboard/orders', headers=dict(headers, **{'If-None-Match': etag}))
+    assert cached.status_code == 304 and cached.data == b''
+
+    # Une écriture par l'ORM change la version de la collection de l'utilisateur
+    db.session.add(Order(order_id='E2', title='t', type='website', price=10, user_id=member.id))
+    db.session.commit()
+    changed = client.get('/api/dashboard/orders', headers=dict(headers, **{'If-None-Match': etag}))
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert len(changed.get_json()['orders']) == 2
+
+def test_other_users_writes_keep_the_etag(client):
+    member = make_user()
+    other = make_user('other@example.fr')
+    headers = auth_headers(member.id)
+    etag = client.get('/api/dashboard/orders', headers=headers).headers['ETag']
+
+    db.session.add(Order(order_id='E3', title='t', type='website', price=10, user_id=other.id))
+    db.session.commit()
+    assert client.get('/api/dashboard/orders', headers=dict(headers, **{'If-None-Match': etag})).status_code == 304
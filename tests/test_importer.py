@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from src.models.user import db, Order
+from src.routes.importer import Importer, csv_records
+from src.routes.stats import compute_totals, read_counters, rebuild_counters
+from tests.conftest import make_user, auth_headers
+
+@pytest.fixture
+def counters(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'STATS_COUNTERS_ENABLED', True)
+    rebuild_counters()
+
+def _nonzero(totals):
+    return {name: value for name, value in totals.items() if value}
+
+def test_imported_rows_are_added_to_the_counters(client, counters):
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    orders = (f'orderId,title,type,status,price,userId\n'
+              f'I1,Site,website,completed,100,{member.id}\n'
+              f'I2,Site,website,,40,{member.id}\n'
+              f'I3,Site,website,pending,abc,{member.id}\n')
+    response = client.post('/api/admin/import/orders', headers=auth_headers(admin.id),
+                           data=orders, content_type='text/csv')
+    assert response.get_json()['imported'] == 2
+    quotes = '{"projectType": "website", "email": "q@example.fr", "features": ["Blog"]}\n'
+    response = client.post('/api/admin/import/quotes', headers=auth_headers(admin.id),
+                           data=quotes, content_type='application/x-ndjson')
+    assert response.get_json()['imported'] == 1
+
+    assert _nonzero(read_counters()) == _nonzero(compute_totals()) == {
+        'users.count': 2,
+        'orders.count.completed': 1,
+        'orders.revenue.completed': 100,
+        'orders.count.pending': 1,
+        'orders.revenue.pending': 40,
+        'quotes.count.pending': 1
+    }
+
+def test_failed_batch_falls_back_to_one_savepoint_per_row(counters, monkeypatch):
+    member = make_user()
+    # Sans la vérification par lot, le doublon n'est vu que par la contrainte UNIQUE en base
+    monkeypatch.setattr(Importer, '_check_batch', lambda self, batch: batch)
+    data = (f'orderId,title,type,price,userId\n'
+            f'D1,Site,website,10,{member.id}\n'
+            f'D1,Site,website,20,{member.id}\n'
+            f'D2,Site,website,30,{member.id}\n').encode()
+    importer = Importer('orders')
+    summary = importer.run(csv_records(io.BytesIO(data), 'orders'))
+
+    assert (summary['imported'], summary['failed']) == (2, 1)
+    assert summary['errors'][0]['line'] == 3 and 'UNIQUE' in summary['errors'][0]['message']
+    assert sorted(price for (price,) in db.session.query(Order.price)) == [10, 30]
+    assert importer.user_ids == {member.id}
+    assert _nonzero(read_counters()) == _nonzero(compute_totals())
+
+def test_bad_row_in_the_middle_keeps_rows_and_counters_in_agreement(client, counters, monkeypatch):
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    monkeypatch.setattr(Importer, '_check_batch', lambda self, batch: batch)
+    orders = (f'orderId,title,type,status,price,userId\n'
+              f'M1,Site,website,completed,100,{member.id}\n'
+              f'M2,Site,website,pending,40,{member.id}\n'
+              f'M1,Site,website,completed,500,{member.id}\n'
+              f'M3,Site,website,completed,7,{member.id}\n')
+    response = client.post('/api/admin/import/orders', headers=auth_headers(admin.id),
+                           data=orders, content_type='text/csv')
+    summary = response.get_json()
+
+    assert (summary['imported'], summary['failed']) == (3, 1)
+    assert db.session.query(Order).count() == summary['imported']
+    # La ligne rejetée n'a laissé ni commande ni delta dans les compteurs
+    assert _nonzero(read_counters()) == _nonzero(compute_totals()) == {
+        'users.count': 2,
+        'orders.count.completed': 2,
+        'orders.revenue.completed': 107,
+        'orders.count.pending': 1,
+        'orders.revenue.pending': 40
+    }
@@ -0,0 +1,144 @@
+import smtplib
+import threading
+import time
+
+import pytest
+from flask_mail import Message
+
+from src.routes import mail_transport, metrics
+from src.routes.mail_transport import MailTransport, get_transport
+
+class FakeSMTP:
+    """Serveur SMTP simulé : peut couper la connexion en plein envoi ou refuser de la rouvrir"""
+    servers = []
+    refuse = 0
+
+    def __init__(self, host, port):
+        if FakeSMTP.refuse:
+            FakeSMTP.refuse -= 1
+            raise ConnectionRefusedError('connection refused')
+        self.sent = []
+        self.open = True
+        self.drop_on = None
+        self.reject = set()
+        FakeSMTP.servers.append(self)
+
+    def set_debuglevel(self, level):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def sendmail(self, sender, recipients, body, mail_options=(), rcpt_options=()):
+        if not self.open:
+            raise smtplib.SMTPServerDisconnected('please run connect() first')
+        if self.drop_on == len(self.sent):
+            self.open = False
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        if set(recipients) & self.reject:
+            raise smtplib.SMTPRecipientsRefused({recipient: (550, b'unknown') for recipient in recipients})
+        self.sent.extend(recipients)
+
+    def quit(self):
+        if not self.open:
+            raise smtplib.SMTPServerDisconnected('please run connect() first')
+        self.open = False
+
+@pytest.fixture
+def transport(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(smtplib, 'SMTP', FakeSMTP)
+    monkeypatch.setattr(FakeSMTP, 'servers', [])
+    monkeypatch.setattr(FakeSMTP, 'refuse', 0)
+    monkeypatch.setattr(app.extensions['mail'], 'suppress', False)
+    monkeypatch.setitem(metrics._settings, 'dir', str(tmp_path))
+    monkeypatch.setitem(app.config, 'MAIL_TRANSPORT_MAX_MESSAGES', 3)
+    transport = MailTransport(app)
+    yield transport
+    transport.close()
+
+def _message(recipient='client@example.fr'):
+    return Message(subject='Sujet', recipients=[recipient], body='Corps', sender='contact@buildrr.fr')
+
+def _slot_free(transport):
+    if not transport._slots.acquire(blocking=False):
+        return False
+    transport._slots.release()
+    return True
+
+def _reconnects():
+    return mail_transport.registry.counters[('smtp_reconnects_total', ())]
+
+def test_connection_dropped_mid_send_is_reopened_and_the_message_resent(transport):
+    transport.send(_message('a@example.fr'))
+    (first,) = FakeSMTP.servers
+    first.drop_on = 1
+    reconnects = _reconnects()
+
+    transport.send_many([_message('b@example.fr'), _message('c@example.fr')])
+    second = FakeSMTP.servers[1]
+    assert first.sent == ['a@example.fr'] and second.sent == ['b@example.fr', 'c@example.fr']
+    assert _reconnects() == reconnects + 1
+    # La nouvelle connexion retourne au pool
+    assert [pooled.connection.host for pooled in transport._idle] == [second] and _slot_free(transport)
+
+def test_stale_connections_are_evicted(transport):
+    for _ in range(3):
+        transport.send(_message())
+    # MAIL_TRANSPORT_MAX_MESSAGES atteint : la session est fermée, une autre est ouverte
+    transport.send(_message())
+    first, second = FakeSMTP.servers
+    assert not first.open and len(first.sent) == 3 and second.sent == ['client@example.fr']
+
+    # Connexion inactive depuis plus de MAIL_TRANSPORT_MAX_IDLE
+    transport._idle[0].last_used = time.monotonic() - transport.max_idle - 1
+    transport.send(_message())
+    assert not second.open and len(FakeSMTP.servers) == 3 and FakeSMTP.servers[2].open
+
+def test_failed_send_releases_its_slot(transport):
+    transport.send(_message())
+    (first,) = FakeSMTP.servers
+    first.drop_on = 1
+    FakeSMTP.refuse = 1
+
+    with pytest.raises(ConnectionRefusedError):
+        transport.send(_message())
+    # Connexion morte jetée, place rendue : l'envoi suivant ouvre une connexion neuve
+    assert transport._idle == [] and _slot_free(transport)
+    transport.send(_message())
+    assert len(FakeSMTP.servers) == 2 and FakeSMTP.servers[1].sent == ['client@example.fr']
+
+def test_refused_recipient_keeps_the_session(transport):
+    transport.send(_message())
+    (server,) = FakeSMTP.servers
+    server.reject.add('unknown@example.fr')
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        transport.send(_message('unknown@example.fr'))
+    assert [pooled.connection.host for pooled in transport._idle] == [server] and _slot_free(transport)
+
+def test_one_transport_per_process(app, monkeypatch):
+    monkeypatch.delitem(app.extensions, 'mail_transport', raising=False)
+    init = MailTransport.__init__
+
+    def slow_init(self, app):
+        time.sleep(0.05)
+        init(self, app)
+
+    monkeypatch.setattr(MailTransport, '__init__', slow_init)
+    barrier = threading.Barrier(4)
+    transports = []
+
+    def first_send():
+        barrier.wait()
+        transports.append(get_transport(app))
+
+    threads = [threading.Thread(target=first_send) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(transports) == 4 and len({id(transport) for transport in transports}) == 1
+    monkeypatch.delitem(app.extensions, 'mail_transport')
@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+from src.routes import metrics
+from src.routes.metrics import Registry, collect
+from tests.conftest import make_user, auth_headers
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    """Registre et répertoire propres au test (le process repart comme un worker neuf)"""
+    monkeypatch.setitem(metrics._settings, 'dir', str(tmp_path))
+    monkeypatch.setattr(metrics, 'registry', Registry())
+    monkeypatch.setattr(metrics, '_state', {'pid': None, 'started': None, 'path': None, 'flushed': 0.0, 'dirty': False})
+    return tmp_path
+
+def _snapshot(folder, name, pid, started, requests):
+    (folder / name).write_text(json.dumps({
+        'counters': [['http_requests_total', [['status', '200']], requests]],
+        'gauges': [], 'histograms': [], 'pid': pid, 'started': started
+    }))
+
+def _requests(total):
+    return sum(value for (name, labels), value in total['counters'].items() if name == 'http_requests_total')
+
+def test_collect_sums_live_workers_and_archives_reused_pids(metrics_dir):
+    metrics.registry.inc('http_requests_total', (('status', '200'),))
+    parent = os.getppid()
+    _snapshot(metrics_dir, 'metrics-live.json', parent, metrics._start_time(parent), 2)
+    # Même pid mais autre démarrage : le worker d'origine est mort, son pid a été réattribué
+    _snapshot(metrics_dir, 'metrics-reused.json', parent, 'other-boot:1', 5)
+
+    assert _requests(collect()) == 8
+    assert not (metrics_dir / 'metrics-reused.json').exists()
+    assert (metrics_dir / 'archive.json').exists()
+    # L'archive n'est comptée qu'une fois d'une collecte à l'autre
+    assert _requests(collect()) == 8
+
+def test_metrics_need_an_admin_or_the_scrape_token(app, client, metrics_dir, monkeypatch):
+    monkeypatch.setitem(app.config, 'ADMISSION_PROXY_HOPS', 0)
+    # Derrière un nginx local, toutes les requêtes arrivent de 127.0.0.1
+    proxied = {'REMOTE_ADDR': '127.0.0.1'}
+    forwarded = {'X-Forwarded-For': '203.0.113.7'}
+    assert client.get('/metrics', headers=forwarded, environ_base=proxied).status_code == 403
+    assert client.get('/metrics', headers=dict(forwarded, Authorization='Bearer '), environ_base=proxied).status_code == 401
+
+    member = make_user()
+    admin = make_user('admin@example.fr', role='admin')
+    assert client.get('/metrics', headers=auth_headers(member.id)).status_code == 403
+    response = client.get('/metrics', headers=auth_headers(admin.id))
+    assert response.status_code == 200 and 'http_requests_total' in response.get_data(as_text=True)
+
+    monkeypatch.setitem(app.config, 'METRICS_SCRAPE_TOKEN', 'scrape-secret')
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
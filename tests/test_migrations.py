@@ -0,0 +1,73 @@
+import os
+import threading
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from src.models.user import db
+from src.routes.database import configure_sqlite
+from src.routes.migrations import MIGRATIONS, run_migrations, current_version, LEGACY_CREATED_AT
+from tests.conftest import TMP_DIR
+
+@pytest.fixture
+def engine(app, request):
+    path = os.path.join(TMP_DIR, f'{request.node.name}.db')
+    engine = create_engine(f'sqlite:///{path}')
+    configure_sqlite(engine, app.config)
+    db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+    os.remove(path)
+
+def test_all_migrations_apply_once_on_an_empty_database(engine):
+    applied = run_migrations(engine)
+    assert [version for version, description in applied] == [version for version, description, fn in MIGRATIONS]
+    with engine.connect() as connection:
+        assert current_version(connection) == MIGRATIONS[-1][0]
+    # Autre worker qui démarre : plus rien à appliquer
+    assert run_migrations(engine) == []
+
+def test_missing_created_at_is_backfilled_then_refused(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO user (first_name, last_name, email, password, created_at) VALUES "
+            "('A', 'A', 'a@example.fr', 'x', NULL), ('B', 'B', 'b@example.fr', 'x', '2024-01-02 00:00:00.000000'), "
+            "('C', 'C', 'c@example.fr', 'x', NULL)"
+        )
+    run_migrations(engine)
+    with engine.begin() as connection:
+        dates = connection.exec_driver_sql('SELECT created_at FROM user ORDER BY id').scalars().all()
+        assert dates == [LEGACY_CREATED_AT, '2024-01-02 00:00:00.000000', '2024-01-02 00:00:00.000000']
+    with pytest.raises(exc.IntegrityError):
+        with engine.begin() as connection:
+            connection.exec_driver_sql("UPDATE user SET created_at = NULL WHERE id = 1")
+
+def test_workers_starting_together_apply_each_migration_once(app, request):
+    path = os.path.join(TMP_DIR, f'{request.node.name}.db')
+    engines = [create_engine(f'sqlite:///{path}') for _ in range(4)]
+    for engine in engines:
+        configure_sqlite(engine, app.config)
+    barrier = threading.Barrier(len(engines))
+    applied, errors = [], []
+
+    def worker(engine):
+        barrier.wait()
+        try:
+            applied.extend(run_migrations(engine, lock_timeout=30))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(engine,)) for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert errors == []
+        assert sorted(version for version, description in applied) == [version for version, description, fn in MIGRATIONS]
+        with engines[0].connect() as connection:
+            assert current_version(connection) == MIGRATIONS[-1][0]
+    finally:
+        for engine in engines:
+            engine.dispose()
+        os.remove(path)
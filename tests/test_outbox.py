@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+import threading
+
+import pytest
+
+from src.models.user import db
+from src.routes import outbox
+from src.routes.outbox import EmailOutbox, queue_email, deliver_pending, _claim
+from tests.conftest import make_user, auth_headers
+
+def _queued(count=1):
+    emails = [queue_email(f'Sujet {i}', 'client@example.fr', 'Corps') for i in range(count)]
+    db.session.commit()
+    return [email.id for email in emails]
+
+@pytest.fixture
+def failing_send(monkeypatch):
+    def send(email):
+        raise ConnectionError('smtp down')
+    monkeypatch.setattr(outbox, '_send', send)
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+    monkeypatch.setattr(outbox, '_send', lambda email: sent.append(email.id))
+    return sent
+
+def test_queue_email_is_written_with_the_transaction():
+    queue_email('Sujet', 'client@example.fr', 'Corps')
+    db.session.rollback()
+    assert EmailOutbox.query.count() == 0
+
+    (email_id,) = _queued()
+    email = db.session.get(EmailOutbox, email_id)
+    assert email.status == 'pending' and email.attempts == 0
+
+def test_claim_is_won_by_a_single_worker(app):
+    (email_id,) = _queued()
+    now = datetime.utcnow()
+    workers = 8
+    barrier = threading.Barrier(workers)
+    results = []
+
+    def claim():
+        with app.app_context():
+            barrier.wait()
+            results.append(_claim(email_id, now, 300))
+            db.session.remove()
+
+    threads = [threading.Thread(target=claim) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [False] * (workers - 1) + [True]
+    email = db.session.get(EmailOutbox, email_id)
+    assert email.status == 'sending' and email.attempts == 1
+
+def test_claimed_email_is_taken_back_after_the_lease(sent):
+    (email_id,) = _queued()
+    now = datetime.utcnow()
+    assert _claim(email_id, now, 300)
+
+    # Bail en cours : un autre worker ne le reprend pas
+    assert deliver_pending() == 0
+    # Worker arrêté en plein envoi : après le bail, l'email repart
+    db.session.get(EmailOutbox, email_id).next_attempt_at = now - timedelta(seconds=1)
+    db.session.commit()
+    assert deliver_pending() == 1
+    assert sent == [email_id]
+    assert db.session.get(EmailOutbox, email_id).attempts == 2
+
+def test_deliver_pending_sends_due_emails(sent):
+    ids = _queued(3)
+    assert deliver_pending() == 3
+    assert sorted(sent) == sorted(ids)
+    assert {email.status for email in EmailOutbox.query} == {'sent'}
+    assert deliver_pending() == 0
+
+def test_deliver_pending_backs_off_exponentially(app, monkeypatch, failing_send):
+    monkeypatch.setitem(app.config, 'MAIL_OUTBOX_RETRY_BASE', 30)
+    monkeypatch.setitem(app.config, 'MAIL_OUTBOX_RETRY_MAX', 100)
+    monkeypatch.setitem(app.config, 'MAIL_OUTBOX_MAX_ATTEMPTS', 4)
+    (email_id,) = _queued()
+
+    delays = []
+    for _ in range(3):
+        started = datetime.utcnow()
+        assert deliver_pending() == 0
+        email = db.session.get(EmailOutbox, email_id)
+        assert email.status == 'pending'
+        assert email.last_error == 'smtp down'
+        delays.append(round((email.next_attempt_at - started).total_seconds()))
+        # Pas de nouvelle tentative avant l'échéance
+        assert deliver_pending() == 0 and db.session.get(EmailOutbox, email_id).attempts == len(delays)
+        email.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+    # 30 s, 60 s, puis plafonné à MAIL_OUTBOX_RETRY_MAX
+    assert delays == [30, 60, 100]
+
+    assert deliver_pending() == 0
+    email = db.session.get(EmailOutbox, email_id)
+    assert email.status == 'failed' and email.attempts == 4
+
+def test_admin_follows_the_email_queued_by_a_request(client, failing_send):
+    admin = make_user('admin@example.fr', role='admin')
+    response = client.post('/api/contact', json={
+        'name': 'Client', 'email': 'client@example.fr', 'subject': 'Projet', 'message': 'Bonjour'})
+    body = response.get_json()
+    assert response.status_code == 201 and body['emailStatus'] == 'pending'
+
+    deliver_pending()
+    response = client.get(f"/api/admin/emails/{body['emailId']}", headers=auth_headers(admin.id))
+    email = response.get_json()['email']
+    assert (email['status'], email['attempts'], email['lastError']) == ('pending', 1, 'smtp down')
+    member = make_user()
+    assert client.get(f"/api/admin/emails/{body['emailId']}", headers=auth_headers(member.id)).status_code == 403
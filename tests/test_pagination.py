@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import db, Order
+from src.routes.pagination import encode_cursor, decode_cursor, keyset_page, InvalidCursor
+from src.routes.migrations import require_created_at
+from tests.conftest import make_user, auth_headers
+
+def _orders(user, created_at):
+    orders = [Order(order_id=f'P{i:04d}', title='Commande', type='website', price=100, user_id=user.id, created_at=value)
+              for i, value in enumerate(created_at)]
+    db.session.add_all(orders)
+    db.session.commit()
+    return orders
+
+def test_cursor_round_trip():
+    for position in ([datetime(2025, 1, 2, 3, 4, 5, 6).isoformat(), 42], {'sent': ['2025-01-01T00:00:00', 1], 'received': None}):
+        cursor = encode_cursor(position)
+        assert '=' not in cursor and '/' not in cursor and '+' not in cursor
+        assert decode_cursor(cursor) == position
+
+@pytest.mark.parametrize('cursor', ['', 'not a cursor', '!!!', encode_cursor('x')[:-1]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        position = decode_cursor(cursor)
+        keyset_page(Order.query, Order, position)
+
+def test_keyset_pages_cover_every_row_once_with_ties():
+    user = make_user()
+    now = datetime(2025, 6, 1)
+    # Dates en double : l'id départage, aucune ligne sautée ni répétée entre deux pages
+    orders = _orders(user, [now - timedelta(minutes=i // 3) for i in range(10)])
+
+    seen = []
+    position = None
+    while True:
+        rows, position = keyset_page(Order.query, Order, position, limit=4)
+        seen.extend(row.id for row in rows)
+        if position is None:
+            break
+        # Le curseur passe par l'URL : aller-retour JSON/base64
+        position = decode_cursor(encode_cursor(position))
+
+    expected = [order.id for order in sorted(orders, key=lambda order: (order.created_at, order.id), reverse=True)]
+    assert seen == expected
+
+def test_list_endpoint_follows_next_cursor(client):
+    user = make_user()
+    _orders(user, [datetime(2025, 6, 1) - timedelta(hours=i) for i in range(5)])
+    headers = auth_headers(user.id)
+
+    ids = []
+    url = '/api/dashboard/orders?limit=2'
+    while url:
+        body = client.get(url, headers=headers).get_json()
+        ids.extend(order['id'] for order in body['orders'])
+        url = f"/api/dashboard/orders?limit=2&cursor={body['nextCursor']}" if body['nextCursor'] else None
+    assert len(ids) == len(set(ids)) == 5
+
+    assert client.get('/api/dashboard/orders?cursor=garbage', headers=headers).status_code == 400
+
+def test_created_at_is_required_and_backfilled():
+    user = make_user()
+    with pytest.raises(IntegrityError):
+        db.session.execute(Order.__table__.insert().values(order_id='NULL1', title='t', type='website', price=1,
+                                                           user_id=user.id, created_at=None))
+    db.session.rollback()
+
+    # Données anciennes : une ligne sans date entre deux lignes datées
+    first, _, last = _orders(user, [datetime(2025, 1, 1), datetime(2025, 1, 2), datetime(2025, 1, 3)])
+    connection = db.session.connection()
+    connection.exec_driver_sql('DROP TRIGGER "order_created_at_update"')
+    db.session.execute(db.update(Order).where(Order.order_id == 'P0001').values(created_at=None))
+    require_created_at(connection)
+    db.session.commit()
+
+    backfilled = Order.query.filter_by(order_id='P0001').one()
+    assert backfilled.created_at == first.created_at
+    rows, position = keyset_page(Order.query, Order, None, limit=2)
+    assert [row.id for row in rows] == [last.id, backfilled.id]
+    assert position == [first.created_at.isoformat(), backfilled.id]
@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+
+from src.routes import profiler
+
+@pytest.fixture
+def profiled(tmp_path, monkeypatch):
+    """Application minimale sur sa propre base : le profileur se branche avant la première requête"""
+    monkeypatch.setattr(profiler, '_settings', dict(profiler._settings))
+    handlers, propagate, level = profiler.logger.handlers, profiler.logger.propagate, profiler.logger.level
+    engines = []
+
+    def build(**config):
+        engine = create_engine(f"sqlite:///{tmp_path / 'profiled.db'}")
+        engines.append(engine)
+
+        @event.listens_for(engine, 'connect')
+        def add_sleep(dbapi_connection, record):
+            dbapi_connection.create_function('sleep', 1, lambda ms: time.sleep(ms / 1000) or ms)
+
+        app = Flask(__name__)
+        app.config.update(SQL_PROFILER_ENABLED=True, SQL_PROFILER_LOG_FILE=str(tmp_path / 'logs' / 'sql.log'))
+        app.config.update(config)
+
+        @app.route('/probe/<int:statements>')
+        def probe(statements):
+            with engine.connect() as connection:
+                for i in range(statements):
+                    connection.execute(text('SELECT :i'), {'i': i})
+            return 'ok'
+
+        @app.route('/slow')
+        def slow():
+            with engine.connect() as connection:
+                connection.execute(text('SELECT sleep(80)'))
+                connection.execute(text('SELECT 1'))
+            return 'ok'
+
+        profiler.init_profiler(app, engine)
+        return app, engine
+
+    yield build
+    for engine in engines:
+        for name, fn in (('before_cursor_execute', profiler._before_cursor_execute),
+                         ('after_cursor_execute', profiler._after_cursor_execute),
+                         ('handle_error', profiler._handle_error)):
+            if event.contains(engine, name, fn):
+                event.remove(engine, name, fn)
+        engine.dispose()
+    for handler in profiler.logger.handlers:
+        handler.close()
+    profiler.logger.handlers, profiler.logger.propagate = handlers, propagate
+    profiler.logger.setLevel(level)
+
+def _log(app):
+    for handler in profiler.logger.handlers:
+        handler.flush()
+    with open(app.config['SQL_PROFILER_LOG_FILE']) as f:
+        return f.read()
+
+def test_request_summary_counts_its_statements(profiled):
+    app, engine = profiled(SQL_PROFILER_LOG_STATEMENTS=False, SQL_PROFILER_N_PLUS_ONE=3)
+    client = app.test_client()
+    assert client.get('/probe/2').status_code == 200
+    assert client.get('/probe/4').status_code == 200
+
+    log = _log(app)
+    assert 'REQUEST endpoint=probe status=200 2 statements' in log
+    assert 'REQUEST endpoint=probe status=200 4 statements' in log
+    # Même instruction répétée au-delà du seuil : signalée une fois, pour la seconde requête seulement
+    assert log.count('N+1 endpoint=probe 4x') == 1 and ' 2x ' not in log
+    # Sans SQL_PROFILER_LOG_STATEMENTS, pas de ligne par instruction
+    assert ' DEBUG ' not in log
+
+def test_only_statements_over_the_threshold_are_reported_slow(profiled):
+    app, engine = profiled(SQL_PROFILER_SLOW_MS=50)
+    assert app.test_client().get('/slow').status_code == 200
+
+    slow = [line for line in _log(app).splitlines() if ' SLOW ' in line]
+    assert len(slow) == 1 and 'endpoint=slow SELECT sleep(80)' in slow[0]
+
+def test_disabled_profiler_adds_no_listener(profiled):
+    app, engine = profiled(SQL_PROFILER_ENABLED=False)
+    assert app.test_client().get('/probe/3').status_code == 200
+
+    assert not event.contains(engine, 'before_cursor_execute', profiler._before_cursor_execute)
+    assert not app.before_request_funcs and not app.after_request_funcs
+    assert not os.path.exists(app.config['SQL_PROFILER_LOG_FILE'])
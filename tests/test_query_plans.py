@@ -0,0 +1,17 @@
+from src.routes import metrics
+from src.routes.query_plans import check_query_plans, is_full_scan
+
+def test_every_route_is_replayed_without_full_scan(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(metrics._settings, 'dir', str(tmp_path))
+    report, problems = check_query_plans(app)
+    assert problems == []
+    endpoints = {endpoint for endpoint, statement, plan in report}
+    assert {'dashboard.get_user_orders', 'admin.search_all', 'outbox.deliver_pending'} <= endpoints
+    # Les pages suivantes (curseur) sont rejouées : leur plan est vérifié aussi
+    assert any(endpoint == 'admin.get_all_orders' and '<' in statement for endpoint, statement, plan in report)
+
+def test_is_full_scan():
+    assert is_full_scan('SCAN order')
+    assert not is_full_scan('SCAN order USING INDEX ix_order_created')
+    assert not is_full_scan('SCAN search_index VIRTUAL TABLE INDEX 0:M1')
+    assert not is_full_scan('SEARCH user USING INTEGER PRIMARY KEY (rowid=?)')
@@ -0,0 +1,37 @@
+from src.models.user import db, Quote, Contact
+from src.routes.search import search
+from tests.conftest import make_user, auth_headers
+
+def _data():
+    # Beaucoup de devis très pertinents, un seul contact qui cite le mot en passant
+    db.session.add_all([Quote(project_type='website', email=f'q{i}@example.fr', company=f'Boutique {i}',
+                              description='Refonte du site, site vitrine et site marchand') for i in range(5)])
+    db.session.add(Contact(name='Jean', email='jean@example.fr', subject='Question',
+                           message='Une longue question sur les délais, les tarifs, le support et le site'))
+    db.session.commit()
+
+def test_results_of_each_index_are_interleaved_by_rank():
+    _data()
+    hits, next_position = search('site', ['quotes', 'contacts'])
+    assert [hit['type'] for hit in hits[:3]] == ['quotes', 'contacts', 'quotes']
+    assert next_position is None and len(hits) == 6
+
+def test_pages_cover_every_result_once(client):
+    _data()
+    admin = make_user('admin@example.fr', role='admin')
+    seen, cursor = [], None
+    while True:
+        params = {'q': 'site', 'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+        body = client.get('/api/admin/search', headers=auth_headers(admin.id), query_string=params).get_json()
+        seen += [(hit['type'], hit['id']) for hit in body['results']]
+        cursor = body['nextCursor']
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 6
+
+def test_invalid_cursor_is_rejected(client):
+    admin = make_user('admin@example.fr', role='admin')
+    response = client.get('/api/admin/search', headers=auth_headers(admin.id), query_string={'q': 'site', 'cursor': 'abc'})
+    assert response.status_code == 400
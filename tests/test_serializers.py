@@ -0,0 +1,42 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from src.models.user import db, Order, Quote, Contact, PrivateMessage
+from src.routes import serializers
+from src.routes.serializers import (project, serialize_rows, dumps, USER_FIELDS, ORDER_FIELDS, QUOTE_FIELDS,
+                                    CONTACT_FIELDS, MESSAGE_FIELDS)
+from tests.conftest import make_user
+
+def _rows(member):
+    order = Order(order_id='ORD12345', title='Site', type='website', price=1200.5, description='Vitrine',
+                  progress=40, user_id=member.id, completed_at=datetime(2024, 3, 1, 12, 30))
+    quote = Quote(project_type='website', features='["Blog","SEO"]', budget='5k', email=member.email,
+                  estimated_price=3000, user_id=member.id, has_account=True, admin_response='Ok',
+                  responded_at=datetime(2024, 2, 1, 9, 0))
+    contact = Contact(name='Jean', email='jean@example.fr', subject='Question', message='Bonjour')
+    message = PrivateMessage(subject='Sujet', message='Texte', sender_id=member.id, recipient_id=member.id)
+    db.session.add_all([order, quote, contact, message])
+    db.session.commit()
+    return [member, order, quote, contact, message]
+
+@pytest.mark.parametrize('index, fields', [
+    (0, USER_FIELDS), (1, ORDER_FIELDS), (2, QUOTE_FIELDS), (3, CONTACT_FIELDS), (4, MESSAGE_FIELDS)
+])
+def test_projection_matches_to_dict(index, fields):
+    obj = _rows(make_user(company='ACME', phone='0102030405'))[index]
+    model = type(obj)
+    projected = serialize_rows(fields, project(fields).filter(model.id == obj.id).all())
+    assert len(projected) == 1
+    db.session.expire_all()
+    expected = db.session.get(model, obj.id).to_dict()
+    assert json.loads(dumps(projected[0])) == json.loads(dumps(expected))
+
+@pytest.mark.skipif(serializers.orjson is None or not hasattr(serializers.orjson, 'Fragment'),
+                    reason='orjson.Fragment indisponible')
+def test_invalid_features_are_not_copied_into_the_response():
+    assert json.loads(dumps({'features': serializers._raw_features('["Blog"]')})) == {'features': ['Blog']}
+    assert serializers._raw_features(None) == []
+    with pytest.raises(ValueError):
+        serializers._raw_features('["Blog"')
@@ -0,0 +1,55 @@
+import json
+
+from src.routes.static_assets import StaticManifest, IMMUTABLE_CACHE, REVALIDATE_CACHE
+
+def _write(folder, files):
+    for name, content in files.items():
+        path = folder / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+def _cache_controls(folder):
+    manifest = StaticManifest(str(folder))
+    return {name: asset.cache_control for name, asset in manifest.assets.items()}
+
+def test_without_manifest_only_vite_hashes_under_assets_are_immutable(tmp_path):
+    _write(tmp_path, {
+        'index.html': '<html></html>',
+        'assets/index-4f8a9c2b.js': 'js',
+        'assets/index-Bx_3k-9Q.css': 'css',
+        'assets/hero-background.png': 'png',
+        'logo-original.svg': 'svg',
+        'favicon-a1b2c3d4.ico': 'ico'
+    })
+    assert _cache_controls(tmp_path) == {
+        'index.html': REVALIDATE_CACHE,
+        'assets/index-4f8a9c2b.js': IMMUTABLE_CACHE,
+        'assets/index-Bx_3k-9Q.css': IMMUTABLE_CACHE,
+        'assets/hero-background.png': REVALIDATE_CACHE,
+        'logo-original.svg': REVALIDATE_CACHE,
+        'favicon-a1b2c3d4.ico': REVALIDATE_CACHE
+    }
+
+def test_vite_manifest_lists_the_immutable_files(tmp_path):
+    _write(tmp_path, {
+        'index.html': '<html></html>',
+        'assets/main-4f8a9c2b.js': 'js',
+        'assets/main-9d8c7b6a.css': 'css',
+        'assets/font-0a1b2c3d.woff2': 'font',
+        'assets/uploaded-12345678.png': 'png',
+        '.vite/manifest.json': json.dumps({
+            'index.html': {'file': 'assets/main-4f8a9c2b.js', 'isEntry': True,
+                           'css': ['assets/main-9d8c7b6a.css'], 'assets': ['assets/font-0a1b2c3d.woff2']}
+        })
+    })
+    controls = _cache_controls(tmp_path)
+    assert [name for name, control in sorted(controls.items()) if control == IMMUTABLE_CACHE] == [
+        'assets/font-0a1b2c3d.woff2', 'assets/main-4f8a9c2b.js', 'assets/main-9d8c7b6a.css'
+    ]
+    assert controls['assets/uploaded-12345678.png'] == REVALIDATE_CACHE
+
+def test_unreadable_manifest_falls_back_to_the_name_pattern(tmp_path):
+    _write(tmp_path, {'assets/main-4f8a9c2b.js': 'js', 'hero-background.png': 'png', '.vite/manifest.json': '{'})
+    controls = _cache_controls(tmp_path)
+    assert controls['assets/main-4f8a9c2b.js'] == IMMUTABLE_CACHE
+    assert controls['hero-background.png'] == REVALIDATE_CACHE
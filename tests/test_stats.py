@@ -0,0 +1,49 @@
+import pytest
+
+from src.models.user import db, Order, Quote, Contact
+from src.routes.stats import compute_totals, read_counters, rebuild_counters
+from tests.conftest import make_user, auth_headers
+
+@pytest.fixture
+def counters(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'STATS_COUNTERS_ENABLED', True)
+    rebuild_counters()
+
+def _nonzero(totals):
+    return {name: value for name, value in totals.items() if value}
+
+def test_counters_follow_orm_writes(counters):
+    user = make_user()
+    order = Order(order_id='S1', title='t', type='website', price=100, user_id=user.id)
+    other = Order(order_id='S2', title='t', type='website', price=50, user_id=user.id, status='completed')
+    quote = Quote(project_type='website', email='q@example.fr', status='pending')
+    contact = Contact(name='n', email='c@example.fr', subject='s', message='m')
+    db.session.add_all([order, other, quote, contact])
+    db.session.commit()
+
+    order.status = 'completed'
+    order.price = 120
+    quote.status = 'sent'
+    db.session.commit()
+    db.session.delete(other)
+    db.session.delete(contact)
+    db.session.commit()
+
+    assert _nonzero(read_counters()) == _nonzero(compute_totals()) == {
+        'users.count': 1,
+        'orders.count.completed': 1,
+        'orders.revenue.completed': 120,
+        'quotes.count.sent': 1
+    }
+
+def test_admin_stats_are_the_same_with_and_without_counters(app, client, monkeypatch):
+    admin = make_user('admin@example.fr', role='admin')
+    db.session.add(Order(order_id='S1', title='t', type='website', price=100, user_id=admin.id, status='pending'))
+    db.session.commit()
+    headers = auth_headers(admin.id)
+
+    aggregated = client.get('/api/admin/stats', headers=headers).get_json()
+    monkeypatch.setitem(app.config, 'STATS_COUNTERS_ENABLED', True)
+    rebuild_counters()
+    assert client.get('/api/admin/stats', headers=headers).get_json() == aggregated
+    assert aggregated['stats']['pendingRevenue'] == 100
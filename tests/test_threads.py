@@ -0,0 +1,109 @@
+from src.models.user import db, PrivateMessage, Quote
+from src.routes.http_cache import CollectionVersion
+from src.routes.threads import MessageThread, ThreadParticipant, mark_read, unread_messages
+from tests.conftest import make_user, auth_headers
+
+def _send(sender, recipient, subject='Sujet'):
+    message = PrivateMessage(subject=subject, message='Texte', sender_id=sender.id, recipient_id=recipient.id)
+    db.session.add(message)
+    db.session.commit()
+    return message
+
+def _unread(thread_id, user):
+    return db.session.get(ThreadParticipant, (thread_id, user.id)).unread_count
+
+def _version(name):
+    return db.session.query(CollectionVersion.version).filter_by(name=name).scalar() or 0
+
+def test_messages_between_two_users_share_a_thread():
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    first = _send(member, admin, 'Premier')
+    _send(admin, member)
+    last = _send(member, admin)
+
+    thread = MessageThread.query.one()
+    assert (thread.subject, thread.message_count, thread.last_message_id) == ('Premier', 3, last.id)
+    assert _unread(thread.id, admin) == 2 and _unread(thread.id, member) == 1
+
+    db.session.delete(db.session.get(PrivateMessage, last.id))
+    db.session.commit()
+    thread = MessageThread.query.one()
+    assert thread.message_count == 2 and _unread(thread.id, admin) == 1
+    assert first.id != thread.last_message_id
+
+def test_reading_one_message_decrements_the_count():
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    message = _send(member, admin)
+    _send(member, admin)
+    thread_id = MessageThread.query.one().id
+
+    message.is_read = True
+    db.session.commit()
+    assert _unread(thread_id, admin) == 1
+    message.is_read = False
+    db.session.commit()
+    assert _unread(thread_id, admin) == 2
+
+def test_mark_read_resets_counts_and_bumps_versions():
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    other = make_user('other@example.fr')
+    for _ in range(3):
+        _send(member, admin)
+    _send(other, admin)
+    _send(admin, member)
+    member_thread, other_thread = [thread.id for thread in MessageThread.query.order_by(MessageThread.id)]
+    before = _version(f'messages.user.{member.id}')
+
+    assert mark_read(admin.id, member_thread) == 3
+    db.session.commit()
+    assert _unread(member_thread, admin) == 0 and _unread(other_thread, admin) == 1
+    # Le compteur de l'autre participant n'est pas touché
+    assert _unread(member_thread, member) == 1
+    assert unread_messages(admin.id) == 1
+    assert _version(f'messages.user.{member.id}') == before + 1
+
+    assert mark_read(admin.id) == 1
+    db.session.commit()
+    assert unread_messages(admin.id) == 0
+    assert PrivateMessage.query.filter_by(recipient_id=admin.id, is_read=False).count() == 0
+    assert mark_read(admin.id) == 0
+
+def test_thread_routes(client):
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    _send(admin, member)
+    _send(admin, member)
+    headers = auth_headers(member.id)
+
+    threads = client.get('/api/dashboard/threads', headers=headers).get_json()['threads']
+    assert len(threads) == 1
+    thread_id = threads[0]['id']
+    assert client.get('/api/dashboard/stats', headers=headers).get_json()['stats']['unreadMessages'] == 2
+
+    response = client.post(f'/api/dashboard/threads/{thread_id}/read', headers=headers)
+    assert response.get_json()['count'] == 2
+    assert client.get('/api/dashboard/stats', headers=headers).get_json()['stats']['unreadMessages'] == 0
+    outsider = make_user('outsider@example.fr')
+    assert client.post(f'/api/dashboard/threads/{thread_id}/read', headers=auth_headers(outsider.id)).status_code == 404
+
+def test_deleting_a_user_removes_messages_threads_and_detaches_quotes(client):
+    admin = make_user('admin@example.fr', role='admin')
+    member = make_user()
+    other = make_user('other@example.fr')
+    _send(member, admin)
+    _send(admin, member)
+    _send(other, admin)
+    db.session.add(Quote(project_type='website', email=member.email, user_id=member.id))
+    db.session.commit()
+
+    response = client.delete(f'/api/admin/users/{member.id}', headers=auth_headers(admin.id))
+    assert response.status_code == 200, response.get_json()
+    assert PrivateMessage.query.count() == 1
+    thread = MessageThread.query.one()
+    assert (thread.user_low_id, thread.user_high_id) == (admin.id, other.id)
+    assert {p.user_id for p in ThreadParticipant.query} == {admin.id, other.id}
+    assert Quote.query.one().user_id is None
+    assert unread_messages(admin.id) == 1